@@ -1,2 +1,8 @@
-# This exposes the 'root_agent' variable from agent.py so the ADK runner can find it.
-from .agent import root_agent
\ No newline at end of file
+# This exposes the 'app' and 'root_agent' variables from agent.py so the ADK runner can find them.
+# They are imported on first use, so scripts that only need the data modules (e.g. preprocessing.py)
+# do not build the agents.
+def __getattr__(name):
+    if name in ("app", "root_agent"):
+        from . import agent
+        return getattr(agent, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
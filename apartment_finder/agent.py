@@ -1,22 +1,36 @@
 import os
 from google.adk.agents import LlmAgent, SequentialAgent
+from google.adk.apps import App
 from google.genai import types
-from google.adk.models.google_llm import Gemini
 from google.adk.tools import FunctionTool
 from google.adk.tools import google_search
 from typing import List
 from . import instructions
 from . import tools
+from . import telemetry
+from . import research_cache
+from . import safety_cache
+from . import parallel_research
+from . import requirements_parser
+from . import model_scheduler
 
 retry_config = types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
+    attempts=3,  # Maximum retry attempts
+    exp_base=2,  # Delay multiplier
     initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],  # Retry on these HTTP errors
+    max_delay=8,  # Never wait longer than this between retries
+    jitter=1,  # Spread retries of concurrent sessions apart
+    # 429s are left to the scheduler, which slows every agent down instead of retrying blindly
+    http_status_codes=[500, 503, 504],  # Retry on these HTTP errors
 )
 
 # Defining the Model
-model = Gemini(model="gemini-2.5-flash", retry_options=retry_config)
+# Every call goes through one process-wide scheduler (see model_scheduler.py); under load the
+# manager's replies to the user go first and the summarizer's write-up goes last
+model = model_scheduler.ScheduledGemini(model="gemini-2.5-flash", retry_options=retry_config,
+                                        priority=model_scheduler.RESEARCH)
+manager_model = model.model_copy(update={"priority": model_scheduler.INTERACTIVE})
+summarizer_model = model.model_copy(update={"priority": model_scheduler.BACKGROUND})
 
 # Defining Sub-Agents of the Research Team
 # --- 1. THE ANALYST AGENT ---
@@ -25,8 +39,10 @@ analyst = LlmAgent(
     model=model,
     description="Executes tools to find and analyze apartments.",
     instruction=instructions.ANALYST_PROMPT,
-    tools=[FunctionTool(tools.fetch_apartments), FunctionTool(tools.check_commutes)], 
-    output_key="analyst_dossier"
+    tools=[FunctionTool(tools.fetch_apartments), FunctionTool(tools.check_commutes),
+           FunctionTool(tools.get_listing_details)], 
+    output_key="analyst_dossier",
+    **telemetry.LLM_AGENT_CALLBACKS
 )
 
 # --- 2. THE REVIEWER AGENT ---
@@ -36,30 +52,60 @@ reviewer = LlmAgent(
     description="Checks neighborhood safety.",
     instruction=instructions.REVIEWER_PROMPT,
     tools=[google_search],
-    output_key="safety_report"
+    output_key="safety_report",
+    **{
+        **telemetry.LLM_AGENT_CALLBACKS,
+        # Neighborhoods with a stored finding are not searched again
+        "before_agent_callback": [telemetry.before_agent, safety_cache.before_review],
+        "before_model_callback": [safety_cache.skip_known_search, telemetry.before_model],
+        "after_agent_callback": [safety_cache.after_review, telemetry.after_agent],
+    }
 )
 
 # --- 3. THE SUMMARIZER AGENT ---
 summarizer = LlmAgent(
     name="summarizer",
-    model=model,
+    model=summarizer_model,
     description="Compiles research into a final pitch.",
-    instruction=instructions.SUMMARIZER_PROMPT
+    instruction=instructions.SUMMARIZER_PROMPT,
+    output_key="summary",
+    **telemetry.LLM_AGENT_CALLBACKS
 )
 
 # --- THE RESEARCH TEAM ---
-research_team = SequentialAgent(
-    name="ResearchTeam",
-    description="A team that finds, vets, and summarizes apartments.",
-    sub_agents=[analyst, reviewer, summarizer]
+# Repeat requests are answered from the research cache without running the team
+research_team_callbacks = dict(
+    before_agent_callback=[telemetry.before_agent, research_cache.before_research],
+    after_agent_callback=[research_cache.after_research, telemetry.after_agent]
 )
 
+# RESEARCH_MODE=parallel checks commutes and neighborhood safety concurrently (see parallel_research.py)
+if os.getenv("RESEARCH_MODE", "sequential").lower() == "parallel":
+    research_team = parallel_research.build_research_team(model, summarizer, **research_team_callbacks)
+else:
+    research_team = SequentialAgent(
+        name="ResearchTeam",
+        description="A team that finds, vets, and summarizes apartments.",
+        sub_agents=[analyst, reviewer, summarizer],
+        **research_team_callbacks
+    )
+
 # --- ROOT AGENT (MAIN) ---
 
 root_agent = LlmAgent(
     name="manager",
     description="Conversational agent that gathers user requirements.",
-    model=model,
+    model=manager_model,
     instruction=instructions.MANAGER_PROMPT,
-    sub_agents=[research_team]
-)
\ No newline at end of file
+    sub_agents=[research_team],
+    **{
+        **telemetry.LLM_AGENT_CALLBACKS,
+        # Complete requests ("Austin, TX under $2500 near UT campus") skip the model call
+        "before_model_callback": [requirements_parser.fast_path(research_team.name), telemetry.before_model],
+    }
+)
+
+# --- APP ---
+
+# Runners take the app (not just the agent) so the telemetry plugin closes every span of a turn
+app = App(name="apartment_finder", root_agent=root_agent, plugins=[telemetry.TelemetryPlugin()])
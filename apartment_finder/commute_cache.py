@@ -0,0 +1,153 @@
+# This file contains the two-level cache of commute results used by 'check_commutes'
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- CACHE SETTINGS ---
+# Defaults, overridable from .env (read when the cache is created, after load_dotenv):
+#   COMMUTE_CACHE_PATH        SQLite file shared by every process on the host
+#   COMMUTE_CACHE_TTL         Seconds a commute result stays valid (0 disables the cache)
+#   COMMUTE_CACHE_SIZE        Entries kept in the in-process LRU
+#   COMMUTE_CACHE_PRECISION   Decimal places origins are rounded to (4 = ~11 meters)
+CACHE_PATH = os.path.join("data", "commute_cache.sqlite")
+CACHE_TTL = 24 * 3600
+CACHE_SIZE = 10000
+COORD_PRECISION = 4
+
+
+def normalize_origin(origin: str, precision: int = COORD_PRECISION) -> str:
+    """
+    Rounds a "lat,lng" origin so nearby points share a cache entry.
+    Anything that is not a coordinate pair (e.g. an address) is normalized as text.
+    """
+    try:
+        lat, lng = (float(part) for part in origin.split(","))
+    except ValueError:
+        return normalize_destination(origin)
+    return f"{lat:.{precision}f},{lng:.{precision}f}"
+
+
+def normalize_destination(destination: str) -> str:
+    # Case and whitespace do not change where a landmark is
+    return " ".join(destination.lower().split())
+
+
+class CommuteCache:
+    """
+    Caches one Distance Matrix element per (origin, destination, mode).
+
+    Level 1 is an in-process LRU, level 2 an on-disk SQLite table with a TTL that
+    every worker process on the host shares. Entries are stored as the parts of the
+    Maps response that belong to one origin, so a batch can be reassembled from any
+    mix of cached and fresh results.
+    """
+
+    def __init__(self, path: str = None, ttl: float = None, max_entries: int = None, precision: int = None):
+        self.path = path or os.getenv("COMMUTE_CACHE_PATH", CACHE_PATH)
+        self.ttl = ttl if ttl is not None else float(os.getenv("COMMUTE_CACHE_TTL", CACHE_TTL))
+        self.max_entries = max_entries or int(os.getenv("COMMUTE_CACHE_SIZE", CACHE_SIZE))
+        self.precision = precision if precision is not None else int(os.getenv("COMMUTE_CACHE_PRECISION", COORD_PRECISION))
+        self._lru = OrderedDict()  # key -> (expires_at, entry)
+        self._lock = threading.Lock()
+        self._db = self._open_db()
+
+    def _open_db(self):
+        if self.ttl <= 0:
+            return None
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            # WAL lets several worker processes read while one writes
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS commutes (key TEXT PRIMARY KEY, entry TEXT NOT NULL, expires_at REAL NOT NULL)")
+            return db
+        except sqlite3.Error as e:
+            # The in-process LRU still works without the disk level
+            print(f"⚠️ WARNING: Commute cache database unavailable ({e}), using memory only.")
+            return None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def key(self, origin: str, destination: str, mode: str) -> str:
+        return f"{normalize_origin(origin, self.precision)}|{normalize_destination(destination)}|{mode.lower()}"
+
+    def get_many(self, keys: list) -> dict:
+        """
+        Looks up keys in the LRU first, then in SQLite.
+
+        Returns:
+            dict: {key: entry} for every key with a live entry (misses are absent).
+        """
+        if not self.enabled:
+            return {}
+
+        now = time.time()
+        found, missing = {}, []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                hit = self._lru.get(key)
+                if hit and hit[0] > now:
+                    self._lru.move_to_end(key)
+                    found[key] = hit[1]
+                else:
+                    missing.append(key)
+
+            if missing and self._db is not None:
+                try:
+                    placeholders = ",".join("?" * len(missing))
+                    rows = self._db.execute(
+                        f"SELECT key, entry, expires_at FROM commutes WHERE key IN ({placeholders}) AND expires_at > ?",
+                        (*missing, now),
+                    ).fetchall()
+                except sqlite3.Error:
+                    rows = []
+                for key, entry, expires_at in rows:
+                    found[key] = json.loads(entry)
+                    self._remember(key, expires_at, found[key])
+        return found
+
+    def put_many(self, entries: dict):
+        """Stores {key: entry} in both levels."""
+        if not self.enabled or not entries:
+            return
+
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            for key, entry in entries.items():
+                self._remember(key, expires_at, entry)
+            if self._db is not None:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO commutes (key, entry, expires_at) VALUES (?, ?, ?)",
+                        [(key, json.dumps(entry, separators=(',', ':')), expires_at) for key, entry in entries.items()],
+                    )
+                    # Expired rows are dead weight; prune them while we hold the write lock anyway
+                    self._db.execute("DELETE FROM commutes WHERE expires_at <= ?", (time.time(),))
+                except sqlite3.Error as e:
+                    print(f"⚠️ WARNING: Could not write to commute cache: {e}")
+
+    def _remember(self, key, expires_at, entry):
+        self._lru[key] = (expires_at, entry)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+
+# --- THE SHARED CACHE ---
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> CommuteCache:
+    """Returns the process-wide commute cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CommuteCache()
+    return _cache
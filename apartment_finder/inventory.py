@@ -0,0 +1,1092 @@
+# This file contains the loading of the apartment inventory and the lookup structures built over it
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+# The binary snapshot is optional: without pyarrow we simply keep reading the CSV
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:
+    pa = feather = None
+
+DATA_PATH = os.path.join("data", "apartments_cleaned.csv")
+# Typed, uncompressed Arrow/Feather copy of DATA_PATH written by preprocessing.py.
+# Uncompressed so it can be memory-mapped instead of parsed.
+SNAPSHOT_PATH = os.path.join("data", "apartments_cleaned.feather")
+
+# --- COMPACT STORE ---
+# Only what the tools read stays in memory, in the narrowest type that holds it.
+# Long free text is moved to a side file next to the snapshot and read on demand.
+SIDE_TEXT_COLUMNS = ['body']
+CATEGORY_COLUMNS = ['city', 'state', 'category', 'currency']
+FLOAT32_COLUMNS = ['monthly_price', 'latitude', 'longitude', 'bathrooms', 'bedrooms', 'square_feet']
+
+# agent_description is "<beds>, <baths> apartment in <city>, <state>"; the city/state part is
+# stored once in the city/state categoricals, so only the few distinct prefixes are kept
+DESCRIPTION_SUFFIX = " apartment in {city}, {state}"
+
+# The columns 'fetch_apartments' returns
+OUTPUT_COLUMNS = ['id', 'agent_description', 'monthly_price', 'address', 'city', 'state', 'latitude', 'longitude']
+
+
+# ------------------------------
+# LOADING
+# -----------------------------
+
+def read_csv(csv_path: str = DATA_PATH) -> pd.DataFrame:
+    """
+    Parses the cleaned CSV into the DataFrame shape every loader returns.
+
+    Args:
+        csv_path (str): Path to the cleaned listings CSV.
+
+    Returns:
+        pd.DataFrame: The listings, with 'city' and 'state' as strings.
+    """
+    return _as_read(pd.read_csv(csv_path))
+
+
+def _as_read(df: pd.DataFrame) -> pd.DataFrame:
+    # Ensure state/city are string types to prevent errors during filtering
+    df['city'] = df['city'].astype(str)
+    df['state'] = df['state'].astype(str)
+    return df
+
+
+def promote_dtype(current, dtype):
+    """The dtype a single full-file read would infer for a column, given the dtypes of two of its chunks."""
+    if current is None or current == dtype:
+        return dtype
+    if is_numeric_dtype(current) and is_numeric_dtype(dtype) and not (is_bool_dtype(current) or is_bool_dtype(dtype)):
+        return np.result_type(current, dtype)
+    return object
+
+
+def side_text_path(snapshot_path: str = SNAPSHOT_PATH) -> str:
+    return os.path.splitext(snapshot_path)[0] + ".text.feather"
+
+
+def temp_path(path: str) -> str:
+    """
+    Creates a new, uniquely named temp file next to 'path' and returns its name.
+
+    Write the new content there and os.replace() it over 'path': readers never see a
+    half-written file, and concurrent writers (workers, the refresh watcher) never share one.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(path) or ".")
+    os.close(fd)
+    # mkstemp creates it owner-only; the data files are read by other processes too
+    os.chmod(tmp_path, 0o644)
+    return tmp_path
+
+
+def replace_with(path: str, write) -> None:
+    """Calls write(tmp_path) on a fresh temp file, then moves it over 'path' (removed on failure)."""
+    tmp_path = temp_path(path)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def compact_listings(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the listings to the memory-compact layout kept by the Inventory.
+
+    - city/state/category/currency become categoricals
+    - prices, coordinates and room counts become float32
+    - agent_description becomes a categorical 'description_template'
+    - the long 'body' text is dropped (see write_snapshot / Inventory.listing_text)
+
+    Already compact frames pass through unchanged.
+    """
+    df = df.drop(columns=[c for c in SIDE_TEXT_COLUMNS if c in df.columns])
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    for column in FLOAT32_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype(np.float32)
+
+    if 'agent_description' in df.columns:
+        suffixes = " apartment in " + df['city'].astype(str) + ", " + df['state'].astype(str)
+        templates = [
+            # Anything not in the usual shape (or without a city/state) is kept verbatim (it has no placeholders)
+            desc[:-len(suffix)] + DESCRIPTION_SUFFIX
+            if isinstance(desc, str) and isinstance(suffix, str) and desc.endswith(suffix) else desc
+            for desc, suffix in zip(df['agent_description'], suffixes)
+        ]
+        df['description_template'] = pd.Categorical(templates)
+        df = df.drop(columns=['agent_description'])
+    return df
+
+
+def snapshot_is_fresh(csv_path: str = DATA_PATH, snapshot_path: str = SNAPSHOT_PATH) -> bool:
+    """
+    Checks whether the binary snapshot exists and is at least as new as the CSV.
+    """
+    if not os.path.exists(snapshot_path):
+        return False
+    if not os.path.exists(csv_path):
+        # The snapshot is all we have
+        return True
+    return os.path.getmtime(snapshot_path) >= os.path.getmtime(csv_path)
+
+
+def write_snapshot(df: pd.DataFrame, snapshot_path: str = SNAPSHOT_PATH) -> bool:
+    """
+    Writes the listings to the binary snapshot, in the compact layout.
+
+    Long text columns go to a separate side file so the agent never loads them at startup.
+
+    Args:
+        df (pd.DataFrame): The listings as returned by read_csv(). Build the snapshot
+                           from the parsed CSV (not from the preprocessing DataFrame)
+                           so both load paths always return exactly the same data.
+        snapshot_path (str): Where to write the snapshot.
+
+    Returns:
+        bool: True if the snapshot was written.
+    """
+    if feather is None:
+        print("⚠️ WARNING: pyarrow is not installed, skipping the binary snapshot.")
+        return False
+
+    text_columns = ['id'] + [c for c in SIDE_TEXT_COLUMNS if c in df.columns]
+    files = [
+        (df[text_columns].reset_index(drop=True), side_text_path(snapshot_path)),
+        # The snapshot goes last: it is what makes the loader consider the files fresh
+        (compact_listings(df).reset_index(drop=True), snapshot_path),
+    ]
+    for frame, path in files:
+        replace_with(path, lambda tmp_path: frame.to_feather(tmp_path, compression="uncompressed"))
+    return True
+
+
+def write_snapshot_chunked(csv_path: str = DATA_PATH, snapshot_path: str = SNAPSHOT_PATH,
+                           chunksize: int = 200_000) -> bool:
+    """
+    Writes the same snapshot as write_snapshot(read_csv(csv_path)), streaming the CSV in chunks
+    so memory stays bounded by the chunk size (for chunked preprocessing).
+
+    Two passes over the CSV:
+      1. Infer every column's dtype across all chunks and collect every category value, so all
+         chunks share one schema and one dictionary per categorical column.
+      2. Convert each chunk to the compact layout and append it as a record batch.
+
+    Returns:
+        bool: True if the snapshot was written.
+    """
+    if feather is None:
+        print("⚠️ WARNING: pyarrow is not installed, skipping the binary snapshot.")
+        return False
+
+    dtypes, categories = {}, {}
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        for column, dtype in chunk.dtypes.items():
+            dtypes[column] = promote_dtype(dtypes.get(column), dtype)
+        compact = compact_listings(_as_read(chunk))
+        for column in compact.columns[compact.dtypes == 'category']:
+            categories.setdefault(column, set()).update(compact[column].cat.categories)
+    # Sorted, like the categories of one astype('category') over the whole column
+    categories = {column: sorted(values) for column, values in categories.items()}
+
+    def chunks():
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=dtypes):
+            chunk = _as_read(chunk).reset_index(drop=True)
+            compact = compact_listings(chunk)
+            for column, values in categories.items():
+                compact[column] = compact[column].cat.set_categories(values)
+            text_columns = ['id'] + [c for c in SIDE_TEXT_COLUMNS if c in chunk.columns]
+            yield chunk[text_columns], compact
+
+    paths = [side_text_path(snapshot_path), snapshot_path]
+    tmp_paths = [temp_path(path) for path in paths]
+    writers, schemas = [], []
+    try:
+        for frames in chunks():
+            tables = [pa.Table.from_pandas(frame, preserve_index=False) for frame in frames]
+            if not writers:
+                # Every later chunk is cast to the first one's schema (same dtypes and dictionaries)
+                schemas = [table.schema for table in tables]
+                writers = [pa.ipc.new_file(tmp_path, schema) for tmp_path, schema in zip(tmp_paths, schemas)]
+            for writer, schema, table in zip(writers, schemas, tables):
+                writer.write_table(table.cast(schema))
+        for writer in writers:
+            writer.close()
+        if not writers:
+            # No rows at all: nothing to stream
+            return write_snapshot(read_csv(csv_path), snapshot_path)
+        # Same order as write_snapshot: the snapshot goes last
+        for tmp_path, path in zip(tmp_paths, paths):
+            os.replace(tmp_path, path)
+    finally:
+        # Closing twice is fine; this covers a failed write
+        for writer in writers:
+            writer.close()
+        for tmp_path in tmp_paths:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return True
+
+
+def load_listings(csv_path: str = DATA_PATH, snapshot_path: str = SNAPSHOT_PATH) -> pd.DataFrame:
+    """
+    Loads the listings, preferring the binary snapshot over parsing the CSV.
+
+    Falls back to the CSV when the snapshot is missing or older than the CSV,
+    and rewrites the snapshot afterwards so the next start is fast again.
+
+    Args:
+        csv_path (str): Path to the cleaned listings CSV.
+        snapshot_path (str): Path to the binary snapshot (None to always read the CSV).
+
+    Returns:
+        pd.DataFrame: The listings (empty if no data file is found).
+    """
+    if feather is not None and snapshot_path and snapshot_is_fresh(csv_path, snapshot_path):
+        print(f"📂 Loading apartment data from {snapshot_path}...")
+        df = feather.read_table(snapshot_path, memory_map=True).to_pandas()
+        print(f"✅ Data loaded! {len(df)} listings available.")
+        return df
+
+    try:
+        print(f"📂 Loading apartment data from {csv_path}...")
+        df = read_csv(csv_path)
+        print(f"✅ Data loaded! {len(df)} listings available.")
+    except FileNotFoundError:
+        print(f"❌ ERROR: Could not find {csv_path}. Please run your preprocessing script first.")
+        # Return an empty DF to prevent the tools from crashing the app entirely
+        return pd.DataFrame()
+
+    if feather is not None and snapshot_path:
+        try:
+            write_snapshot(df, snapshot_path)
+        except OSError as e:
+            # A read-only data directory only costs us the fast path
+            print(f"⚠️ WARNING: Could not write snapshot {snapshot_path}: {e}")
+
+    return df
+
+
+def read_side_text(csv_path: str = DATA_PATH, snapshot_path: str = SNAPSHOT_PATH) -> pd.DataFrame:
+    """
+    Reads the long text kept out of the in-memory store (SIDE_TEXT_COLUMNS), indexed by listing id.
+
+    Prefers the side file next to the snapshot and falls back to the CSV. A column the data
+    does not have comes back all-missing, so callers never need to check for it.
+    """
+    text_path = side_text_path(snapshot_path) if snapshot_path else None
+    if feather is not None and text_path and os.path.exists(text_path):
+        text = feather.read_table(text_path, memory_map=True).to_pandas()
+    else:
+        text = pd.read_csv(csv_path, usecols=lambda c: c in ['id'] + SIDE_TEXT_COLUMNS)
+    return text.drop_duplicates('id').set_index('id').reindex(columns=SIDE_TEXT_COLUMNS)
+
+
+# ------------------------------
+# INDEXES
+# -----------------------------
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat, lng, lat0: float, lng0: float) -> np.ndarray:
+    """
+    Vectorized great-circle distance (in km) from arrays of points to one point.
+    """
+    lat, lng = np.radians(lat), np.radians(lng)
+    lat0, lng0 = np.radians(lat0), np.radians(lng0)
+    h = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat) * np.cos(lat0) * np.sin((lng - lng0) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h))
+
+
+# One city's listings; every array is ordered by monthly price
+Block = namedtuple("Block", ["rows", "prices", "lat", "lng"])
+
+
+def _index_columns(df: pd.DataFrame) -> pd.DataFrame:
+    # The normalized columns the index is built from.
+    # Lower-case once here so queries never touch the string columns again
+    return pd.DataFrame({
+        'state': df['state'].astype(str).str.lower(),
+        'city': df['city'].astype(str).str.lower(),
+        'monthly_price': df['monthly_price'].astype(np.float64),
+        'latitude': df['latitude'].astype(np.float64),
+        'longitude': df['longitude'].astype(np.float64),
+    }).reset_index(drop=True)
+
+
+def _build_blocks(cols: pd.DataFrame, positions: np.ndarray = None) -> dict:
+    """
+    Groups rows into per-city blocks sorted by price.
+
+    Args:
+        cols (pd.DataFrame): Output of _index_columns().
+        positions (np.ndarray): Only index these rows (default: all of them).
+    """
+    prices = cols['monthly_price'].to_numpy()
+    lat = cols['latitude'].to_numpy()
+    lng = cols['longitude'].to_numpy()
+    if positions is None:
+        positions = np.arange(len(cols))
+
+    blocks = {}
+    groups = cols.iloc[positions].groupby(['state', 'city'], sort=False).indices
+    for key, members in groups.items():
+        rows = positions[members]
+        # Stable sort keeps file order between listings with the same price.
+        # Missing prices sort to the end, so they never fall inside a budget.
+        order = np.argsort(prices[rows], kind='stable')
+        rows = rows[order]
+        blocks[key] = Block(rows, prices[rows], lat[rows], lng[rows])
+    return blocks
+
+
+class LocationIndex:
+    """
+    Maps a normalized (state, city) pair to a price-sorted block of listings.
+
+    The index is built once when the data is loaded. Each block stores the positional
+    row numbers of one city next to their monthly prices in ascending order, so a budget
+    query becomes a dictionary lookup plus a binary search instead of a full-table scan.
+
+    The blocks also carry their coordinates in the same order, which makes each city a
+    spatial partition: the listings within budget are a contiguous prefix of the block,
+    so "nearest to a landmark" is one vectorized distance pass over that prefix.
+    """
+
+    def __init__(self, blocks: dict):
+        # {(state, city): Block}
+        self._blocks = blocks
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "LocationIndex":
+        """
+        Builds the index from the loaded listings DataFrame.
+
+        Args:
+            df (pd.DataFrame): The cleaned listings with 'city', 'state' and 'monthly_price' columns.
+
+        Returns:
+            LocationIndex: The index over every (state, city) pair in the data.
+        """
+        if df.empty:
+            return cls({})
+        return cls(_build_blocks(_index_columns(df)))
+
+    def updated(self, old_df: pd.DataFrame, new_df: pd.DataFrame):
+        """
+        Builds the index for a new version of the listings, reusing this one where possible.
+
+        Listings are matched by 'id'. Cities whose listings were all kept unchanged keep
+        their blocks (only the row numbers are remapped to the new DataFrame); cities with
+        new, deleted or changed listings are rebuilt from the new data.
+
+        Args:
+            old_df (pd.DataFrame): The listings this index was built from.
+            new_df (pd.DataFrame): The new version of the listings.
+
+        Returns:
+            tuple: (LocationIndex, {"added", "removed", "changed", "cities_rebuilt"} counts)
+        """
+        new_cols = _index_columns(new_df)
+        if old_df.empty or not (old_df['id'].is_unique and new_df['id'].is_unique):
+            # Without unique ids there is nothing to match on: rebuild everything
+            index = LocationIndex(_build_blocks(new_cols))
+            return index, {"added": len(new_df), "removed": len(old_df), "changed": 0, "cities_rebuilt": len(index)}
+
+        old_cols = _index_columns(old_df)
+        # Where each old row ended up in the new data (-1 if it was deleted)
+        new_position = pd.Index(new_df['id']).get_indexer(old_df['id'])
+        kept = new_position >= 0
+        added = ~new_df['id'].isin(old_df['id']).to_numpy()
+
+        # A kept listing changed if anything the index looks at differs
+        before = old_cols[kept].reset_index(drop=True)
+        after = new_cols.iloc[new_position[kept]].reset_index(drop=True)
+        differs = ~((before == after) | (before.isna() & after.isna())).all(axis=1).to_numpy()
+        changed = np.zeros(len(old_df), dtype=bool)
+        changed[np.flatnonzero(kept)[differs]] = True
+
+        # Every city that gained, lost or changed a listing needs a new block
+        touched = pd.concat([
+            old_cols.loc[~kept | changed, ['state', 'city']],
+            new_cols.loc[added, ['state', 'city']],
+            new_cols.iloc[new_position[changed]][['state', 'city']],
+        ])
+        affected = set(zip(touched['state'], touched['city']))
+
+        blocks = {
+            key: block._replace(rows=new_position[block.rows])
+            for key, block in self._blocks.items()
+            if key not in affected
+        }
+        in_affected = pd.MultiIndex.from_frame(new_cols[['state', 'city']]).isin(list(affected))
+        blocks.update(_build_blocks(new_cols, np.flatnonzero(in_affected)))
+
+        stats = {
+            "added": int(added.sum()),
+            "removed": int((~kept).sum()),
+            "changed": int(changed.sum()),
+            "cities_rebuilt": len(affected),
+        }
+        return LocationIndex(blocks), stats
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def packed(self):
+        """
+        The whole index as one Block of flat arrays (every city's block back to back) plus the
+        [state, city, start, end] slice of each city, e.g. to copy it into shared memory.
+
+        Returns:
+            tuple: (Block, slices)
+        """
+        slices, start = [], 0
+        for (state, city), block in self._blocks.items():
+            slices.append([state, city, start, start + len(block.rows)])
+            start += len(block.rows)
+        if not self._blocks:
+            return Block(np.empty(0, dtype=np.intp), np.empty(0), np.empty(0), np.empty(0)), slices
+        return Block(*(np.concatenate(columns) for columns in zip(*self._blocks.values()))), slices
+
+    @classmethod
+    def from_packed(cls, flat: Block, slices) -> "LocationIndex":
+        """Rebuilds an index from packed() output. The blocks are views of the flat arrays, not copies."""
+        return cls({(state, city): Block(*(column[start:end] for column in flat))
+                    for state, city, start, end in slices})
+
+    def candidates(self, city: str, state: str, max_budget: float, min_budget: float = None) -> Block:
+        """
+        Returns the listings of a city within a price range, as a price-ordered Block.
+
+        Both ends of the range are binary searches, so this is a slice of the city's
+        block: no listing outside the range is looked at.
+        """
+        block = self._blocks.get((state.lower().strip(), city.lower().strip()))
+        if block is None:
+            return Block(np.empty(0, dtype=np.intp), np.empty(0), np.empty(0), np.empty(0))
+        # Prices are stored as float32: compare against the budget rounded the same way,
+        # or a listing priced exactly at the budget (e.g. 1500.01) can round above it
+        end = np.searchsorted(block.prices, np.float32(max_budget), side='right')
+        start = np.searchsorted(block.prices, np.float32(min_budget), side='left') if min_budget is not None else 0
+        return Block(*(column[start:end] for column in block))
+
+
+# --- SEARCH FILTERS & RANKING ---
+# How 'fetch_apartments' may order the listings that pass its filters:
+#   listing             file order (the default without a landmark)
+#   price               cheapest first
+#   price_per_bedroom   cheapest per bedroom first (a studio counts as one bedroom)
+#   distance            closest to the landmark first (the default with one)
+SORT_KEYS = ("listing", "price", "price_per_bedroom", "distance")
+
+
+def top_k(keys: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k smallest keys, smallest first, without sorting all of them.
+
+    Gives exactly the first k of a stable sort: ties keep their order (also at the
+    k-th place) and NaN keys come last, so both storage backends pick the same rows.
+    """
+    candidates = np.arange(len(keys))
+    if len(keys) > k:
+        kth = np.partition(keys, k - 1)[k - 1]
+        if not np.isnan(kth):
+            # Everything that can still make the cut, ties at the k-th place included
+            candidates = np.flatnonzero(keys <= kth)
+    order = np.argsort(keys[candidates], kind='stable')
+    return candidates[order[:k]]
+
+
+def matching_categories(categories, requested: str) -> list:
+    """
+    The stored categories a requested property type matches (case-insensitive).
+    Combined categories match each of their parts: "home" matches "home" and "apartment/home".
+    """
+    wanted = requested.lower().strip()
+    return [category for category in categories
+            if isinstance(category, str) and (category.lower() == wanted or wanted in category.lower().split("/"))]
+
+
+def rank(block: Block, bedrooms: np.ndarray, sort_by: str, k: int, lat: float = None, lng: float = None) -> np.ndarray:
+    """
+    Picks the k best listings of a price-ordered (and already filtered) block.
+
+    Args:
+        block (Block): The candidates, in price order.
+        bedrooms (np.ndarray): Their bedroom counts, in the same order.
+        sort_by (str): One of SORT_KEYS.
+        k (int): Number of listings to return.
+        lat, lng (float): The point 'distance' is measured from.
+
+    Returns:
+        np.ndarray: Positions into the block, best first.
+    """
+    if sort_by == "price":
+        # The block already is in price order
+        return np.arange(min(k, len(block.rows)))
+    if sort_by == "listing":
+        return top_k(block.rows, k)
+    if sort_by == "price_per_bedroom":
+        return top_k(block.prices / np.maximum(bedrooms, 1), k)
+    if sort_by == "distance":
+        return top_k(haversine_km(block.lat, block.lng, lat, lng), k)
+    raise ValueError(f"Unknown sort key '{sort_by}', expected one of: {', '.join(SORT_KEYS)}")
+
+
+# ------------------------------
+# LOCATION RESOLVER
+# -----------------------------
+
+# Full state names the user (or the model) may write instead of the abbreviation
+STATE_NAMES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA", "colorado": "CO",
+    "connecticut": "CT", "delaware": "DE", "district of columbia": "DC", "florida": "FL", "georgia": "GA",
+    "hawaii": "HI", "idaho": "ID", "illinois": "IL", "indiana": "IN", "iowa": "IA", "kansas": "KS",
+    "kentucky": "KY", "louisiana": "LA", "maine": "ME", "maryland": "MD", "massachusetts": "MA",
+    "michigan": "MI", "minnesota": "MN", "mississippi": "MS", "missouri": "MO", "montana": "MT",
+    "nebraska": "NE", "nevada": "NV", "new hampshire": "NH", "new jersey": "NJ", "new mexico": "NM",
+    "new york": "NY", "north carolina": "NC", "north dakota": "ND", "ohio": "OH", "oklahoma": "OK",
+    "oregon": "OR", "pennsylvania": "PA", "rhode island": "RI", "south carolina": "SC", "south dakota": "SD",
+    "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT", "virginia": "VA", "washington": "WA",
+    "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+}
+
+# City words written both ways ("St. Louis" / "Saint Louis", "Ft Worth" / "Fort Worth")
+PLACE_ABBREVIATIONS = {"st": "saint", "ste": "sainte", "ft": "fort", "mt": "mount", "pt": "point"}
+
+# Fuzzy matches checked with the edit distance (the rest only share a few trigrams)
+FUZZY_CANDIDATES = 8
+
+
+def _place_words(name: str) -> list:
+    return re.sub(r"[^a-z0-9]+", " ", str(name).lower()).split()
+
+
+def normalize_place(name: str) -> str:
+    """Lower-cases a city name, drops punctuation and spells out abbreviations."""
+    return " ".join(PLACE_ABBREVIATIONS.get(word, word) for word in _place_words(name))
+
+
+def _trigrams(name: str) -> set:
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    # Levenshtein distance, giving up (limit + 1) as soon as it exceeds the limit
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _allowed_typos(name: str) -> int:
+    # One typo in short names, about one per four letters in longer ones
+    return max(1, len(name) // 4)
+
+
+class LocationResolver:
+    """
+    Maps what the user typed ("Austn", "St Louis", "Texas") to a (state, city) pair of the data.
+
+    Built once per inventory from its distinct (city, state) pairs. Exact and normalized
+    names are dictionary lookups; misspellings are matched through a per-state trigram
+    index, keeping the closest candidate by edit distance if it is unambiguous.
+    """
+
+    def __init__(self, pairs):
+        # {(state key, city key): ("City", "ST")} with the keys as in the LocationIndex
+        self._display = {}
+        # {state key: {normalized city: city key}}
+        self._cities = {}
+        # {state key: {trigram: [normalized city, ...]}}
+        self._grams = {}
+        for city, state in pairs:
+            key = (str(state).lower(), str(city).lower())
+            self._display[key] = (str(city), str(state))
+            name = normalize_place(city)
+            cities = self._cities.setdefault(key[0], {})
+            if name in cities:
+                continue
+            cities[name] = key[1]
+            grams = self._grams.setdefault(key[0], {})
+            for gram in _trigrams(name):
+                grams.setdefault(gram, []).append(name)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "LocationResolver":
+        if df.empty:
+            return cls([])
+        pairs = df[['city', 'state']].drop_duplicates().astype(str)
+        return cls(zip(pairs['city'], pairs['state']))
+
+    def locations(self) -> list:
+        """Every (city, state) pair of the data, as written there."""
+        return list(self._display.values())
+
+    def display(self, key: tuple) -> str:
+        city, state = self._display[key]
+        return f"{city}, {state}"
+
+    def resolve_state(self, state: str):
+        """
+        Returns:
+            str: The state key, None for an unknown state, or "" for a real state without listings.
+        """
+        # No abbreviations for states: "MT" is Montana, not "mount"
+        name = " ".join(_place_words(state))
+        if name in self._cities:
+            return name
+        abbreviation = STATE_NAMES.get(name) or (name.upper() if name.upper() in STATE_NAMES.values() else None)
+        if abbreviation is None:
+            # A misspelled full name ("Texs", "Californa")
+            close = [abbr for full, abbr in STATE_NAMES.items()
+                     if len(name) > 2 and _edit_distance(name, full, _allowed_typos(full)) <= _allowed_typos(full)]
+            abbreviation = close[0] if len(close) == 1 else None
+        if abbreviation is None:
+            return None
+        return abbreviation.lower() if abbreviation.lower() in self._cities else ""
+
+    def _fuzzy(self, name: str, state_key: str) -> list:
+        # [(edit distance, city key)] for the closest cities of one state
+        counts = {}
+        grams = self._grams.get(state_key, {})
+        for gram in _trigrams(name):
+            for candidate in grams.get(gram, ()):
+                counts[candidate] = counts.get(candidate, 0) + 1
+        best = sorted(counts, key=counts.get, reverse=True)[:FUZZY_CANDIDATES]
+        limit = _allowed_typos(name)
+        # A different number is a different place, not a typo ("City102" vs "City103")
+        digits = re.sub(r"\D", "", name)
+        scored = [(_edit_distance(name, candidate, limit), candidate) for candidate in best
+                  if re.sub(r"\D", "", candidate) == digits]
+        return [(distance, self._cities[state_key][candidate]) for distance, candidate in scored if distance <= limit]
+
+    def resolve(self, city: str, state: str):
+        """
+        Finds the (state, city) pair of the data the user most likely meant.
+
+        Args:
+            city (str): The city as given (any case, abbreviations and small typos allowed).
+            state (str): The state abbreviation or full name.
+
+        Returns:
+            tuple: (state key, city key) for LocationIndex lookups, or None if nothing matches unambiguously.
+        """
+        key = (state.lower().strip(), city.lower().strip())
+        if key in self._display:
+            return key
+
+        state_key = self.resolve_state(state)
+        if state_key == "":
+            return None
+        # An unreadable state is ignored, as long as the city alone is unambiguous
+        states = [state_key] if state_key is not None else list(self._cities)
+        name = normalize_place(city)
+
+        matches = [(0, s, self._cities[s][name]) for s in states if name in self._cities[s]]
+        if not matches:
+            matches = [(distance, s, c) for s in states for distance, c in self._fuzzy(name, s)]
+        if not matches:
+            return None
+        best = min(distance for distance, _, _ in matches)
+        closest = {(s, c) for distance, s, c in matches if distance == best}
+        return closest.pop() if len(closest) == 1 else None
+
+    def suggest(self, city: str, state: str, limit: int = 3) -> list:
+        """The closest known "City, ST" names, for when resolve() finds no single match."""
+        state_key = self.resolve_state(state)
+        states = [state_key] if state_key else list(self._cities)
+        name = normalize_place(city)
+        found = sorted((distance, s, c) for s in states for distance, c in self._fuzzy(name, s))
+        return [self.display((s, c)) for _, s, c in found[:limit]]
+
+
+# ------------------------------
+# THE IN-MEMORY DATABASE
+# -----------------------------
+
+class ArrayInventory:
+    """
+    The lookups 'fetch_apartments' and 'get_listing_details' use, over plain column arrays.
+
+    Subclasses provide the arrays (see _columns) and the indexes: Inventory builds them from
+    a DataFrame, shared_store.SharedInventory maps them from shared memory. An inventory is
+    never modified after it is built. A refresh builds a new one and swaps the module-level
+    reference, so a tool call that grabbed the inventory once keeps seeing one consistent
+    version of the data even if a refresh lands mid-call.
+    """
+
+    def __init__(self, version: str, location_index: LocationIndex, location_resolver: LocationResolver,
+                 arrays: dict = None, csv_path: str = DATA_PATH, snapshot_path: str = SNAPSHOT_PATH):
+        self.version = version
+        self.location_index = location_index
+        self.location_resolver = location_resolver
+        # Where the side-file text for these listings lives (read on demand)
+        self._text_sources = (csv_path, snapshot_path)
+        self._text = None
+        self._arrays = arrays
+
+    def __len__(self):
+        return len(self._columns()['id'])
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    def _decode(self, column: str, rows: np.ndarray) -> np.ndarray:
+        # Categoricals are decoded from their codes, so no per-row strings are kept in memory
+        codes, categories = self._arrays[column]
+        taken = codes[rows]
+        values = categories[np.maximum(taken, 0)].astype(object)
+        values[taken < 0] = None
+        return values
+
+    def _columns(self) -> dict:
+        return self._arrays
+
+    def records(self, rows: np.ndarray) -> pd.DataFrame:
+        """
+        Decodes the given rows into the columns 'fetch_apartments' returns.
+
+        Args:
+            rows (np.ndarray): Positional row numbers (e.g. from the location index).
+
+        Returns:
+            pd.DataFrame: OUTPUT_COLUMNS with plain strings and float64 values.
+        """
+        arrays = self._columns()
+        city = self._decode('city', rows)
+        state = self._decode('state', rows)
+        descriptions = [
+            template.replace("{city}", c).replace("{state}", st) if template is not None else None
+            for template, c, st in zip(self._decode('description_template', rows), city, state)
+        ]
+        return pd.DataFrame({
+            'id': arrays['id'][rows],
+            'agent_description': descriptions,
+            # float32 -> float64 with rounding, so the JSON shows 1250.5 instead of 1250.5000000001
+            'monthly_price': arrays['monthly_price'][rows].astype(np.float64).round(2),
+            'address': arrays['address'][rows],
+            'city': city,
+            'state': state,
+            'latitude': arrays['latitude'][rows].astype(np.float64).round(6),
+            'longitude': arrays['longitude'][rows].astype(np.float64).round(6),
+        }, index=rows)
+
+    def query(self, city: str, state: str, max_budget: float, min_budget: float = None,
+              min_bedrooms: float = None, max_bedrooms: float = None, min_bathrooms: float = None,
+              category: str = None, sort_by: str = "listing", lat: float = None, lng: float = None, k: int = 5):
+        """
+        Finds the k best listings of a city that fit the budget and the filters.
+
+        The price range is a slice of the city's price-sorted block; the other filters are
+        one vectorized mask over that slice, and the ranking is a partial sort (see rank).
+
+        Args:
+            city (str): The target city (case-insensitive).
+            state (str): The target state abbreviation (case-insensitive).
+            max_budget (float): The maximum monthly rent.
+            min_budget (float): The minimum monthly rent.
+            min_bedrooms, max_bedrooms (float): Bedroom range (0 is a studio).
+            min_bathrooms (float): Minimum number of bathrooms.
+            category (str): Property type, e.g. "condo" (see matching_categories).
+            sort_by (str): One of SORT_KEYS.
+            lat, lng (float): The landmark, for 'distance' ranking and distances.
+            k (int): Number of listings to return.
+
+        Returns:
+            tuple: (rows, distances_km) best first; distances_km is None without a landmark.
+        """
+        block = self.location_index.candidates(city, state, max_budget, min_budget)
+        arrays = self._columns()
+        bedrooms = arrays['bedrooms'][block.rows]
+        keep = np.ones(len(block.rows), dtype=bool)
+        if min_bedrooms is not None:
+            keep &= bedrooms >= min_bedrooms
+        if max_bedrooms is not None:
+            keep &= bedrooms <= max_bedrooms
+        if min_bathrooms is not None:
+            keep &= arrays['bathrooms'][block.rows] >= min_bathrooms
+        if category is not None:
+            codes, categories = arrays['category']
+            wanted = np.flatnonzero(np.isin(categories, matching_categories(categories, category)))
+            keep &= np.isin(codes[block.rows], wanted)
+        if not keep.all():
+            block = Block(*(column[keep] for column in block))
+            bedrooms = bedrooms[keep]
+
+        picks = rank(block, bedrooms, sort_by, k, lat, lng)
+        distances = None
+        if lat is not None and lng is not None:
+            distances = haversine_km(block.lat[picks], block.lng[picks], lat, lng)
+        return block.rows[picks], distances
+
+    def listing_text(self, ids, column: str = 'body') -> pd.Series:
+        """
+        Looks up rarely used long text (e.g. the listing 'body') by listing id.
+
+        The side file is only read the first time this is called.
+        """
+        if self._text is None:
+            self._text = read_side_text(*self._text_sources)
+        return self._text[column].reindex(ids)
+
+
+class Inventory(ArrayInventory):
+    """
+    The loaded listings together with the indexes built over them.
+
+    The column arrays are views of the compacted DataFrame, made on the first query.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: str = None, location_index: LocationIndex = None,
+                 csv_path: str = DATA_PATH, snapshot_path: str = SNAPSHOT_PATH):
+        self.df = compact_listings(df)
+        super().__init__(version,
+                         location_index if location_index is not None else LocationIndex.from_frame(self.df),
+                         LocationResolver.from_frame(self.df), csv_path=csv_path, snapshot_path=snapshot_path)
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def empty(self) -> bool:
+        return self.df.empty
+
+    @classmethod
+    def load(cls, csv_path: str = DATA_PATH, snapshot_path: str = SNAPSHOT_PATH) -> "Inventory":
+        # Read the version first: if the data changes while we load, the next check sees it again
+        version = data_version(csv_path)
+        return cls(load_listings(csv_path, snapshot_path), version, csv_path=csv_path, snapshot_path=snapshot_path)
+
+    def _columns(self) -> dict:
+        if self._arrays is None:
+            # Plain numpy views of the columns: indexing them skips the pandas overhead,
+            # which dominates when only a handful of rows are returned
+            df = self.df
+            arrays = {
+                column: (df[column].cat.codes.to_numpy(), df[column].cat.categories.to_numpy())
+                for column in ('city', 'state', 'description_template')
+            }
+            arrays.update({
+                column: df[column].to_numpy()
+                for column in ('id', 'address', 'monthly_price', 'latitude', 'longitude')
+            })
+            # Filter columns; listings without them never pass a filter on them
+            for column in ('bedrooms', 'bathrooms'):
+                arrays[column] = (df[column].to_numpy() if column in df.columns
+                                  else np.full(len(df), np.nan, dtype=np.float32))
+            if 'category' in df.columns:
+                arrays['category'] = (df['category'].cat.codes.to_numpy(), df['category'].cat.categories.to_numpy())
+            else:
+                arrays['category'] = (np.full(len(df), -1, dtype=np.int8), np.empty(0, dtype=object))
+            self._arrays = arrays
+        return self._arrays
+
+    def updated(self, df: pd.DataFrame, version: str):
+        """
+        Builds the inventory for a new version of the listings, reusing unchanged index blocks.
+
+        Returns:
+            tuple: (Inventory, change counts from LocationIndex.updated)
+        """
+        df = compact_listings(df)
+        index, stats = self.location_index.updated(self.df, df)
+        csv_path, snapshot_path = self._text_sources
+        return Inventory(df, version, index, csv_path, snapshot_path), stats
+
+
+# ------------------------------
+# VERSIONING & REFRESH
+# -----------------------------
+
+def version_path_for(data_path: str) -> str:
+    """The version file of a data file: next to it, shared by its .csv, .feather and .sqlite forms."""
+    return os.path.splitext(data_path)[0] + ".version"
+
+
+# Written by preprocessing.py after the CSV, the snapshot and the database, so a changed
+# version always means a complete new dataset is in place
+VERSION_PATH = version_path_for(DATA_PATH)
+
+# Seconds between checks for a new dataset (0 disables the background refresh)
+REFRESH_INTERVAL = 60
+
+# --- STORAGE BACKEND ---
+# Overridable from .env:
+#   INVENTORY_BACKEND   memory (default): listings and indexes in RAM (this module)
+#                       sqlite: an indexed database file shared by all processes (sql_store.py)
+#                       shared: arrays and indexes a loader process published in shared memory (shared_store.py)
+BACKEND = "memory"
+
+
+def _backend() -> str:
+    return os.getenv("INVENTORY_BACKEND", BACKEND).lower()
+
+
+def _load():
+    # Imported here: the other backends build on this module
+    if _backend() == "sqlite":
+        from . import sql_store
+        return sql_store.SQLiteInventory.load()
+    if _backend() == "shared":
+        from . import shared_store
+        return shared_store.SharedInventory.load()
+    return Inventory.load()
+
+
+def write_version(version_path: str = VERSION_PATH) -> str:
+    """Marks the data files as a new, complete version."""
+    version = str(time.time_ns())
+
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            f.write(version)
+
+    replace_with(version_path, write)
+    return version
+
+
+def data_version(data_path: str = DATA_PATH, version_path: str = None) -> str:
+    """
+    Identifies the current version of a data file (the CSV or the SQLite database) on disk.
+
+    Uses its version file (see version_path_for) when there is one, otherwise the file's
+    mtime and size.
+    """
+    try:
+        with open(version_path or version_path_for(data_path)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    try:
+        stat = os.stat(data_path)
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+    except FileNotFoundError:
+        return None
+
+
+_inventory = None
+_inventory_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_watcher = None
+
+
+def get_inventory():
+    """
+    Returns the process-wide inventory, loading it on first use.
+
+    Loading is deferred until the first tool call so importing the agent
+    (main.py, ADK web workers, tests) does not pay for reading the data.
+    Callers should grab it once per request and use that object throughout.
+    """
+    global _inventory
+    if _inventory is None:
+        with _inventory_lock:
+            # Another thread may have finished loading while we waited
+            if _inventory is None:
+                _inventory = _load()
+                _start_watcher()
+    return _inventory
+
+
+def refresh_inventory(force: bool = False) -> bool:
+    """
+    Picks up a new or changed dataset without restarting the process.
+
+    The new listings are diffed against the loaded ones by id, only the index blocks of
+    cities with added, removed or changed listings are rebuilt, and the new inventory is
+    swapped in with a single reference assignment. In-flight requests finish on the old one.
+
+    Args:
+        force (bool): Reload even if the version on disk looks unchanged.
+
+    Returns:
+        bool: True if a new inventory was swapped in.
+    """
+    global _inventory
+    # Only one refresh at a time; readers never wait on this lock
+    with _refresh_lock:
+        current = get_inventory()
+        if _backend() == "shared":
+            # The loader process republishes changed data; attach to its latest segment
+            from . import shared_store
+            manifest_path = getattr(current, "manifest_path", None)
+            version = shared_store.published_version(manifest_path)
+            if version is not None:
+                if manifest_path and version == current.version and not force:
+                    return False
+                try:
+                    _inventory = shared_store.SharedInventory.attach(manifest_path)
+                except FileNotFoundError:
+                    return False
+                print(f"🔄 Inventory refreshed to version {version}.")
+                return True
+            if manifest_path:
+                # The loader stopped: the attached mapping stays valid, keep serving it
+                return False
+            # A private copy (no loader when it was loaded): refreshed from disk below
+
+        sqlite_path = getattr(current, "sqlite_path", None)
+        version = data_version(sqlite_path) if sqlite_path else data_version()
+        if version is None or (version == current.version and not force):
+            return False
+
+        if sqlite_path:
+            # Nothing to diff: the new file is complete and indexed, just open it
+            _inventory = type(current).load(sqlite_path)
+            print(f"🔄 Inventory refreshed to version {version}.")
+            return True
+
+        df = load_listings()
+        if df.empty:
+            print("⚠️ WARNING: New inventory is empty or unreadable, keeping the current one.")
+            return False
+
+        new_inventory, stats = current.updated(df, version)
+        _inventory = new_inventory
+        print(f"🔄 Inventory refreshed to version {version}: +{stats['added']} / -{stats['removed']} / "
+              f"~{stats['changed']} listings, {stats['cities_rebuilt']} cities re-indexed.")
+        return True
+
+
+def _watch(interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            refresh_inventory()
+        except Exception as e:
+            # Keep serving the current inventory; try again on the next tick
+            print(f"⚠️ WARNING: Inventory refresh failed: {e}")
+
+
+def _start_watcher():
+    # Poll the version on disk in a daemon thread (REFRESH_INTERVAL in seconds, 0 disables)
+    global _watcher
+    interval = float(os.getenv("INVENTORY_REFRESH_INTERVAL", REFRESH_INTERVAL))
+    if interval > 0 and _watcher is None:
+        _watcher = threading.Thread(target=_watch, args=(interval,), name="inventory-refresh", daemon=True)
+        _watcher.start()
@@ -0,0 +1,237 @@
+# This file contains the long-lived pool of Google Maps MCP server sessions used by 'check_commutes'
+import asyncio
+import os
+import sys
+import time
+from mcp import StdioServerParameters, ClientSession
+from mcp.client.stdio import stdio_client
+from . import telemetry
+
+# Path to the local MCP server file (relative to project root)
+SERVER_PATH = os.path.join(os.getcwd(), "node_modules", "@modelcontextprotocol", "server-google-maps", "dist", "index.js")
+
+# --- POOL SETTINGS ---
+# Defaults, overridable from .env (read when the pool is created, after load_dotenv):
+#   MAPS_MCP_POOL_SIZE               Server processes to keep running (= max concurrent Maps calls)
+#   MAPS_MCP_HEALTH_CHECK_INTERVAL   Ping a server before reuse if it has been idle this many seconds
+#   MAPS_MCP_TIMEOUT                 Give up on a single server request (spawn, ping or call) after this many seconds
+POOL_SIZE = 2
+HEALTH_CHECK_INTERVAL = 30.0
+REQUEST_TIMEOUT = 30.0
+
+
+def default_server_params() -> StdioServerParameters:
+    """
+    Builds the launch command for the Maps MCP server.
+
+    MAPS_MCP_SERVER can point at another server script, e.g. the offline stub in
+    'benchmarks/stub_maps_server.py'. Python scripts are run with this interpreter.
+    """
+    path = os.getenv("MAPS_MCP_SERVER", SERVER_PATH)
+    command = sys.executable if path.endswith(".py") else "node"
+    return StdioServerParameters(
+        command=command,
+        args=[path],
+        env={"GOOGLE_MAPS_API_KEY": os.getenv("GOOGLE_MAPS_API_KEY", "")}
+    )
+
+
+class MCPConnection:
+    """
+    One running MCP server process with an initialized client session.
+
+    The stdio transport and session are async context managers that must be entered and
+    exited in the same task, so each connection owns a background task that keeps them
+    open until close() is called or the server dies.
+    """
+
+    def __init__(self, server_params: StdioServerParameters, timeout: float = REQUEST_TIMEOUT):
+        self.server_params = server_params
+        self.timeout = timeout
+        self.session = None
+        self.spawn_seconds = None  # How long the last (cold) start took
+        self.last_used = 0.0
+        self.cold = False  # Whether the current checkout had to start the server
+        self._task = None
+        self._stop = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Spawns the server and runs the initialize handshake."""
+        started = time.perf_counter()
+        ready = asyncio.get_running_loop().create_future()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._run(ready))
+        try:
+            await asyncio.wait_for(asyncio.shield(ready), self.timeout)
+        except BaseException:
+            await self.close()
+            raise
+        self.spawn_seconds = time.perf_counter() - started
+        self.last_used = time.monotonic()
+
+    async def _run(self, ready: asyncio.Future):
+        try:
+            async with stdio_client(self.server_params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.session = session
+                    ready.set_result(None)
+                    await self._stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+        finally:
+            self.session = None
+            if not ready.done():
+                ready.set_exception(ConnectionError("Maps MCP server exited during startup"))
+
+    async def ping(self):
+        await asyncio.wait_for(self.session.send_ping(), self.timeout)
+
+    async def call_tool(self, name: str, arguments: dict):
+        result = await asyncio.wait_for(self.session.call_tool(name, arguments=arguments), self.timeout)
+        self.last_used = time.monotonic()
+        return result
+
+    async def close(self):
+        """Shuts the session down and terminates the server process."""
+        task, self._task = self._task, None
+        self.session = None
+        if task is None:
+            return
+        self._stop.set()
+        try:
+            await asyncio.wait_for(task, 5)
+        except asyncio.TimeoutError:
+            # wait_for cancels the task on timeout, which tears down the transport
+            pass
+
+
+class MapsMCPPool:
+    """
+    A fixed-size pool of warm Maps MCP server sessions shared by every agent session.
+
+    Servers are started on first use and then reused, so a tool call no longer pays
+    for a process fork and the initialize handshake. A connection that has been idle
+    for a while is pinged before reuse, and one that fails (crashed or hung server)
+    is closed and restarted on the next checkout.
+    """
+
+    def __init__(self, size: int = None, server_params: StdioServerParameters = None,
+                 health_check_interval: float = None, timeout: float = None):
+        self.size = size or int(os.getenv("MAPS_MCP_POOL_SIZE", POOL_SIZE))
+        self.health_check_interval = health_check_interval or float(
+            os.getenv("MAPS_MCP_HEALTH_CHECK_INTERVAL", HEALTH_CHECK_INTERVAL))
+        timeout = timeout or float(os.getenv("MAPS_MCP_TIMEOUT", REQUEST_TIMEOUT))
+        params = server_params or default_server_params()
+        self._connections = [MCPConnection(params, timeout) for _ in range(self.size)]
+        # LIFO so the most recently used (warm) server is handed out first and
+        # extra servers are only spawned when calls actually overlap
+        self._idle = asyncio.LifoQueue()
+        for conn in self._connections:
+            self._idle.put_nowait(conn)
+        self._closed = False
+        self.stats = {"calls": 0, "spawns": 0, "restarts": 0, "failed_health_checks": 0}
+
+    async def start(self):
+        """Pre-warms every server so the first tool calls do not pay the spawn cost."""
+        await asyncio.gather(*(self._ensure_started(conn) for conn in self._connections))
+
+    async def _ensure_started(self, conn: MCPConnection) -> bool:
+        if conn.alive:
+            return False
+        restart = conn.spawn_seconds is not None
+        if restart:
+            self.stats["restarts"] += 1
+            await conn.close()
+        await conn.start()
+        self.stats["spawns"] += 1
+        telemetry.record("mcp_spawn", conn.spawn_seconds, restart=restart)
+        return True
+
+    async def _checkout(self) -> MCPConnection:
+        if self._closed:
+            raise RuntimeError("Maps MCP pool is closed")
+        conn = await self._idle.get()
+        try:
+            # Health check: only ping servers that have been idle for a while
+            if conn.alive and time.monotonic() - conn.last_used > self.health_check_interval:
+                try:
+                    await conn.ping()
+                    conn.last_used = time.monotonic()
+                except Exception:
+                    self.stats["failed_health_checks"] += 1
+                    await conn.close()
+            conn.cold = await self._ensure_started(conn)
+        except BaseException:
+            self._idle.put_nowait(conn)
+            raise
+        return conn
+
+    async def call_tool(self, name: str, arguments: dict):
+        """
+        Calls a tool on one of the pooled servers.
+
+        If the server fails mid-call it is restarted and the call retried once.
+        """
+        for attempt in range(2):
+            started = time.perf_counter()
+            conn = await self._checkout()
+            try:
+                result = await conn.call_tool(name, arguments)
+                self.stats["calls"] += 1
+                # Includes the server spawn when the call had to start one
+                telemetry.record(f"mcp:{name}", time.perf_counter() - started, start="cold" if conn.cold else "warm")
+                return result
+            except Exception as e:
+                telemetry.record(f"mcp:{name}", time.perf_counter() - started, error=repr(e))
+                # Drop the broken server; the next checkout restarts it
+                await conn.close()
+                if attempt == 1 or self._closed:
+                    raise
+            finally:
+                self._idle.put_nowait(conn)
+
+    async def close(self):
+        """Terminates every server process. The pool cannot be used afterwards."""
+        self._closed = True
+        await asyncio.gather(*(conn.close() for conn in self._connections))
+
+
+# --- THE SHARED POOL ---
+# One pool per process (per event loop), shared by all agent sessions.
+_pool = None
+_pool_loop = None
+
+
+def get_pool() -> MapsMCPPool:
+    """
+    Returns the process-wide Maps MCP pool, creating it on first use.
+
+    Raises:
+        RuntimeError: The pool is still open on another event loop that is not closed.
+    """
+    global _pool, _pool_loop
+    loop = asyncio.get_running_loop()
+    # A pool is tied to the event loop its servers were started on. Its servers can only be
+    # shut down from that loop, so it is only replaced once that loop is closed (asyncio.run
+    # cancels the server tasks before closing its loop); otherwise they would keep running.
+    if _pool is not None and _pool_loop is not loop and not _pool._closed and not _pool_loop.is_closed():
+        raise RuntimeError("The Maps MCP pool is open on another event loop; call close_pool() there first.")
+    if _pool is None or _pool_loop is not loop or _pool._closed:
+        _pool = MapsMCPPool()
+        _pool_loop = loop
+    return _pool
+
+
+async def close_pool():
+    """Shuts down the shared pool, e.g. when the runner exits."""
+    global _pool, _pool_loop
+    if _pool is not None:
+        await _pool.close()
+    _pool = None
+    _pool_loop = None
@@ -0,0 +1,262 @@
+# This file contains the process-wide scheduler in front of Gemini: one adaptive token bucket shared by
+# every agent and session, priorities so the manager's interactive turns go first, jittered backoff on
+# 429s, and coalescing of identical requests that are in flight at the same time
+import asyncio
+import concurrent.futures
+import hashlib
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from typing import AsyncGenerator
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import errors
+from . import telemetry
+
+# --- SCHEDULER SETTINGS ---
+# Defaults, overridable from .env:
+#   GEMINI_MAX_RPS        Requests per second while Gemini answers without 429s
+#   GEMINI_MIN_RPS        The rate never drops below this after 429s
+#   GEMINI_BURST          Requests that may start at once after an idle period
+#   GEMINI_MAX_ATTEMPTS   Tries per model call when Gemini answers 429
+#   GEMINI_BACKOFF_CAP    Longest wait between two tries, in seconds
+#   GEMINI_COALESCE       1 (default) lets identical concurrent requests share one call, 0 disables
+MAX_RPS = 10.0
+MIN_RPS = 0.5
+BURST = 10
+MAX_ATTEMPTS = 5
+BACKOFF_CAP = 8.0
+COALESCE = "1"
+
+# First backoff, doubled on every further 429 of the same call
+BACKOFF_BASE = 0.5
+# A 429 halves the rate; every success wins back this fraction of the maximum
+DECREASE_FACTOR = 0.5
+INCREASE_STEP = 0.05
+# How often a waiting call re-checks the bucket when it is not first in line
+POLL_INTERVAL = 0.01
+
+# Priorities (lower goes first)
+INTERACTIVE = 0  # the manager answering the user
+RESEARCH = 1     # analyst and reviewers
+BACKGROUND = 2   # the summarizer
+PRIORITY_NAMES = {INTERACTIVE: "interactive", RESEARCH: "research", BACKGROUND: "background"}
+
+
+class ModelScheduler:
+    """
+    Decides when each model call may start.
+
+    A token bucket refilled at 'rate' requests per second, where the rate follows the
+    quota Gemini actually grants: halved (and the bucket emptied) on every 429, raised a
+    little on every success, up to 'max_rate'. Waiting calls are served by priority,
+    then first come first served.
+
+    Not bound to an event loop: waiters poll the bucket with asyncio.sleep, so one
+    scheduler serves every runner and thread in the process.
+    """
+
+    def __init__(self, max_rate: float = None, min_rate: float = None, burst: int = None):
+        self.max_rate = max_rate or float(os.getenv("GEMINI_MAX_RPS", MAX_RPS))
+        self.min_rate = min(min_rate or float(os.getenv("GEMINI_MIN_RPS", MIN_RPS)), self.max_rate)
+        self.burst = burst or int(os.getenv("GEMINI_BURST", BURST))
+        self.rate = self.max_rate
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._waiting = []  # heap of (priority, ticket)
+        self._tickets = itertools.count()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def queue_depth(self, priority: int = None) -> int:
+        with self._lock:
+            return sum(1 for p, _ in self._waiting if priority is None or p == priority)
+
+    def _report_depth(self, priority: int):
+        telemetry.gauge("gemini_queue_depth", self.queue_depth(priority), priority=PRIORITY_NAMES.get(priority, priority))
+
+    async def acquire(self, priority: int = RESEARCH) -> float:
+        """
+        Waits until this call may start.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        start = time.monotonic()
+        entry = (priority, next(self._tickets))
+        with self._lock:
+            heapq.heappush(self._waiting, entry)
+        self._report_depth(priority)
+        try:
+            while True:
+                with self._lock:
+                    self._refill(time.monotonic())
+                    if self._waiting[0] == entry and self._tokens >= 1:
+                        heapq.heappop(self._waiting)
+                        self._tokens -= 1
+                        entry = None
+                        break
+                    # Nobody can start before the next token exists
+                    delay = max((1 - self._tokens) / self.rate, POLL_INTERVAL)
+                await asyncio.sleep(delay)
+        finally:
+            if entry is not None:
+                # Cancelled while waiting: give up the place in line
+                with self._lock:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+            self._report_depth(priority)
+
+        waited = time.monotonic() - start
+        telemetry.observe("gemini_queue_wait_seconds", waited, priority=PRIORITY_NAMES.get(priority, priority))
+        return waited
+
+    def throttled(self):
+        """Gemini answered 429: slow down and start refilling from empty."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+            self._tokens = min(self._tokens, 0.0)
+        telemetry.count("gemini_throttled_total")
+        telemetry.gauge("gemini_rate_limit", round(self.rate, 3))
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * INCREASE_STEP)
+        telemetry.gauge("gemini_rate_limit", round(self.rate, 3))
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait before retry number 'attempt' (half fixed, half random)."""
+        cap = float(os.getenv("GEMINI_BACKOFF_CAP", BACKOFF_CAP))
+        delay = min(cap, BACKOFF_BASE * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> ModelScheduler:
+    """Returns the process-wide scheduler (created on first use, after load_dotenv)."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = ModelScheduler()
+    return _scheduler
+
+
+# -----------------------------
+# SCHEDULED CALLS
+# -----------------------------
+_in_flight = {}  # request key -> concurrent.futures.Future with the leader's responses
+_in_flight_lock = threading.Lock()
+
+
+def request_key(llm_request: LlmRequest) -> str:
+    return hashlib.sha256(llm_request.model_dump_json(exclude_none=True).encode()).hexdigest()
+
+
+async def _attempts(generate, priority: int) -> AsyncGenerator[LlmResponse, None]:
+    # One model call through the bucket, retrying 429s with jittered backoff
+    scheduler = get_scheduler()
+    attempts = int(os.getenv("GEMINI_MAX_ATTEMPTS", MAX_ATTEMPTS))
+    for attempt in range(1, attempts + 1):
+        await scheduler.acquire(priority)
+        started = False
+        try:
+            async for response in generate():
+                started = True
+                yield response
+        except errors.ClientError as e:
+            if e.code != 429:
+                raise
+            scheduler.throttled()
+            # A partly streamed answer cannot be taken back
+            if started or attempt == attempts:
+                raise
+            delay = scheduler.backoff(attempt)
+            print(f"   ⏳ Gemini rate limit hit, retrying in {delay:.1f}s (attempt {attempt + 1}/{attempts})...")
+            await asyncio.sleep(delay)
+            continue
+        scheduler.succeeded()
+        return
+
+
+async def scheduled(generate, llm_request: LlmRequest, priority: int = RESEARCH,
+                    stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+    """
+    Runs one model call through the process-wide scheduler.
+
+    Args:
+        generate: Zero-argument function returning the model's response generator.
+        llm_request (LlmRequest): The request, used to coalesce identical calls.
+        priority (int): INTERACTIVE, RESEARCH or BACKGROUND.
+        stream (bool): Streamed calls are never coalesced.
+
+    Yields:
+        LlmResponse: The model's responses. Identical requests in flight at the same
+                     time get copies of the first one's responses.
+    """
+    if stream or os.getenv("GEMINI_COALESCE", COALESCE) == "0":
+        async for response in _attempts(generate, priority):
+            yield response
+        return
+
+    key = request_key(llm_request)
+    with _in_flight_lock:
+        shared = _in_flight.get(key)
+        leader = shared is None
+        if leader:
+            shared = _in_flight[key] = concurrent.futures.Future()
+
+    if not leader:
+        # A plain future, so followers may wait from another event loop or thread
+        responses = await asyncio.wrap_future(shared)
+        if responses is None:
+            # The first caller went away before the answer was complete: make our own call
+            async for response in _attempts(generate, priority):
+                yield response
+            return
+        telemetry.count("gemini_coalesced_total")
+        for response in responses:
+            yield response.model_copy(deep=True)
+        return
+
+    responses = []
+    try:
+        async for response in _attempts(generate, priority):
+            responses.append(response.model_copy(deep=True))
+            yield response
+    except Exception as e:
+        # The same request would fail the same way for everyone waiting on it
+        shared.set_exception(e)
+        raise
+    except BaseException:
+        # Cancelled or closed early
+        shared.set_result(None)
+        raise
+    else:
+        shared.set_result(responses)
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+
+
+class ScheduledGemini(Gemini):
+    """Gemini whose calls go through the process-wide scheduler with the given priority."""
+
+    priority: int = RESEARCH
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        def generate():
+            return super(ScheduledGemini, self).generate_content_async(llm_request, stream)
+
+        async for response in scheduled(generate, llm_request, self.priority, stream):
+            yield response
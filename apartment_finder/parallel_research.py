@@ -0,0 +1,209 @@
+# This file contains the parallel research mode: once the listings are fetched, the commute check and
+# the per-neighborhood safety reviews run concurrently instead of one agent after another
+#
+#   ResearchTeam (sequential)
+#   ├── scout                    fetch_apartments from the manager's requirements (no LLM)
+#   ├── FieldWork (parallel)
+#   │   ├── commuter             check_commutes for the listings (no LLM)
+#   │   └── neighborhood_reviewer   one grounded search per new neighborhood, N at a time
+#   └── summarizer               reads the merged {safety_report}
+import asyncio
+import os
+import uuid
+from typing import AsyncGenerator
+from google.adk.agents import BaseAgent, ParallelAgent, SequentialAgent
+from google.adk.events import Event, EventActions
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+from . import instructions
+from . import safety_cache
+from . import telemetry
+from . import tools
+from .research_cache import PREFERENCE_KEYS, latest_requirements
+
+# --- PARALLEL MODE SETTINGS ---
+# Defaults, overridable from .env:
+#   RESEARCH_CONCURRENCY   Safety reviews (model calls) running at once
+REVIEW_CONCURRENCY = 4
+# Listings that get a safety review, as in the sequential reviewer ("top 3")
+REVIEWED_LISTINGS = 3
+
+
+def _tool_events(agent: BaseAgent, ctx, name: str, args: dict, result: str, state_delta: dict) -> list:
+    # Record a direct tool call as the call/response event pair an LLM agent would produce,
+    # so the session history, tool metrics and caches see it like any other tool call
+    call_id = f"adk-{uuid.uuid4()}"
+    call = Event(invocation_id=ctx.invocation_id, author=agent.name, branch=ctx.branch,
+                 content=types.Content(role="model", parts=[
+                     types.Part(function_call=types.FunctionCall(id=call_id, name=name, args=args))]))
+    response = Event(invocation_id=ctx.invocation_id, author=agent.name, branch=ctx.branch,
+                     content=types.Content(role="user", parts=[
+                         types.Part(function_response=types.FunctionResponse(id=call_id, name=name, response={"result": result}))]),
+                     actions=EventActions(state_delta=state_delta))
+    return [call, response]
+
+
+class ListingScout(BaseAgent):
+    """Fetches the listings for the manager's requirements (no model call needed)."""
+
+    async def _run_async_impl(self, ctx) -> AsyncGenerator[Event, None]:
+        requirements = latest_requirements(ctx.session)
+        if requirements is None:
+            yield Event(invocation_id=ctx.invocation_id, author=self.name, branch=ctx.branch,
+                        content=types.Content(role="model", parts=[types.Part(text="No requirements found.")]),
+                        actions=EventActions(state_delta={"listings": [], "landmark": ""}))
+            return
+
+        args = {"city": requirements["city"], "state": requirements["state"], "max_budget": requirements["budget"]}
+        # The scout has no landmark coordinates, so it cannot rank by distance
+        args.update({key: requirements[key] for key in PREFERENCE_KEYS
+                     if key in requirements and not (key == "sort_by" and requirements[key] == "distance")})
+        result = await asyncio.to_thread(tools.fetch_apartments, **args)
+        listings = tools.parse_listings(result)
+        # The city actually searched, if fetch_apartments corrected a typo
+        location = (f"{listings[0]['city']}, {listings[0]['state']}" if listings
+                    else f"{requirements['city']}, {requirements['state']}")
+        state = {"listings": listings, "landmark": requirements["landmark"], "location": location}
+        for event in _tool_events(self, ctx, "fetch_apartments", args, result, state):
+            yield event
+
+
+class CommuteChecker(BaseAgent):
+    """Checks the commute from every listing to the landmark."""
+
+    async def _run_async_impl(self, ctx) -> AsyncGenerator[Event, None]:
+        listings = ctx.session.state.get("listings") or []
+        if not listings:
+            return
+        # As ANALYST_PROMPT asks: append "<city>, <state>" to the landmark for accuracy
+        destination = f"{ctx.session.state.get('landmark')}, {ctx.session.state.get('location')}"
+        args = {"origins": [f"{apt['latitude']},{apt['longitude']}" for apt in listings], "destination": destination}
+        result = await tools.check_commutes(**args)
+        for event in _tool_events(self, ctx, "check_commutes", args, result, {"commute_report": result}):
+            yield event
+
+
+class NeighborhoodReviewer(BaseAgent):
+    """
+    Reviews the safety of each listing's neighborhood with one grounded search per
+    neighborhood, running up to 'concurrency' of them at once. Neighborhoods with a
+    stored finding (see safety_cache.py) are not searched again.
+    """
+
+    model: BaseLlm
+    concurrency: int = REVIEW_CONCURRENCY
+
+    async def _review(self, apt: dict, location: str) -> str:
+        request = LlmRequest(
+            model=self.model.model,
+            contents=[types.Content(role="user", parts=[types.Part(text=f"Apartment: {apt['address']}, {location}")])],
+            config=types.GenerateContentConfig(
+                system_instruction=instructions.NEIGHBORHOOD_REVIEWER_PROMPT,
+                tools=[types.Tool(google_search=types.GoogleSearch())],
+            ),
+        )
+        text = ""
+        with telemetry.span(f"llm:{self.name}", address=apt["address"]):
+            async for response in self.model.generate_content_async(request):
+                if response.content and response.content.parts:
+                    text = "".join(part.text or "" for part in response.content.parts) or text
+        return text.strip()
+
+    async def _run_async_impl(self, ctx) -> AsyncGenerator[Event, None]:
+        listings = (ctx.session.state.get("listings") or [])[:REVIEWED_LISTINGS]
+        location = ctx.session.state.get("location") or ""
+        cache = safety_cache.get_cache()
+
+        cells = {}  # neighborhood -> the listing whose address is searched
+        for apt in listings:
+            cells.setdefault(cache.neighborhood(apt["latitude"], apt["longitude"]), apt)
+        findings = cache.get_many(list(cells))
+        pending = [cell for cell in cells if cell not in findings]
+        print(f"   🛡️ Reviewing {len(pending)} neighborhood(s) in parallel ({len(cells) - len(pending)} known)...")
+
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def review(cell):
+            async with limit:
+                return cell, await self._review(cells[cell], location)
+
+        fresh = {}
+        for outcome in await asyncio.gather(*(review(cell) for cell in pending), return_exceptions=True):
+            if isinstance(outcome, Exception):
+                print(f"   ⚠️ Safety review failed: {outcome}")
+                continue
+            cell, finding = outcome
+            if finding:
+                fresh[cell] = {"address": cells[cell]["address"], "finding": finding}
+        cache.put_many(fresh)
+        findings.update(fresh)
+
+        reviewed = [{"address": apt["address"],
+                     "finding": findings.get(cache.neighborhood(apt["latitude"], apt["longitude"]), {}).get(
+                         "finding", "No safety information found.")}
+                    for apt in listings]
+        yield Event(invocation_id=ctx.invocation_id, author=self.name, branch=ctx.branch,
+                    actions=EventActions(state_delta={"safety_findings": reviewed}))
+
+
+def _commute_lines(report: str, count: int) -> list:
+    # One "<duration> (<distance>)" per origin, in order, from the check_commutes JSON (either format)
+    commutes = tools.parse_commutes(report)
+    return [f"{c['duration']} ({c['distance']})" if c else "commute unavailable"
+            for c in commutes] + ["commute unavailable"] * (count - len(commutes))
+
+
+def merge_reports(callback_context):
+    """
+    Merges the parallel branches into the state the rest of the pipeline reads:
+    'analyst_dossier' (listings + commutes) and 'safety_report' (dossier + safety).
+    """
+    state = callback_context.state
+    listings = state.get("listings") or []
+    if not listings:
+        state["analyst_dossier"] = state["safety_report"] = "No apartments found for these requirements."
+        return None
+
+    commutes = _commute_lines(state.get("commute_report") or "", len(listings))
+    dossier = "\n".join(
+        f"- {apt['address']}: ${apt['monthly_price']} | {apt['agent_description']} | "
+        f"commute to {state.get('landmark')}: {commute}"
+        for apt, commute in zip(listings, commutes))
+    safety = "\n".join(f"- {item['address']}: {item['finding']}" for item in state.get("safety_findings") or [])
+    state["analyst_dossier"] = dossier
+    state["safety_report"] = f"{dossier}\n\nNeighborhood safety:\n{safety or 'No safety information found.'}"
+    return None
+
+
+def build_research_team(model: BaseLlm, summarizer: BaseAgent, concurrency: int = None, **callbacks) -> SequentialAgent:
+    """
+    Builds the parallel 'ResearchTeam'.
+
+    Args:
+        model (BaseLlm): Model used for the neighborhood safety reviews.
+        summarizer (BaseAgent): The summarizer agent (reads {safety_report}).
+        concurrency (int, optional): Safety reviews running at once (default: RESEARCH_CONCURRENCY).
+        **callbacks: Agent callbacks for the team itself (e.g. the research cache).
+
+    Returns:
+        SequentialAgent: The team, named 'ResearchTeam' like the sequential one.
+    """
+    concurrency = concurrency or int(os.getenv("RESEARCH_CONCURRENCY", REVIEW_CONCURRENCY))
+    field_work = ParallelAgent(
+        name="FieldWork",
+        description="Checks commutes and neighborhood safety at the same time.",
+        sub_agents=[
+            CommuteChecker(name="commuter", **telemetry.AGENT_CALLBACKS),
+            NeighborhoodReviewer(name="neighborhood_reviewer", model=model, concurrency=concurrency,
+                                 **telemetry.AGENT_CALLBACKS),
+        ],
+        before_agent_callback=telemetry.before_agent,
+        after_agent_callback=[merge_reports, telemetry.after_agent],
+    )
+    return SequentialAgent(
+        name="ResearchTeam",
+        description="A team that finds, vets, and summarizes apartments.",
+        sub_agents=[ListingScout(name="scout", **telemetry.AGENT_CALLBACKS), field_work, summarizer],
+        **callbacks
+    )
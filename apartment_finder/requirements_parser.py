@@ -0,0 +1,165 @@
+# This file contains the deterministic requirement parser: when the user's message already names the
+# city, state, budget and landmark, the manager's handoff is built locally, without a model call
+import json
+import os
+import re
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from . import inventory
+from . import telemetry
+
+# --- FAST PATH SETTINGS ---
+# Overridable from .env:
+#   REQUIREMENTS_FAST_PATH   1 (default) parses complete requests locally, 0 always asks the manager model
+FAST_PATH = "1"
+
+# Plausible monthly rents; anything else is more likely a street number or a year
+MIN_BUDGET, MAX_BUDGET = 200, 50000
+
+BUDGET_PATTERNS = [
+    # "$2,500", "$2.5k", "$2500/mo"
+    re.compile(r"\$\s*(\d[\d,]*(?:\.\d+)?)\s*(k\b)?", re.IGNORECASE),
+    # "under 2500", "budget of 2.5k", "max 2500", "up to 2,500 dollars"
+    re.compile(r"\b(?:under|below|less than|max(?:imum)?|up to|budget(?: is| of)?:?|at most)\s+(\d[\d,]*(?:\.\d+)?)\s*(k\b)?",
+               re.IGNORECASE),
+    # "2500 dollars", "2500 a month", "2500/month"
+    re.compile(r"\b(\d[\d,]*(?:\.\d+)?)\s*(k\b)?\s*(?:dollars|bucks|usd|a month|per month|/\s*mo(?:nth)?)\b", re.IGNORECASE),
+]
+
+# The landmark runs from one of these phrases up to punctuation or the next clause
+LANDMARK_PATTERN = re.compile(
+    r"\b(?:near|close to|next to|commut(?:e|ing) to|work(?:ing)? at|works at|landmark(?: is)?:?|walking distance (?:to|of))\s+"
+    r"(?:the\s+)?(.+?)\s*(?=[,.;!?]|\bunder\b|\bbelow\b|\bwith(?:in)?\b|\bfor\b|\band\b|\bin\b|\bup to\b|\bmax\b|\$|$)",
+    re.IGNORECASE,
+)
+
+WORD = re.compile(r"[A-Za-z][A-Za-z.'-]*")
+
+# Search preferences (see research_cache.PREFERENCE_KEYS) are left to the manager model,
+# which turns them into the optional handoff fields
+PREFERENCE_PATTERN = re.compile(
+    r"\b(?:\d+\s*(?:br|ba)|bed(?:room)?s?|bath(?:room)?s?|studios?|condos?|short[- ]term|cheapest|"
+    r"at least|minimum|min(?:imum)? (?:price|rent)|per bedroom)\b",
+    re.IGNORECASE,
+)
+
+
+def parse_budget(text: str) -> float:
+    """Returns the single budget mentioned in the text, or None if there is none or several."""
+    found = set()
+    for pattern in BUDGET_PATTERNS:
+        for number, thousands in pattern.findall(text):
+            value = float(number.replace(",", "")) * (1000 if thousands else 1)
+            if MIN_BUDGET <= value <= MAX_BUDGET:
+                found.add(value)
+    return found.pop() if len(found) == 1 else None
+
+
+def known_locations(db) -> dict:
+    """
+    Maps every lower-case city name in the data to {state abbreviation: city as written in the data}.
+    Built once per inventory version.
+    """
+    cached = getattr(db, "_parser_locations", None)
+    if cached is None:
+        cached = {}
+        for city, state in db.location_resolver.locations():
+            cached.setdefault(city.lower(), {})[state.upper()] = city
+        db._parser_locations = cached
+    return cached
+
+
+def parse_location(text: str, locations: dict) -> tuple:
+    """
+    Finds a "<City>, <State>" / "<City> <ST>" / "<City>, <State name>" mention of a known pair.
+
+    Returns:
+        tuple: (city, state) if exactly one known pair is mentioned, else None.
+    """
+    words = [(m.group(0).strip(".'-"), m.start(), m.end()) for m in WORD.finditer(text)]
+    lowered = [w.lower() for w, _, _ in words]
+    found = set()
+    for i in range(len(words)):
+        for n in range(1, 5):  # City names of up to 4 words ("Salt Lake City")
+            if i + n > len(words):
+                break
+            states = locations.get(" ".join(lowered[i:i + n]))
+            if not states:
+                continue
+            j = i + n
+            # Abbreviations must be written in capitals ("Portland OR", not "Portland or Seattle")
+            if j < len(words) and words[j][0].isupper() and len(words[j][0]) == 2 and words[j][0] in states:
+                found.add((states[words[j][0]], words[j][0]))
+                continue
+            for m in (3, 2, 1):  # State names of up to 3 words ("District of Columbia")
+                abbr = inventory.STATE_NAMES.get(" ".join(lowered[j:j + m]))
+                if abbr in states:
+                    found.add((states[abbr], abbr))
+                    break
+    return found.pop() if len(found) == 1 else None
+
+
+def parse_landmark(text: str) -> str:
+    match = LANDMARK_PATTERN.search(text)
+    if not match:
+        return None
+    landmark = match.group(1).strip()
+    # A long run-on is not a landmark we are confident about
+    if not landmark or len(landmark.split()) > 8 or any(ch.isdigit() for ch in landmark.split()[0]):
+        return None
+    return landmark
+
+
+def parse_requirements(text: str, locations: dict) -> dict:
+    """
+    Extracts the manager's handoff from a user message when every slot is unambiguous.
+
+    Args:
+        text (str): The user's message.
+        locations (dict): Output of known_locations().
+
+    Returns:
+        dict: {"city", "state", "budget", "landmark"}, or None if anything is missing or ambiguous
+              (or the message also states search preferences).
+    """
+    if PREFERENCE_PATTERN.search(text):
+        return None
+    budget = parse_budget(text)
+    location = parse_location(text, locations)
+    landmark = parse_landmark(text)
+    if budget is None or location is None or landmark is None:
+        return None
+    city, state = location
+    return {"city": city, "state": state, "budget": int(budget) if budget.is_integer() else budget, "landmark": landmark}
+
+
+def fast_path(research_team_name: str):
+    """
+    Builds the manager's before_model callback.
+
+    On the first model call of a turn, a complete request is answered locally with the
+    JSON handoff plus the transfer to the research team, exactly what MANAGER_PROMPT asks
+    the model to produce. Anything else goes to the model as before.
+    """
+    def parse_before_model(callback_context, llm_request):
+        if os.getenv("REQUIREMENTS_FAST_PATH", FAST_PATH) == "0":
+            return None
+        # Only the model call that answers the user's new message
+        last = llm_request.contents[-1] if llm_request.contents else None
+        if last is None or last.role != "user" or not last.parts or any(p.function_response for p in last.parts):
+            return None
+        text = " ".join(part.text for part in last.parts if part.text)
+
+        db = inventory.get_inventory()
+        requirements = parse_requirements(text, known_locations(db)) if not db.empty else None
+        telemetry.count("requirements_fast_path_total", result="hit" if requirements else "miss")
+        if requirements is None:
+            return None
+
+        print(f"   ⚡ Requirements parsed locally: {requirements}")
+        return LlmResponse(content=types.Content(role="model", parts=[
+            types.Part(text=json.dumps(requirements)),
+            types.Part(function_call=types.FunctionCall(name="transfer_to_agent", args={"agent_name": research_team_name})),
+        ]))
+
+    return parse_before_model
@@ -0,0 +1,201 @@
+# This file contains the cache of finished research results (dossier, safety report and summary),
+# keyed by the requirements JSON the manager hands to the 'ResearchTeam'
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from google.genai import types
+from . import inventory
+from . import telemetry
+from .commute_cache import normalize_destination
+from .tools import parse_listings
+
+# --- CACHE SETTINGS ---
+# Defaults, overridable from .env (read when the cache is created, after load_dotenv):
+#   RESEARCH_CACHE_TTL             Seconds a research result stays valid (0 disables the cache)
+#   RESEARCH_CACHE_SIZE            Results kept (least recently used are evicted)
+#   RESEARCH_CACHE_BUDGET_BUCKET   Budgets are rounded down to this many dollars, so e.g. $2,450 and
+#                                  $2,499 share a result (never one with a listing above the budget)
+CACHE_TTL = 3600
+CACHE_SIZE = 500
+BUDGET_BUCKET = 100
+
+# The state keys the research team writes (see the output_key of each agent in agent.py)
+RESULT_KEYS = ["analyst_dossier", "safety_report", "summary"]
+
+JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+# Optional search preferences the manager may add to the requirements
+# (passed to 'fetch_apartments' as they are, see MANAGER_PROMPT)
+PREFERENCE_KEYS = ["min_budget", "min_bedrooms", "max_bedrooms", "min_bathrooms", "category", "sort_by"]
+
+
+def parse_requirements(text: str) -> dict:
+    """
+    Extracts the manager's requirements JSON ({"city", "state", "budget", "landmark"}) from a message.
+
+    Returns:
+        dict: The requirements (plus any PREFERENCE_KEYS given), or None if the text does not contain them.
+    """
+    match = JSON_OBJECT.search(text or "")
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+        budget = float(str(data["budget"]).replace("$", "").replace(",", ""))
+        requirements = {"city": str(data["city"]), "state": str(data["state"]), "budget": budget,
+                        "landmark": str(data.get("landmark") or "")}
+        requirements.update({key: data[key] for key in PREFERENCE_KEYS if data.get(key) not in (None, "")})
+        return requirements
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def latest_requirements(session) -> dict:
+    # The handoff is the last agent message carrying the requirements JSON
+    for event in reversed(session.events):
+        if event.author == "user" or not event.content or not event.content.parts:
+            continue
+        for part in event.content.parts:
+            requirements = parse_requirements(part.text)
+            if requirements:
+                return requirements
+    return None
+
+
+def max_listing_price(session, invocation_id: str) -> float:
+    # The most expensive listing 'fetch_apartments' returned during this research run
+    prices = [0.0]
+    for event in session.events:
+        if event.invocation_id != invocation_id:
+            continue
+        for response in event.get_function_responses():
+            if response.name != "fetch_apartments":
+                continue
+            listings = parse_listings((response.response or {}).get("result", ""))
+            prices += [float(apt.get("monthly_price", 0)) for apt in listings]
+    return max(prices)
+
+
+class ResearchCache:
+    """
+    An in-process LRU of research results with a TTL.
+
+    Entries are tagged with the inventory version they were computed from and dropped
+    as soon as the listings change.
+    """
+
+    def __init__(self, ttl: float = None, max_entries: int = None, budget_bucket: float = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("RESEARCH_CACHE_TTL", CACHE_TTL))
+        self.max_entries = max_entries or int(os.getenv("RESEARCH_CACHE_SIZE", CACHE_SIZE))
+        self.budget_bucket = budget_bucket or float(os.getenv("RESEARCH_CACHE_BUDGET_BUCKET", BUDGET_BUCKET))
+        self._entries = OrderedDict()  # key -> entry
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def key(self, requirements: dict) -> str:
+        bucket = int(requirements["budget"] // self.budget_bucket)
+        return "|".join([
+            " ".join(requirements["city"].lower().split()),
+            requirements["state"].strip().upper(),
+            str(bucket),
+            normalize_destination(requirements["landmark"]),
+        ] + [f"{key}={str(requirements[key]).lower()}" for key in PREFERENCE_KEYS if key in requirements])
+
+    def get(self, requirements: dict, version) -> dict:
+        """
+        Returns the cached result for these requirements, or None.
+        """
+        if not self.enabled:
+            return None
+        key = self.key(requirements)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] <= time.time() or entry["version"] != version:
+                del self._entries[key]
+                return None
+            # Same bucket, but never recommend a listing above this user's budget
+            if entry["max_price"] > requirements["budget"]:
+                return None
+            self._entries.move_to_end(key)
+            return entry["result"]
+
+    def put(self, requirements: dict, version, result: dict, max_price: float = 0.0):
+        if not self.enabled:
+            return
+        key = self.key(requirements)
+        with self._lock:
+            self._entries[key] = {"result": result, "version": version, "max_price": max_price,
+                                  "expires_at": time.time() + self.ttl}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# --- THE SHARED CACHE ---
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResearchCache:
+    """Returns the process-wide research cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResearchCache()
+    return _cache
+
+
+# -----------------------------
+# RESEARCH TEAM CALLBACKS
+# -----------------------------
+def before_research(callback_context):
+    """
+    Answers from the cache when the same research was done recently.
+    Returning content makes ADK skip the research team (no model or tool calls).
+    """
+    cache = get_cache()
+    if not cache.enabled:
+        return None
+    requirements = latest_requirements(callback_context.session)
+    if requirements is None:
+        return None
+
+    result = cache.get(requirements, inventory.get_inventory().version)
+    telemetry.count("research_cache_total", result="hit" if result else "miss")
+    if result is None:
+        return None
+
+    print(f"   ⚡ Research cache hit for {requirements['city']}, {requirements['state']}.")
+    for key in RESULT_KEYS:
+        callback_context.state[key] = result[key]
+    # ADK skips the team's after_agent callbacks now, so its span ends here
+    telemetry.after_agent(callback_context)
+    return types.Content(role="model", parts=[types.Part(text=result["summary"])])
+
+
+def after_research(callback_context):
+    """Stores the research team's results once it has finished."""
+    cache = get_cache()
+    if not cache.enabled:
+        return None
+    requirements = latest_requirements(callback_context.session)
+    result = {key: callback_context.state.get(key) for key in RESULT_KEYS}
+    if requirements is None or not all(result.values()):
+        # Incomplete run (e.g. an agent failed): nothing worth reusing
+        return None
+    max_price = max_listing_price(callback_context.session, callback_context.invocation_id)
+    cache.put(requirements, inventory.get_inventory().version, result, max_price)
+    return None
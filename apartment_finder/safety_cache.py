@@ -0,0 +1,244 @@
+# This file contains the persistent store of neighborhood safety findings used by the 'reviewer' agent
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from . import telemetry
+from .tools import parse_listings
+
+# --- CACHE SETTINGS ---
+# Defaults, overridable from .env (read when the cache is created, after load_dotenv):
+#   SAFETY_CACHE_PATH        SQLite file shared by every process on the host
+#   SAFETY_CACHE_TTL         Seconds a neighborhood finding stays valid (0 disables the cache)
+#   SAFETY_CACHE_PRECISION   Geohash length of a "neighborhood" (6 = ~1.2 x 0.6 km)
+CACHE_PATH = os.path.join("data", "safety_cache.sqlite")
+CACHE_TTL = 7 * 24 * 3600
+GEOHASH_PRECISION = 6
+
+# State key the REVIEWER_PROMPT reads known findings from
+KNOWN_FINDINGS_KEY = "known_safety_findings"
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+FINDINGS_PATTERN = re.compile(r"SAFETY_FINDINGS:\s*(\[.*\])", re.DOTALL)
+
+
+def geohash(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encodes a coordinate as a geohash; nearby points share a prefix."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    code, bits, value, even = [], 0, 0, True
+    while len(code) < precision:
+        rng, x = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if x >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            code.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(code)
+
+
+def normalize_address(address: str) -> str:
+    return " ".join(str(address).lower().split())
+
+
+class SafetyCache:
+    """
+    Stores one safety finding per neighborhood (geohash cell) in SQLite with a TTL.
+
+    Findings for a neighborhood barely change from day to day, so every worker
+    process on the host shares them and only new neighborhoods trigger searches.
+    """
+
+    def __init__(self, path: str = None, ttl: float = None, precision: int = None):
+        self.path = path or os.getenv("SAFETY_CACHE_PATH", CACHE_PATH)
+        self.ttl = ttl if ttl is not None else float(os.getenv("SAFETY_CACHE_TTL", CACHE_TTL))
+        self.precision = precision or int(os.getenv("SAFETY_CACHE_PRECISION", GEOHASH_PRECISION))
+        self._lock = threading.Lock()
+        self._db = self._open_db()
+
+    def _open_db(self):
+        if self.ttl <= 0:
+            return None
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            # WAL lets several worker processes read while one writes
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS findings (geohash TEXT PRIMARY KEY, address TEXT NOT NULL, "
+                       "finding TEXT NOT NULL, expires_at REAL NOT NULL)")
+            return db
+        except sqlite3.Error as e:
+            print(f"⚠️ WARNING: Safety cache database unavailable ({e}), searching every time.")
+            return None
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    def neighborhood(self, lat: float, lng: float) -> str:
+        return geohash(float(lat), float(lng), self.precision)
+
+    def get_many(self, neighborhoods: list) -> dict:
+        """
+        Returns:
+            dict: {geohash: {"address", "finding"}} for every neighborhood with a live finding.
+        """
+        if not self.enabled or not neighborhoods:
+            return {}
+        neighborhoods = list(dict.fromkeys(neighborhoods))
+        placeholders = ",".join("?" * len(neighborhoods))
+        with self._lock:
+            try:
+                rows = self._db.execute(
+                    f"SELECT geohash, address, finding FROM findings WHERE geohash IN ({placeholders}) AND expires_at > ?",
+                    (*neighborhoods, time.time()),
+                ).fetchall()
+            except sqlite3.Error:
+                rows = []
+        return {gh: {"address": address, "finding": finding} for gh, address, finding in rows}
+
+    def put_many(self, findings: dict):
+        """Stores {geohash: {"address", "finding"}}."""
+        if not self.enabled or not findings:
+            return
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO findings (geohash, address, finding, expires_at) VALUES (?, ?, ?, ?)",
+                    # Some listings have no address; the finding is still worth keeping
+                    [(gh, f["address"] if isinstance(f["address"], str) else "", f["finding"], expires_at)
+                     for gh, f in findings.items()],
+                )
+                self._db.execute("DELETE FROM findings WHERE expires_at <= ?", (time.time(),))
+            except sqlite3.Error as e:
+                print(f"⚠️ WARNING: Could not write to safety cache: {e}")
+
+
+# --- THE SHARED CACHE ---
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> SafetyCache:
+    """Returns the process-wide safety cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SafetyCache()
+    return _cache
+
+
+# -----------------------------
+# REVIEWER CALLBACKS
+# -----------------------------
+def reviewed_listings(callback_context) -> list:
+    """
+    The listings the reviewer is asked about: those 'fetch_apartments' returned in this
+    run that the analyst kept in its dossier (all of them if none can be matched).
+    """
+    listings = {}
+    for event in callback_context.session.events:
+        if event.invocation_id != callback_context.invocation_id:
+            continue
+        for response in event.get_function_responses():
+            if response.name != "fetch_apartments":
+                continue
+            for apt in parse_listings((response.response or {}).get("result", "")):
+                listings[apt.get("id")] = apt
+
+    listings = [apt for apt in listings.values() if apt.get("latitude") is not None and apt.get("address")]
+    dossier = normalize_address(callback_context.state.get("analyst_dossier") or "")
+    kept = [apt for apt in listings if normalize_address(apt["address"]) in dossier]
+    return kept or listings
+
+
+def _lookup(callback_context):
+    cache = get_cache()
+    listings = reviewed_listings(callback_context)
+    cells = {normalize_address(apt["address"]): cache.neighborhood(apt["latitude"], apt["longitude"])
+             for apt in listings}
+    known = cache.get_many(list(cells.values()))
+    return listings, cells, known
+
+
+def _format_findings(listings, cells, known) -> str:
+    lines = []
+    for apt in listings:
+        hit = known.get(cells[normalize_address(apt["address"])])
+        if hit:
+            lines.append(f"- {apt['address']}: {hit['finding']}")
+    return "\n".join(lines)
+
+
+def before_review(callback_context):
+    """Puts the stored findings for the reviewed neighborhoods into the reviewer's prompt."""
+    if not get_cache().enabled:
+        return None
+    listings, cells, known = _lookup(callback_context)
+    telemetry.count("safety_cache_total", len(known), result="hit")
+    telemetry.count("safety_cache_total", len(set(cells.values())) - len(known), result="miss")
+    callback_context.state[KNOWN_FINDINGS_KEY] = _format_findings(listings, cells, known) or "None"
+    return None
+
+
+def skip_known_search(callback_context, llm_request):
+    """
+    Answers the reviewer's model call without searching when every reviewed
+    neighborhood already has a finding.
+    """
+    if not get_cache().enabled:
+        return None
+    listings, cells, known = _lookup(callback_context)
+    if not listings or any(cell not in known for cell in cells.values()):
+        return None
+    print(f"   ⚡ Safety findings for all {len(listings)} listings found in the neighborhood cache.")
+    report = (f"{callback_context.state.get('analyst_dossier', '')}\n\n"
+              f"Neighborhood safety (recent reviews):\n{_format_findings(listings, cells, known)}")
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=report)]))
+
+
+def after_review(callback_context):
+    """
+    Stores the findings the reviewer searched for, by neighborhood, and removes their
+    SAFETY_FINDINGS line from the report the summarizer reads.
+    """
+    report = callback_context.state.get("safety_report") or ""
+    match = FINDINGS_PATTERN.search(report)
+    if not match:
+        return None
+    # The line is only meant for this callback; the summarizer would otherwise repeat it
+    callback_context.state["safety_report"] = (report[:match.start()] + report[match.end():]).strip()
+    cache = get_cache()
+    if not cache.enabled:
+        return None
+    try:
+        reported = json.loads(match.group(1))
+    except ValueError:
+        return None
+
+    by_address = {normalize_address(apt["address"]): apt for apt in reviewed_listings(callback_context)}
+    fresh = {}
+    for item in reported if isinstance(reported, list) else []:
+        if not isinstance(item, dict) or not item.get("finding"):
+            continue
+        address = normalize_address(item.get("address", ""))
+        # The model may add the city to the address; match on either containing the other
+        apt = by_address.get(address) or next(
+            (a for key, a in by_address.items() if key and (key in address or address in key)), None)
+        if apt is not None:
+            cell = cache.neighborhood(apt["latitude"], apt["longitude"])
+            fresh[cell] = {"address": apt["address"], "finding": str(item["finding"])}
+    cache.put_many(fresh)
+    return None
@@ -0,0 +1,285 @@
+# This file contains the shared-memory backend for 'fetch_apartments': one loader process publishes the
+# listing arrays and the prebuilt city index into a shared memory segment, and every worker process on
+# the host maps that segment instead of loading and indexing its own copy of the data
+#
+#   python -m apartment_finder.shared_store      # the loader: publishes, republishes on new data
+#
+# and in the workers' .env:
+#   INVENTORY_BACKEND=shared
+import json
+import os
+import secrets
+import signal
+import sys
+import time
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from . import inventory
+
+# Written by the loader next to the data: which segment holds the current version, and its layout
+MANIFEST_PATH = os.path.join("data", "apartments_cleaned.shm.json")
+
+# Segment names are "<prefix>_<random>", so a republish never collides with a segment still mapped
+SEGMENT_PREFIX = "apartment_finder"
+# Every array starts at a multiple of this, so numpy views are aligned
+ALIGNMENT = 64
+
+CATEGORY_COLUMNS = ['city', 'state', 'description_template', 'category']
+NUMERIC_COLUMNS = ['id', 'monthly_price', 'latitude', 'longitude', 'bedrooms', 'bathrooms']
+
+# Segments created by this process (it owns their cleanup)
+_published = set()
+
+
+def _manifest_path(manifest_path: str = None) -> str:
+    return manifest_path or os.getenv("INVENTORY_SHM_MANIFEST", MANIFEST_PATH)
+
+
+# ------------------------------
+# PUBLISHING (the loader process)
+# -----------------------------
+
+def _encode_strings(values) -> tuple:
+    # Variable-length strings as one UTF-8 buffer plus offsets (Python objects cannot be shared)
+    encoded = [value.encode() if isinstance(value, str) else b"" for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    missing = np.array([not isinstance(value, str) for value in values], dtype=bool)
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets, missing
+
+
+def _arrays(db: inventory.Inventory) -> tuple:
+    # The flat arrays to publish, and the small metadata that goes into the manifest instead
+    columns = db._columns()
+    arrays = {}
+    for column in NUMERIC_COLUMNS:
+        values = np.asarray(columns[column])
+        if values.dtype.kind not in "iuf":
+            raise ValueError(f"Column '{column}' is not numeric ({values.dtype}), it cannot be shared.")
+        arrays[column] = values
+    categories = {}
+    for column in CATEGORY_COLUMNS:
+        arrays[f"{column}_codes"], values = columns[column]
+        categories[column] = [str(value) for value in values]
+    arrays["address_data"], arrays["address_offsets"], arrays["address_missing"] = _encode_strings(columns['address'])
+
+    flat, slices = db.location_index.packed()
+    for field in flat._fields:
+        arrays[f"index_{field}"] = getattr(flat, field)
+    return arrays, categories, slices
+
+
+def publish(db: inventory.Inventory, manifest_path: str = None) -> shared_memory.SharedMemory:
+    """
+    Copies an inventory's arrays and city index into a new shared memory segment, then points
+    the manifest at it (atomically, so workers never see a half-written segment).
+
+    Args:
+        db (Inventory): The loaded in-memory inventory.
+        manifest_path (str): Where workers look for the current segment.
+
+    Returns:
+        SharedMemory: The segment. It lives as long as the caller keeps it and does not unlink it.
+    """
+    manifest_path = _manifest_path(manifest_path)
+    arrays, categories, slices = _arrays(db)
+
+    layout, size = {}, 0
+    for name, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        arrays[name] = values
+        layout[name] = {"offset": size, "dtype": values.dtype.str, "shape": list(values.shape)}
+        size += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+    segment = shared_memory.SharedMemory(create=True, size=max(size, 1),
+                                         name=f"{SEGMENT_PREFIX}_{secrets.token_hex(6)}")
+    for name, values in arrays.items():
+        target = np.ndarray(values.shape, dtype=values.dtype, buffer=segment.buf, offset=layout[name]["offset"])
+        target[...] = values
+        del target
+    _published.add(segment.name)
+
+    manifest = {
+        "segment": segment.name,
+        "version": db.version,
+        "rows": len(db),
+        "arrays": layout,
+        "categories": categories,
+        "index": slices,
+        "locations": [list(pair) for pair in db.location_resolver.locations()],
+        "text_sources": list(db._text_sources),
+        "publisher_pid": os.getpid(),
+    }
+
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+
+    inventory.replace_with(manifest_path, write)
+    return segment
+
+
+def serve(manifest_path: str = None, interval: float = None):
+    """
+    Runs the loader: loads and publishes the inventory, republishes whenever a new version of
+    the data appears (see inventory.data_version), and removes everything on exit.
+
+    The previous segment is unlinked right after a republish. Workers that still have it
+    mapped keep reading it until they attach to the new one; the memory is freed after that.
+    """
+    manifest_path = _manifest_path(manifest_path)
+    if interval is None:
+        interval = float(os.getenv("INVENTORY_REFRESH_INTERVAL", inventory.REFRESH_INTERVAL))
+    # Stopped by a process manager: clean up like on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    db = inventory.Inventory.load()
+    segment = publish(db, manifest_path)
+    version = db.version
+    del db  # the segment is the copy the workers use
+    print(f"📡 Published {version} in shared memory segment {segment.name} ({segment.size / 1e6:.1f} MB).")
+    try:
+        while True:
+            # 0 disables republishing: just keep the segment alive
+            time.sleep(interval if interval > 0 else 3600)
+            if interval <= 0 or inventory.data_version() == version:
+                continue
+            db = inventory.Inventory.load()
+            if db.empty:
+                print("⚠️ WARNING: New inventory is empty or unreadable, keeping the current one.")
+                continue
+            old, segment, version = segment, publish(db, manifest_path), db.version
+            del db
+            old.close()
+            old.unlink()
+            _published.discard(old.name)
+            print(f"🔄 Republished version {version} in {segment.name}.")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        segment.close()
+        segment.unlink()
+        print("🛑 Shared inventory removed.")
+
+
+# ------------------------------
+# ATTACHING (the workers)
+# -----------------------------
+
+def read_manifest(manifest_path: str = None) -> dict:
+    try:
+        with open(_manifest_path(manifest_path)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def published_version(manifest_path: str = None) -> str:
+    """The version the loader currently publishes, or None if nothing is published."""
+    manifest = read_manifest(manifest_path)
+    return manifest["version"] if manifest else None
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    segment = shared_memory.SharedMemory(name=name)
+    if name not in _published:
+        # Before Python 3.13 every process that attaches also registers the segment for removal
+        # at its exit, which would take it away from the loader and all other workers
+        resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+class StringColumn:
+    """Strings stored as one UTF-8 buffer plus offsets; indexing decodes just the rows asked for."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, missing: np.ndarray):
+        self._data, self._offsets, self._missing = data, offsets, missing
+
+    def __len__(self):
+        return len(self._missing)
+
+    def __getitem__(self, rows) -> np.ndarray:
+        rows = np.atleast_1d(rows)
+        values = np.empty(len(rows), dtype=object)
+        for i, row in enumerate(rows):
+            if not self._missing[row]:
+                values[i] = self._data[self._offsets[row]:self._offsets[row + 1]].tobytes().decode()
+        return values
+
+
+class SharedInventory(inventory.ArrayInventory):
+    """
+    The same lookups as inventory.Inventory, over arrays the loader published in shared memory.
+
+    Attaching maps the segment: nothing is parsed, copied or indexed, and its pages are
+    shared by every worker on the host. There is no DataFrame behind it, so there is no
+    updated(): the loader publishes new data and refresh_inventory attaches to it.
+    """
+
+    def __init__(self, manifest: dict, manifest_path: str = MANIFEST_PATH):
+        segment = _attach(manifest["segment"])
+        # The arrays below point into the mapping, so it is only closed once this inventory is gone
+        weakref.finalize(self, segment.close)
+
+        arrays = {}
+        for name, spec in manifest["arrays"].items():
+            values = np.ndarray(spec["shape"], dtype=np.dtype(spec["dtype"]), buffer=segment.buf, offset=spec["offset"])
+            values.flags.writeable = False
+            arrays[name] = values
+
+        self.manifest_path = manifest_path
+        self.segment_name = manifest["segment"]
+        # Filled in directly, in the layout ArrayInventory.records/query read
+        columns = {column: arrays[column] for column in NUMERIC_COLUMNS}
+        columns.update({
+            column: (arrays[f"{column}_codes"], np.array(manifest["categories"][column], dtype=object))
+            for column in CATEGORY_COLUMNS
+        })
+        columns['address'] = StringColumn(arrays["address_data"], arrays["address_offsets"], arrays["address_missing"])
+        flat = inventory.Block(*(arrays[f"index_{field}"] for field in inventory.Block._fields))
+        super().__init__(manifest["version"],
+                         inventory.LocationIndex.from_packed(flat, manifest["index"]),
+                         inventory.LocationResolver([tuple(pair) for pair in manifest["locations"]]),
+                         columns, *manifest["text_sources"])
+
+    @classmethod
+    def attach(cls, manifest_path: str = None) -> "SharedInventory":
+        """
+        Attaches to the segment the loader currently publishes.
+
+        Raises:
+            FileNotFoundError: Nothing is published (the loader is not running).
+        """
+        manifest_path = _manifest_path(manifest_path)
+        for _ in range(3):
+            manifest = read_manifest(manifest_path)
+            if manifest is None:
+                raise FileNotFoundError(f"No shared inventory published at {manifest_path}.")
+            try:
+                return cls(manifest, manifest_path)
+            except FileNotFoundError:
+                # Republished (and the old segment unlinked) between reading the manifest and attaching
+                continue
+        raise FileNotFoundError(f"The shared inventory at {manifest_path} keeps changing, try again.")
+
+    @classmethod
+    def load(cls, manifest_path: str = None):
+        """Attaches to the published inventory, or loads a private copy if none is published."""
+        try:
+            store = cls.attach(manifest_path)
+        except FileNotFoundError as e:
+            print(f"⚠️ WARNING: {e} Loading a private copy (start 'python -m apartment_finder.shared_store').")
+            return inventory.Inventory.load()
+        print(f"✅ Attached to shared inventory {store.segment_name}! {len(store)} listings available.")
+        return store
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    serve()
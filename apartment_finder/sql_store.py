@@ -0,0 +1,212 @@
+# This file contains the optional SQLite backend for 'fetch_apartments': the cleaned listings in an
+# indexed, read-only database file that every worker process opens instead of loading the data into RAM
+#
+# Enable it in .env (preprocessing.py --sqlite writes the file):
+#   INVENTORY_BACKEND=sqlite
+#   INVENTORY_SQLITE_PATH=data/apartments_cleaned.sqlite
+import os
+import pathlib
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from . import inventory
+
+SQLITE_PATH = os.path.join("data", "apartments_cleaned.sqlite")
+
+# Pages are memory-mapped, so worker processes share the OS page cache instead of
+# each holding a copy of the listings
+MMAP_SIZE = 1 << 30
+
+# Stored next to the output columns, for filtering
+FILTER_COLUMNS = ['bedrooms', 'bathrooms', 'category', 'square_feet']
+
+SCHEMA = """
+CREATE TABLE listings (
+    id INTEGER,
+    agent_description TEXT,
+    monthly_price REAL,
+    address TEXT,
+    city TEXT,
+    state TEXT,
+    latitude REAL,
+    longitude REAL,
+    bedrooms REAL,
+    bathrooms REAL,
+    category TEXT,
+    square_feet REAL,
+    -- Lower-cased city/state, as the location resolver returns them
+    state_key TEXT,
+    city_key TEXT
+);
+"""
+INDEXES = """
+CREATE INDEX listings_location_price ON listings (state_key, city_key, monthly_price);
+CREATE INDEX listings_bedrooms ON listings (bedrooms);
+"""
+
+
+# ------------------------------
+# WRITING
+# -----------------------------
+
+def _rows(df: pd.DataFrame) -> pd.DataFrame:
+    rows = df.reindex(columns=inventory.OUTPUT_COLUMNS + FILTER_COLUMNS).copy()
+    # Stored at the in-memory store's float32 precision, so budgets and distances
+    # compare exactly as they do there
+    for column in inventory.FLOAT32_COLUMNS:
+        rows[column] = pd.to_numeric(rows[column], errors='coerce').astype(np.float32).astype(np.float64)
+    # Strings like read_csv() makes them, then lower-cased for the index
+    rows['city'] = df['city'].astype(str)
+    rows['state'] = df['state'].astype(str)
+    rows['state_key'] = rows['state'].str.lower()
+    rows['city_key'] = rows['city'].str.lower()
+    return rows
+
+
+def write_sqlite(chunks, sqlite_path: str = SQLITE_PATH) -> int:
+    """
+    Writes cleaned listings to a new SQLite file, replacing the old one atomically.
+
+    Args:
+        chunks: A cleaned DataFrame, or an iterable of them (e.g. from chunked preprocessing),
+                so the file can be written without holding every listing in memory.
+        sqlite_path (str): Where to write the database.
+
+    Returns:
+        int: Number of listings written.
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    count = 0
+
+    def write(tmp_path):
+        nonlocal count
+        # The temp file is new and empty, which SQLite opens as an empty database
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(SCHEMA)
+            for chunk in chunks:
+                rows = _rows(chunk)
+                # NaN -> NULL, numpy scalars -> Python values
+                values = rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None)
+                conn.executemany(f"INSERT INTO listings VALUES ({', '.join('?' * len(rows.columns))})", values)
+                count += len(rows)
+            # Indexes are built once at the end, which is much faster than maintaining them per insert
+            conn.executescript(INDEXES)
+            conn.execute("ANALYZE")
+            conn.commit()
+        finally:
+            conn.close()
+
+    # Running workers keep reading the old file until they refresh
+    inventory.replace_with(sqlite_path, write)
+    return count
+
+
+# ------------------------------
+# READING
+# -----------------------------
+
+class SQLiteInventory:
+    """
+    The listings in a read-only SQLite file, with the same lookups as inventory.Inventory.
+
+    Nothing but the distinct (city, state) pairs (for the location resolver) is held in
+    memory; every query reads the indexed file. Each thread gets its own connection.
+    """
+
+    def __init__(self, sqlite_path: str = SQLITE_PATH, version: str = None):
+        self.sqlite_path = sqlite_path
+        self.version = version
+        self._local = threading.local()
+        pairs = self.connection().execute("SELECT DISTINCT city, state FROM listings").fetchall()
+        self.location_resolver = inventory.LocationResolver(pairs)
+        self._categories = [row[0] for row in self.connection().execute(
+            "SELECT DISTINCT category FROM listings WHERE category IS NOT NULL")]
+        self._count = self.connection().execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+        # The long text is not in the database: it is read from the CSV/snapshot next to it on demand
+        stem = os.path.splitext(sqlite_path)[0]
+        self._text_sources = (stem + ".csv", stem + ".feather")
+        self._text = None
+
+    @classmethod
+    def load(cls, sqlite_path: str = None) -> "SQLiteInventory":
+        sqlite_path = sqlite_path or os.getenv("INVENTORY_SQLITE_PATH", SQLITE_PATH)
+        print(f"📂 Opening apartment database {sqlite_path}...")
+        # Same version as the other data files (preprocessing.py writes them together)
+        store = cls(sqlite_path, inventory.data_version(sqlite_path))
+        print(f"✅ Database ready! {len(store)} listings available.")
+        return store
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            uri = pathlib.Path(self.sqlite_path).resolve().as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True)
+            conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def empty(self) -> bool:
+        return self._count == 0
+
+    def query(self, city: str, state: str, max_budget: float, min_budget: float = None,
+              min_bedrooms: float = None, max_bedrooms: float = None, min_bathrooms: float = None,
+              category: str = None, sort_by: str = "listing", lat: float = None, lng: float = None, k: int = 5):
+        """Same contract as inventory.Inventory.query, with the filters in the WHERE clause."""
+        # The columns hold float32 values, so the bounds are rounded the same way (see _rows)
+        where = ["state_key = ?", "city_key = ?", "monthly_price <= ?"]
+        params = [state.lower().strip(), city.lower().strip(), float(np.float32(max_budget))]
+        for column, op, value in (("monthly_price", ">=", min_budget), ("bedrooms", ">=", min_bedrooms),
+                                  ("bedrooms", "<=", max_bedrooms), ("bathrooms", ">=", min_bathrooms)):
+            if value is not None:
+                where.append(f"{column} {op} ?")
+                params.append(float(np.float32(value)))
+        if category is not None:
+            wanted = inventory.matching_categories(self._categories, category)
+            where.append(f"category IN ({', '.join('?' * len(wanted))})")
+            params += wanted
+
+        # File and price order come straight from the index (SQLite keeps only the top k);
+        # the computed keys are ranked like the in-memory store, over the rows in price order
+        order = {"listing": "rowid", "price": "monthly_price, rowid"}.get(sort_by)
+        sql = (f"SELECT rowid, monthly_price, latitude, longitude, bedrooms FROM listings "
+               f"WHERE {' AND '.join(where)} ORDER BY {order or 'monthly_price, rowid'}")
+        if order:
+            sql += " LIMIT ?"
+            params.append(k)
+        found = np.array(self.connection().execute(sql, params).fetchall(), dtype=np.float64).reshape(-1, 5)
+        block = inventory.Block(found[:, 0].astype(np.intp), found[:, 1], found[:, 2], found[:, 3])
+
+        picks = np.arange(len(found)) if order else inventory.rank(block, found[:, 4], sort_by, k, lat, lng)
+        distances = None
+        if lat is not None and lng is not None:
+            distances = inventory.haversine_km(block.lat[picks], block.lng[picks], lat, lng)
+        return block.rows[picks], distances
+
+    def records(self, rows: np.ndarray) -> pd.DataFrame:
+        """Decodes the given rowids into the columns 'fetch_apartments' returns, in the given order."""
+        rows = [int(row) for row in rows]
+        if not rows:
+            return pd.DataFrame(columns=inventory.OUTPUT_COLUMNS)
+        found = self.connection().execute(
+            f"SELECT rowid, {', '.join(inventory.OUTPUT_COLUMNS)} FROM listings "
+            f"WHERE rowid IN ({', '.join('?' * len(rows))})", rows).fetchall()
+        by_rowid = {row[0]: row[1:] for row in found}
+        df = pd.DataFrame([by_rowid[row] for row in rows], columns=inventory.OUTPUT_COLUMNS, index=rows)
+        # Same rounding as the in-memory store, so both backends return identical JSON
+        df['monthly_price'] = df['monthly_price'].astype(np.float64).round(2)
+        for column in ('latitude', 'longitude'):
+            df[column] = df[column].astype(np.float64).round(6)
+        return df
+
+    def listing_text(self, ids, column: str = 'body') -> pd.Series:
+        """Same contract as inventory.Inventory.listing_text (the text files are read on the first call)."""
+        if self._text is None:
+            self._text = inventory.read_side_text(*self._text_sources)
+        return self._text[column].reindex(ids)
@@ -0,0 +1,337 @@
+# This file contains the built-in tracing and metrics: timed spans around every agent turn,
+# model call and tool call, token and payload counters, and Maps MCP cold/warm timings.
+#
+# Disabled unless one of these is set in .env (read on first use, after load_dotenv):
+#   TELEMETRY_TRACE_PATH     Append one JSON line per finished span to this file
+#   TELEMETRY_METRICS_PORT   Serve Prometheus text metrics on http://127.0.0.1:<port>/metrics
+# When disabled, every hook returns after a single flag check.
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from google.adk.plugins.base_plugin import BasePlugin
+
+METRIC_PREFIX = "apartment_finder_"
+
+# Metric label for the part after ':' in a span name (default: the kind itself)
+SPAN_LABELS = {"llm": "agent", "mcp": "tool"}
+
+_enabled = None  # None until configured from the environment
+_trace_file = None
+_lock = threading.Lock()
+_counters = {}   # (name, labels) -> value
+_summaries = {}  # (name, labels) -> [count, sum, max]
+_gauges = {}     # (name, labels) -> current value
+_open_spans = {}  # key -> (start, name, attrs)
+
+
+def enabled() -> bool:
+    if _enabled is None:
+        configure()
+    return _enabled
+
+
+def configure(trace_path: str = None, metrics_port: int = None):
+    """
+    Turns telemetry on or off. Arguments default to the TELEMETRY_* environment variables.
+    """
+    global _enabled, _trace_file
+    trace_path = trace_path or os.getenv("TELEMETRY_TRACE_PATH")
+    metrics_port = metrics_port or int(os.getenv("TELEMETRY_METRICS_PORT", "0"))
+    with _lock:
+        if _trace_file is not None:
+            _trace_file.close()
+        _trace_file = open(trace_path, "a", buffering=1) if trace_path else None
+    if metrics_port:
+        start_metrics_server(metrics_port)
+    _enabled = bool(trace_path or metrics_port)
+
+
+# -----------------------------
+# RECORDING
+# -----------------------------
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def count(name: str, value: float = 1, **labels):
+    """Adds to a counter."""
+    if not enabled():
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, seconds: float, **labels):
+    """Records one duration in a summary (count, sum and max)."""
+    if not enabled():
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        stats = _summaries.setdefault(key, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+
+
+def gauge(name: str, value: float, **labels):
+    """Sets a value that goes up and down (e.g. a queue depth)."""
+    if not enabled():
+        return
+    with _lock:
+        _gauges[(name, _labels(labels))] = value
+
+
+def start_span(key, name: str, **attrs):
+    """Opens a span that a later end_span(key) closes (for paired before/after hooks)."""
+    if not enabled():
+        return
+    with _lock:
+        _open_spans[key] = (time.perf_counter(), name, attrs)
+
+
+def end_span(key, **attrs):
+    """Closes a span: records its duration under '<kind>_seconds' and writes a trace line."""
+    if not enabled():
+        return
+    with _lock:
+        opened = _open_spans.pop(key, None)
+    if opened is None:
+        return
+    start, name, start_attrs = opened
+    _finish(name, time.perf_counter() - start, {**start_attrs, **attrs})
+
+
+def end_invocation(invocation_id: str, **attrs):
+    """
+    Closes every span still open for an invocation. Its after_* callbacks do not always run: ADK
+    skips them once the invocation has ended (e.g. the research cache answered for the team).
+    """
+    if not enabled():
+        return
+    with _lock:
+        keys = [key for key, (_, _, start_attrs) in _open_spans.items()
+                if start_attrs.get("invocation") == invocation_id]
+        opened = [_open_spans.pop(key) for key in keys]
+    now = time.perf_counter()
+    for start, name, start_attrs in opened:
+        _finish(name, now - start, {**start_attrs, **attrs})
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Times a block of code as a span."""
+    if not enabled():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _finish(name, time.perf_counter() - start, attrs)
+
+
+def record(name: str, seconds: float, **attrs):
+    """Records a span that was timed elsewhere."""
+    if enabled():
+        _finish(name, seconds, attrs)
+
+
+def _finish(name: str, seconds: float, attrs: dict):
+    # 'name' is "<kind>:<label>", e.g. "tool:fetch_apartments"
+    kind, _, label = name.partition(":")
+    labels = {SPAN_LABELS.get(kind, kind): label} if label else {}
+    if "start" in attrs:
+        # Maps MCP calls: "cold" (had to spawn a server) or "warm"
+        labels["start"] = attrs["start"]
+    if "error" in attrs:
+        labels["status"] = "error"
+    observe(f"{kind}_seconds", seconds, **labels)
+    if _trace_file is not None:
+        line = json.dumps({"ts": time.time(), "span": name, "ms": round(seconds * 1000, 3), **attrs}, default=str)
+        with _lock:
+            if _trace_file is not None:
+                _trace_file.write(line + "\n")
+
+
+# -----------------------------
+# ADK CALLBACKS
+# -----------------------------
+# Attached to every agent in agent.py. They only observe (return None), so they never
+# change what the agents do.
+def _payload_bytes(value) -> int:
+    return len(json.dumps(value, separators=(',', ':'), default=str))
+
+
+def before_agent(callback_context):
+    start_span(("agent", callback_context.invocation_id, callback_context.agent_name),
+               f"agent:{callback_context.agent_name}", invocation=callback_context.invocation_id)
+
+
+def after_agent(callback_context):
+    end_span(("agent", callback_context.invocation_id, callback_context.agent_name))
+
+
+def before_model(callback_context, llm_request):
+    start_span(("llm", callback_context.invocation_id, callback_context.agent_name),
+               f"llm:{callback_context.agent_name}", invocation=callback_context.invocation_id)
+
+
+def after_model(callback_context, llm_response):
+    if not enabled():
+        return
+    agent = callback_context.agent_name
+    usage = llm_response.usage_metadata
+    tokens = {}
+    if usage is not None:
+        tokens = {"prompt_tokens": usage.prompt_token_count or 0, "output_tokens": usage.candidates_token_count or 0}
+        count("llm_tokens_total", tokens["prompt_tokens"], agent=agent, type="prompt")
+        count("llm_tokens_total", tokens["output_tokens"], agent=agent, type="output")
+    # Built-in google_search runs inside the model call; count the queries it made
+    grounding = llm_response.grounding_metadata
+    if grounding is not None and grounding.web_search_queries:
+        count("search_queries_total", len(grounding.web_search_queries), agent=agent)
+    end_span(("llm", callback_context.invocation_id, agent), **tokens)
+
+
+def before_tool(tool, args, tool_context):
+    if not enabled():
+        return
+    request_bytes = _payload_bytes(args)
+    count("tool_payload_bytes_total", request_bytes, tool=tool.name, direction="request")
+    start_span(("tool", tool_context.function_call_id), f"tool:{tool.name}",
+               invocation=tool_context.invocation_id, request_bytes=request_bytes)
+
+
+def after_tool(tool, args, tool_context, tool_response):
+    if not enabled():
+        return
+    response_bytes = _payload_bytes(tool_response)
+    count("tool_payload_bytes_total", response_bytes, tool=tool.name, direction="response")
+    end_span(("tool", tool_context.function_call_id), response_bytes=response_bytes)
+
+
+def on_tool_error(tool, args, tool_context, error):
+    end_span(("tool", tool_context.function_call_id), error=repr(error))
+
+
+class TelemetryPlugin(BasePlugin):
+    """Runner plugin that closes the spans an invocation left open (see end_invocation)."""
+
+    def __init__(self):
+        super().__init__(name="telemetry")
+
+    async def after_run_callback(self, *, invocation_context):
+        end_invocation(invocation_context.invocation_id)
+
+    async def on_run_error_callback(self, *, invocation_context, error):
+        end_invocation(invocation_context.invocation_id, error=repr(error))
+
+
+AGENT_CALLBACKS = dict(before_agent_callback=before_agent, after_agent_callback=after_agent)
+LLM_AGENT_CALLBACKS = dict(
+    AGENT_CALLBACKS,
+    before_model_callback=before_model,
+    after_model_callback=after_model,
+    before_tool_callback=before_tool,
+    after_tool_callback=after_tool,
+    on_tool_error_callback=on_tool_error,
+)
+
+
+# -----------------------------
+# EXPORT
+# -----------------------------
+def _format_labels(labels: tuple, **extra) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def render_prometheus() -> str:
+    """Returns every metric in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        summaries = sorted(_summaries.items())
+        gauges = sorted(_gauges.items())
+
+    typed = set()
+    for (name, labels), value in counters:
+        metric = METRIC_PREFIX + name
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+    for (name, labels), value in gauges:
+        metric = METRIC_PREFIX + name
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} gauge")
+            typed.add(metric)
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+    for (name, labels), (n, total, peak) in summaries:
+        metric = METRIC_PREFIX + name
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} summary")
+            typed.add(metric)
+        lines.append(f"{metric}_count{_format_labels(labels)} {n}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {total:.6f}")
+        lines.append(f"{metric}{_format_labels(labels, quantile='1')} {peak:.6f}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> dict:
+    """Returns the current counters, summaries and gauges as plain data (e.g. for benchmarks)."""
+    with _lock:
+        return {
+            "counters": {f"{name}{_format_labels(labels)}": value for (name, labels), value in _counters.items()},
+            "summaries": {f"{name}{_format_labels(labels)}": {"count": n, "sum": total, "max": peak}
+                          for (name, labels), (n, total, peak) in _summaries.items()},
+            "gauges": {f"{name}{_format_labels(labels)}": value for (name, labels), value in _gauges.items()},
+        }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _summaries.clear()
+        _gauges.clear()
+        _open_spans.clear()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are not worth a line on the console
+        pass
+
+
+_metrics_server = None
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1"):
+    """Serves /metrics from a background thread (once per process)."""
+    global _metrics_server
+    if _metrics_server is not None:
+        return
+    try:
+        _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"⚠️ WARNING: Could not serve metrics on port {port}: {e}")
+        return
+    threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"📈 Metrics available at http://{host}:{port}/metrics")
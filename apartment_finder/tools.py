@@ -2,35 +2,56 @@ import pandas as pd
 import json
 import os
 import asyncio
-from mcp import StdioServerParameters, ClientSession
-from mcp.client.stdio import stdio_client
+from typing import Optional
+from . import inventory
+from . import maps_mcp
+from . import commute_cache
 
 # --- GLOBAL DATA LOADING (The "In-Memory Database") ---
-# We load the dataset into memory immediately upon startup.
-# This ensures that agent queries are instant (O(1) lookup) rather than reading from disk every time.
+# The dataset is loaded lazily on the first tool call (see inventory.get_inventory),
+# preferring the binary snapshot over parsing the CSV. After that it stays in memory,
+# so agent queries are instant lookups rather than reading from disk every time.
 
-DATA_PATH = os.path.join("data", "apartments_cleaned.csv")
+DATA_PATH = inventory.DATA_PATH
+
+# --- DISTANCE MATRIX SETTINGS ---
+# The Distance Matrix API accepts at most 25 origins and 100 elements (origins x destinations)
+# per request, so larger batches are split into chunks of this size.
+MAX_ORIGINS_PER_REQUEST = 25
+MAX_ELEMENTS_PER_REQUEST = 100
+# Chunks in flight at once (MAPS_CHUNK_CONCURRENCY in .env; default: one per pooled server)
+CHUNK_CONCURRENCY = None
+
+# --- TOOL OUTPUT SETTINGS ---
+# How results are encoded for the model, overridable from .env:
+#   TOOL_OUTPUT_FORMAT        records (default): one JSON object per listing, Maps' own response shape
+#                             compact: a header row plus one array per listing or origin, with
+#                             coordinates rounded and commutes reduced to origin, seconds and meters
+#   FETCH_APARTMENTS_FORMAT   Overrides TOOL_OUTPUT_FORMAT for 'fetch_apartments' only
+#   CHECK_COMMUTES_FORMAT     Overrides TOOL_OUTPUT_FORMAT for 'check_commutes' only
+OUTPUT_FORMAT = "records"
+OUTPUT_FORMATS = ("records", "compact")
+# ~1 m, plenty to find the listing again and to route from it
+COMPACT_COORDINATE_DECIMALS = 5
+# Listing texts are cut to this many characters, enough for the amenities without the boilerplate
+LISTING_DETAILS_MAX_CHARS = 1500
 
-try:
-    print(f"📂 Loading apartment data from {DATA_PATH}...")
-    df = pd.read_csv(DATA_PATH)
-    print(f"✅ Data loaded! {len(df)} listings available.")
-    
-    # Ensure state/city are string types to prevent errors during filtering
-    df['city'] = df['city'].astype(str)
-    df['state'] = df['state'].astype(str)
 
-except FileNotFoundError:
-    print(f"❌ ERROR: Could not find {DATA_PATH}. Please run your preprocessing script first.")
-    # Create an empty DF to prevent the tool from crashing the app entirely
-    df = pd.DataFrame()
+def output_format(tool_name: str) -> str:
+    """The output format for a tool: its own <TOOL>_FORMAT setting, else TOOL_OUTPUT_FORMAT."""
+    value = (os.getenv(f"{tool_name.upper()}_FORMAT") or os.getenv("TOOL_OUTPUT_FORMAT") or OUTPUT_FORMAT).lower().strip()
+    return value if value in OUTPUT_FORMATS else OUTPUT_FORMAT
 
 
 # ------------------------------
 # CUSTOM FUNCTION DEFINITIONS
 # -----------------------------
 
-def fetch_apartments(city: str, state: str, max_budget: float):
+def fetch_apartments(city: str, state: str, max_budget: float,
+                     landmark_lat: Optional[float] = None, landmark_lng: Optional[float] = None,
+                     min_budget: Optional[float] = None, min_bedrooms: Optional[float] = None,
+                     max_bedrooms: Optional[float] = None, min_bathrooms: Optional[float] = None,
+                     category: Optional[str] = None, sort_by: Optional[str] = None):
     """
     Queries the local database for apartments matching the location and budget.
     
@@ -38,55 +59,268 @@ def fetch_apartments(city: str, state: str, max_budget: float):
         city (str): The target city (e.g., 'Austin')
         state (str): The target state abbreviation (e.g., 'TX')
         max_budget (float): The maximum monthly rent the user is willing to pay.
+        landmark_lat (float, optional): Latitude of the commute landmark.
+        landmark_lng (float, optional): Longitude of the commute landmark.
+            When both are given, the 5 apartments closest to the landmark are returned
+            (nearest first) instead of the first 5 matches.
+        min_budget (float, optional): The minimum monthly rent.
+        min_bedrooms (float, optional): Minimum number of bedrooms (0 is a studio).
+        max_bedrooms (float, optional): Maximum number of bedrooms (equal to min_bedrooms for an exact count).
+        min_bathrooms (float, optional): Minimum number of bathrooms.
+        category (str, optional): Property type: 'apartment', 'home', 'condo' or 'short_term'.
+        sort_by (str, optional): Which 5 to return: 'price' (cheapest), 'price_per_bedroom',
+            'distance' (closest to the landmark; needs its coordinates) or 'listing'.
+            Defaults to 'distance' with a landmark and 'listing' without.
         
     Returns:
         str: A JSON string containing the Top 5 matching apartments with 
-             id, description, price, address, city, state, latitude, and longitude.
+             id, description, price, address, city, state, latitude, and longitude
+             (plus 'distance_km' to the landmark, when given).
+             If the city or state had to be corrected (e.g. 'Austn' -> 'Austin'), the list is
+             wrapped as {"resolved": "Austin, TX", "requested": "Austn, TX", "results": [...]}.
+             In the compact format (see TOOL_OUTPUT_FORMAT), a header row plus one array per apartment.
     """
+    db = inventory.get_inventory()
+
     # Fail fast if DB is empty
-    if df.empty:
+    if db.empty:
         return json.dumps({"error": "Database is unavailable."})
 
-    # Normalize inputs for comparison (lowercase, stripped)
-    target_city = city.lower().strip()
-    target_state = state.lower().strip()
-    
-    # Apply Filters
-    # We look for exact state match and city match, plus budget.
-    matches = df[
-        (df['city'].str.lower() == target_city) & 
-        (df['state'].str.lower() == target_state) &
-        (df['monthly_price'] <= max_budget)
-    ]
+    near_landmark = landmark_lat is not None and landmark_lng is not None
+    sort_by = (sort_by or ("distance" if near_landmark else "listing")).lower().strip()
+    if sort_by not in inventory.SORT_KEYS:
+        return json.dumps({"error": f"Unknown sort_by '{sort_by}'. Use one of: {', '.join(inventory.SORT_KEYS)}."})
+    if sort_by == "distance" and not near_landmark:
+        return json.dumps({"error": "sort_by 'distance' needs landmark_lat and landmark_lng."})
+
+    # Map the input to a city of the data first ("Austn" -> "Austin", "Texas" -> "TX"),
+    # so a typo costs a dictionary lookup instead of another model and tool round trip
+    location = db.location_resolver.resolve(city, state)
+    if location is None:
+        suggestions = db.location_resolver.suggest(city, state)
+        return json.dumps({
+            "message": f"No apartments found in {city}, {state}." + (
+                f" Did you mean: {'; '.join(suggestions)}?" if suggestions else ""),
+            "count": 0
+        })
+    state_key, city_key = location
+
+    # Look up the city block, binary search it on price, filter what is left and
+    # partially sort it: ranking by distance keeps only the most promising origins
+    # for the Maps API, ranking by price never sorts the whole city
+    filters = {"min_budget": min_budget, "min_bedrooms": min_bedrooms, "max_bedrooms": max_bedrooms,
+               "min_bathrooms": min_bathrooms, "category": category}
+    filters = {name: value for name, value in filters.items() if value is not None}
+    rows, distances = db.query(city_key, state_key, max_budget, **filters, sort_by=sort_by,
+                               lat=landmark_lat if near_landmark else None,
+                               lng=landmark_lng if near_landmark else None, k=5)
     
     # Handle "No Results"
-    if matches.empty:
+    if len(rows) == 0:
         return json.dumps({
-            "message": f"No apartments found in {city}, {state} under ${max_budget}.",
+            "message": f"No apartments found in {db.location_resolver.display(location)} under ${max_budget}" + (
+                f" with {', '.join(f'{name}={value}' for name, value in filters.items())}." if filters else "."),
             "count": 0
         })
 
     # Select Output Columns (Token Optimization)
     # We select ONLY the columns the agent needs to reason and call the next tool.
     # 'latitude' and 'longitude' are crucial for the subsequent Maps MCP call.
-    results = matches[[
-        'id', 
-        'agent_description', 
-        'monthly_price', 
-        'address',
-        'city',
-        'state', 
-        'latitude', 
-        'longitude'
-    ]].head(5) # STRICT LIMIT: Only top 5 to save on tokens
+    # STRICT LIMIT: The index returns only the top 5 to save on tokens
+    results = db.records(rows)
+    if near_landmark:
+        results = results.assign(distance_km=distances.round(2))
     
-    # Return as JSON
+    corrected = location != (state.lower().strip(), city.lower().strip())
+    if output_format("fetch_apartments") == "compact":
+        return listings_table(results, db.location_resolver.display(location) if corrected else None,
+                                f"{city}, {state}")
+
+    # Return as JSON (with the correction, so the agent reports the city it actually searched)
+    if corrected:
+        return json.dumps({
+            "resolved": db.location_resolver.display(location),
+            "requested": f"{city}, {state}",
+            "results": json.loads(results.to_json(orient="records")),
+        })
     return results.to_json(orient="records")
 
 
+def listings_table(results: pd.DataFrame, resolved: str = None, requested: str = None) -> str:
+    """
+    Encodes 'fetch_apartments' results as one header row plus one array per listing.
+
+    City and state are the same for every listing, so they are given once, and the
+    descriptions drop their "in <city>, <state>" ending. Coordinates are rounded to
+    COMPACT_COORDINATE_DECIMALS.
+
+    Example:
+        {"city": "Austin", "state": "TX",
+         "columns": ["id", "agent_description", "monthly_price", "address", "latitude", "longitude"],
+         "rows": [[101, "1 Bed, 1 Bath apartment", 1450.0, "12 Main St", 30.26712, -97.74301], ...]}
+    """
+    city, state = results['city'].iloc[0], results['state'].iloc[0]
+    suffix = f" in {city}, {state}"
+    rows = results.drop(columns=['city', 'state']).assign(
+        agent_description=[desc.removesuffix(suffix) if isinstance(desc, str) else desc
+                           for desc in results['agent_description']],
+        latitude=results['latitude'].round(COMPACT_COORDINATE_DECIMALS),
+        longitude=results['longitude'].round(COMPACT_COORDINATE_DECIMALS),
+    )
+    encoded = {"city": city, "state": state, "columns": list(rows.columns), "rows": json.loads(rows.to_json(orient="values"))}
+    if resolved:
+        encoded = {"resolved": resolved, "requested": requested, **encoded}
+    return json.dumps(encoded, separators=(',', ':'))
+
+
+def parse_listings(result: str) -> list:
+    """
+    Returns the listings in a 'fetch_apartments' result: the plain list, the "results" of a
+    corrected location, the rows of a compact result (as the same dicts), or an empty list
+    for "No apartments found" and errors.
+    """
+    try:
+        data = json.loads(result)
+    except (TypeError, ValueError):
+        return []
+    if isinstance(data, dict) and "columns" in data:
+        return [{**dict(zip(data["columns"], row)), "city": data.get("city"), "state": data.get("state")}
+                for row in data.get("rows", [])]
+    if isinstance(data, dict):
+        data = data.get("results", [])
+    return data if isinstance(data, list) else []
+
+
+def get_listing_details(listing_ids: list[int]) -> str:
+    """
+    Looks up the full listing text (amenities, pets, parking, ...) of apartments by id.
+
+    Args:
+        listing_ids (list[int]): The 'id' values of apartments returned by 'fetch_apartments'.
+
+    Returns:
+        str: A JSON list of {"id": ..., "details": "..."} in the order given. 'details' is
+             null for an unknown id or a listing without text, and is cut to
+             LISTING_DETAILS_MAX_CHARS characters.
+    """
+    db = inventory.get_inventory()
+
+    # Fail fast if DB is empty
+    if db.empty:
+        return json.dumps({"error": "Database is unavailable."})
+
+    try:
+        ids = [int(listing_id) for listing_id in listing_ids]
+    except (TypeError, ValueError):
+        return json.dumps({"error": "listing_ids must be a list of listing ids."})
+
+    # The text lives in a side file that is only read on the first call (see Inventory.listing_text)
+    texts = db.listing_text(ids)
+    return json.dumps([
+        {"id": listing_id, "details": text[:LISTING_DETAILS_MAX_CHARS] if isinstance(text, str) else None}
+        for listing_id, text in zip(ids, texts)
+    ])
+
+
+def commutes_table(merged: dict) -> str:
+    """
+    Encodes a 'check_commutes' result as one array per origin: [origin position, seconds, meters].
+    Origins without a route (or whose chunk failed) get nulls; chunk errors are kept.
+
+    Example:
+        {"destination": "Austin-Bergstrom International Airport", "columns": ["origin", "seconds", "meters"],
+         "rows": [[0, 1380, 15234], [1, null, null]]}
+    """
+    rows = []
+    for i, row in enumerate(merged["results"]):
+        element = row["elements"][0]
+        if element.get("status") == "OK":
+            rows.append([i, element["duration"]["value"], element["distance"]["value"]])
+        else:
+            rows.append([i, None, None])
+    encoded = {"destination": merged["destination_addresses"][0] if merged["destination_addresses"] else None,
+               "columns": ["origin", "seconds", "meters"], "rows": rows}
+    if "errors" in merged:
+        encoded["errors"] = merged["errors"]
+    return json.dumps(encoded, separators=(',', ':'))
+
+
+def _duration_text(seconds: float) -> str:
+    minutes = max(1, round(seconds / 60))
+    hours, minutes = divmod(minutes, 60)
+    # Written like Maps' own texts ("1 hour 5 mins", "23 mins")
+    parts = []
+    if hours:
+        parts.append(f"{hours} hour{'s' if hours > 1 else ''}")
+    if minutes:
+        parts.append(f"{minutes} min{'s' if minutes > 1 else ''}")
+    return " ".join(parts)
+
+
+def parse_commutes(result: str) -> list:
+    """
+    Returns one entry per origin of a 'check_commutes' result (either format), in input order:
+    {"seconds", "meters", "duration", "distance"} with readable texts, or None if there is no route.
+    An error text gives an empty list.
+    """
+    try:
+        data = json.loads(result)
+        if "columns" in data:
+            return [{"seconds": seconds, "meters": meters, "duration": _duration_text(seconds),
+                     "distance": f"{meters / 1000:.1f} km"} if seconds is not None else None
+                    for _, seconds, meters in data["rows"]]
+        elements = [row["elements"][0] for row in data["results"]]
+    except (TypeError, ValueError, KeyError, IndexError, AttributeError):
+        return []
+    return [{"seconds": e["duration"]["value"], "meters": e["distance"]["value"],
+             "duration": e["duration"]["text"], "distance": e["distance"]["text"]} if e.get("status") == "OK" else None
+            for e in elements]
+
+
+
+async def _distance_matrix_chunk(origins: list[str], destination: str, mode: str, limit: asyncio.Semaphore) -> dict:
+    """
+    Sends one API-sized chunk of origins to the Maps MCP server.
+
+    Returns:
+        dict: The parsed Maps response, checked to have one row per origin.
+
+    Raises:
+        ConnectionError: The MCP server could not be reached.
+        ValueError: Maps answered with an error or an unexpected shape (message = what to show the agent).
+    """
+    async with limit:
+        try:
+            # Call the 'maps_distance_matrix' tool on a warm server from the shared pool
+            result = await maps_mcp.get_pool().call_tool(
+                "maps_distance_matrix",
+                arguments={
+                    "origins": origins,
+                    "destinations": [destination],
+                    "mode": mode
+                }
+            )
+        except Exception as e:
+            raise ConnectionError(f"Error connecting to Maps MCP: {str(e)}") from e
+
+    # Extract raw text (containing \n)
+    raw_text = result.content[0].text
+    try:
+        data = json.loads(raw_text)
+    except json.JSONDecodeError:
+        # If Maps returns an error message (not JSON), pass the raw text on
+        raise ValueError(raw_text)
+    try:
+        if len(data["origin_addresses"]) < len(origins) or len(data["results"]) < len(origins) \
+                or not data["destination_addresses"]:
+            raise IndexError
+        for row in data["results"][:len(origins)]:
+            row["elements"][0]
+    except (KeyError, IndexError, TypeError, AttributeError):
+        # Unexpected response shape: pass it on minified, without caching
+        raise ValueError(json.dumps(data, separators=(',', ':')))
+    return data
 
-# Path to the local MCP server file (relative to project root)
-SERVER_PATH = os.path.join(os.getcwd(), "node_modules", "@modelcontextprotocol", "server-google-maps", "dist", "index.js")
 
 async def check_commutes(origins: list[str], destination: str, mode: str = "driving"):
     """
@@ -94,50 +328,83 @@ async def check_commutes(origins: list[str], destination: str, mode: str = "driv
     
     Args:
         origins: A list of lat/lng strings (e.g., ["30.26,-97.74", "30.50,-97.60"])
+            Any number of origins: they are sent to Maps in chunks of at most 25, concurrently.
         destination: The target landmark name or address (e.g., "Austin Airport")
         mode: Transport mode (default: "driving")
         
     Returns:
-        str: A raw JSON string containing distance and duration for each origin.
+        str: A raw JSON string containing distance and duration for each origin, in input order.
+             If some chunks fail, their origins get the status "UNKNOWN_ERROR" and an "errors"
+             list gives the failed origin positions and the reason.
+             In the compact format (see TOOL_OUTPUT_FORMAT), one [origin, seconds, meters] row per origin.
     """
-    print(f"   🔌 MCP: Checking commutes for {len(origins)} locations to '{destination}'...")
+    # Only origins without a cached result for this destination/mode go to Maps
+    cache = commute_cache.get_cache()
+    keys = [cache.key(origin, destination, mode) for origin in origins]
+    entries = cache.get_many(keys)
+    # One request per distinct key, even if the agent repeats an origin
+    pending = {}
+    for origin, key in zip(origins, keys):
+        if key not in entries:
+            pending.setdefault(key, origin)
 
-    # Configure the Server Process
-    server_params = StdioServerParameters(
-        command="node", 
-        args=[SERVER_PATH],
-        env={"GOOGLE_MAPS_API_KEY": os.getenv("GOOGLE_MAPS_API_KEY")}
-    )
+    print(f"   🔌 MCP: Checking commutes for {len(origins)} locations to '{destination}' ({len(origins) - len(pending)} cached)...")
 
-    try:
-        # Connect to the Server
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                
-                # Call the 'maps_distance_matrix' tool
-                # This single call processes ALL origins against the destination
-                result = await session.call_tool(
-                    "maps_distance_matrix", 
-                    arguments={
-                        "origins": origins, 
-                        "destinations": [destination],
-                        "mode": mode
-                    }
-                )
-                
-                # Extract raw text (containing \n)
-                raw_text = result.content[0].text
-                
-                # Parse and re-dump to remove \n and spaces
-                # This ensures the Agent gets valid, compact JSON
-                try:
-                    data = json.loads(raw_text)
-                    return json.dumps(data, separators=(',', ':')) # Minified JSON
-                except json.JSONDecodeError:
-                    # If Maps returns an error message (not JSON), return raw text
-                    return raw_text
-                
-
-    except Exception as e:
-        return f"Error connecting to Maps MCP: {str(e)}"
\ No newline at end of file
+    failures = []  # (keys of the chunk, message)
+    if pending:
+        # Split the missing origins into API-sized chunks and send them concurrently
+        size = min(MAX_ORIGINS_PER_REQUEST, MAX_ELEMENTS_PER_REQUEST)  # one destination per origin
+        pending_keys = list(pending)
+        chunks = [pending_keys[i:i + size] for i in range(0, len(pending_keys), size)]
+        concurrency = CHUNK_CONCURRENCY or int(os.getenv("MAPS_CHUNK_CONCURRENCY", "0")) or maps_mcp.get_pool().size
+        limit = asyncio.Semaphore(concurrency)
+        outcomes = await asyncio.gather(
+            *(_distance_matrix_chunk([pending[key] for key in chunk], destination, mode, limit) for chunk in chunks),
+            return_exceptions=True,
+        )
+
+        # Split each response into one entry per origin
+        fresh = {}
+        for chunk, outcome in zip(chunks, outcomes):
+            if isinstance(outcome, (ConnectionError, ValueError)):
+                failures.append((chunk, str(outcome)))
+                continue
+            if isinstance(outcome, BaseException):
+                raise outcome
+            for i, key in enumerate(chunk):
+                entry = {
+                    "origin_address": outcome["origin_addresses"][i],
+                    "destination_address": outcome["destination_addresses"][0],
+                    "element": outcome["results"][i]["elements"][0],
+                }
+                entries[key] = entry
+                # Only successful lookups are worth keeping (not NOT_FOUND, ZERO_RESULTS, ...)
+                if entry["element"].get("status") == "OK":
+                    fresh[key] = entry
+        cache.put_many(fresh)
+
+        if failures and not entries:
+            # Nothing to show at all: report the error as before
+            return failures[0][1]
+        for chunk, message in failures:
+            for key in chunk:
+                entries[key] = {"origin_address": pending[key], "destination_address": None,
+                                "element": {"status": "UNKNOWN_ERROR"}}
+
+    # Merge cached and fresh results back into the original order, in the Maps response shape
+    resolved = [entries[key]["destination_address"] for key in keys if entries[key]["destination_address"]]
+    merged = {
+        "origin_addresses": [entries[key]["origin_address"] for key in keys],
+        "destination_addresses": [resolved[0] if resolved else destination] if keys else [],
+        "results": [{"elements": [entries[key]["element"]]} for key in keys],
+    }
+    if failures:
+        # Which origins (positions in the input) are missing, and why
+        merged["errors"] = []
+        for chunk, message in failures:
+            failed = set(chunk)
+            merged["errors"].append({"origins": [i for i, key in enumerate(keys) if key in failed], "error": message})
+    if output_format("check_commutes") == "compact":
+        return commutes_table(merged)
+    # Minified JSON, so the Agent gets valid, compact JSON
+    return json.dumps(merged, separators=(',', ':'))
\ No newline at end of file
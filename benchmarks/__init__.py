@@ -0,0 +1 @@
+# Offline benchmark scripts. Run from the project root, e.g. `python -m benchmarks.fetch_apartments`
@@ -0,0 +1,90 @@
+# This benchmark measures process cold start: parsing the CSV vs. loading the binary snapshot vs. attaching
+# to the inventory another process published in shared memory (INVENTORY_BACKEND=shared)
+import json
+import os
+import subprocess
+import sys
+from apartment_finder import inventory
+
+# Runs in a fresh interpreter so every measurement starts cold
+CHILD_SCRIPT = """
+import json, resource, sys, time
+
+start = time.perf_counter()
+from apartment_finder import inventory, tools
+imported = time.perf_counter()
+
+if sys.argv[1] == "shared":
+    from apartment_finder import shared_store
+    db = shared_store.SharedInventory.attach()
+else:
+    snapshot_path = inventory.SNAPSHOT_PATH if sys.argv[1] == "snapshot" else None
+    db = inventory.Inventory.load(snapshot_path=snapshot_path)
+# One query, so the shared mode's first page faults are included
+inventory._inventory = db
+tools.fetch_apartments("Austin", "TX", 2500)
+loaded = time.perf_counter()
+
+# Linux reports ru_maxrss in KiB, macOS in bytes
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+peak_mb = peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+# Memory only this process uses (shared pages excluded), where Linux reports it
+private_mb = None
+try:
+    with open("/proc/self/smaps_rollup") as f:
+        private_mb = sum(int(line.split()[1]) for line in f if line.startswith(("Private_Clean", "Private_Dirty"))) / 1024
+except OSError:
+    pass
+print(json.dumps({
+    "rows": len(db),
+    "import_s": imported - start,
+    "load_s": loaded - imported,
+    "peak_rss_mb": peak_mb,
+    "private_mb": private_mb,
+}))
+"""
+REPEATS = 3
+
+
+def measure(mode):
+    runs = []
+    for _ in range(REPEATS):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD_SCRIPT, mode],
+            capture_output=True, text=True, check=True,
+        )
+        # The loader prints progress lines; the JSON result is the last line
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    # Report the fastest run of each mode
+    return min(runs, key=lambda r: r["load_s"])
+
+
+def run_benchmark():
+    if not os.path.exists(inventory.DATA_PATH):
+        print(f"❌ Error: Could not find {inventory.DATA_PATH}. Please run the preprocessing script first.")
+        return
+
+    if not inventory.snapshot_is_fresh():
+        print("📦 Writing binary snapshot...")
+        if not inventory.write_snapshot(inventory.read_csv()):
+            return
+
+    # The loader's side of the shared mode: publish once, as 'python -m apartment_finder.shared_store' does
+    from apartment_finder import shared_store
+    segment = shared_store.publish(inventory.Inventory.load())
+
+    print(f"🧪 Measuring cold start ({REPEATS} runs each, fastest shown)...")
+    print(f"   {'mode':<10}{'rows':>10}{'import (s)':>12}{'load (s)':>10}{'peak RSS (MB)':>15}{'private (MB)':>14}")
+    try:
+        for mode in ("csv", "snapshot", "shared"):
+            r = measure(mode)
+            private = f"{r['private_mb']:>14.1f}" if r['private_mb'] is not None else f"{'n/a':>14}"
+            print(f"   {mode:<10}{r['rows']:>10}{r['import_s']:>12.2f}{r['load_s']:>10.2f}{r['peak_rss_mb']:>15.1f}{private}")
+    finally:
+        os.remove(shared_store.MANIFEST_PATH)
+        segment.close()
+        segment.unlink()
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,333 @@
+# This benchmark drives the whole agent (manager -> ResearchTeam: analyst, reviewer, summarizer) offline.
+#
+# The Gemini model is replaced by a scripted model that makes the same tool calls a real run
+# would, 'check_commutes' talks to the stub Maps MCP server, and 'google_search' is a canned
+# function. Nothing touches the network, so results are comparable between runs.
+#
+# Usage (from the project root, with the cleaned data in data/):
+#   python -m benchmarks.end_to_end                                   # 1, 4 and 16 concurrent sessions
+#   python -m benchmarks.end_to_end --sessions 1 8 32 --llm-latency-ms 200 --output e2e.json
+#   python -m benchmarks.end_to_end --mode parallel --llm-latency-ms 200   # RESEARCH_MODE=parallel team
+#   python -m benchmarks.end_to_end --caches cold                     # Only the uncached runs
+#
+# Every concurrency level starts from empty commute and safety caches and is run twice:
+# cold (every commute and neighborhood looked up) and warm (the same sessions again, now
+# answered from the caches). Both are reported separately.
+#
+# The machine-readable results (per-stage latency, tool calls, tool payload bytes, throughput)
+# are written to --output as JSON. With TELEMETRY_TRACE_PATH set, the agent's own spans and
+# counters are included as well.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import tempfile
+import time
+from collections import defaultdict
+from typing import Callable
+
+# The agent reads its Maps server from the environment when the pool is created
+os.environ.setdefault("MAPS_MCP_SERVER", os.path.join(os.getcwd(), "benchmarks", "stub_maps_server.py"))
+os.environ.setdefault("INVENTORY_REFRESH_INTERVAL", "0")
+
+from google.adk.agents import LlmAgent, SequentialAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.adk.tools import FunctionTool
+from google.genai import types
+from apartment_finder import (agent, commute_cache, inventory, maps_mcp, parallel_research, safety_cache, telemetry,
+                              tools)
+
+OUTPUT_PATH = "end_to_end_results.json"
+CACHE_MODES = {"cold": ["cold"], "warm": ["warm"], "both": ["cold", "warm"]}
+
+# (city, state, max_budget, commute destination); sessions cycle through these
+SCENARIOS = [
+    ("Austin", "TX", 2500, "University of Texas at Austin"),
+    ("Dallas", "TX", 1800, "Dallas Love Field"),
+    ("Houston", "TX", 2000, "Texas Medical Center"),
+    ("San Antonio", "TX", 1500, "The Alamo"),
+    ("Los Angeles", "CA", 3000, "Santa Monica Pier"),
+    ("Denver", "CO", 2200, "Union Station"),
+    ("Atlanta", "GA", 1900, "Georgia Tech"),
+    ("Seattle", "WA", 2800, "Pike Place Market"),
+]
+
+DOSSIER_ADDRESS = re.compile(r"^- (.+): \$", re.MULTILINE)
+REQUEST_PATTERN = re.compile(r"in (?P<city>[^,]+), (?P<state>[A-Z]{2}) under \$(?P<budget>\d+), commuting to (?P<destination>[^.]+)")
+
+
+def user_message(scenario) -> str:
+    city, state, budget, destination = scenario
+    return f"I'm moving and need a place in {city}, {state} under ${budget}, commuting to {destination}."
+
+
+# -----------------------------
+# SCRIPTED MODEL
+# -----------------------------
+class ScriptedModel(BaseLlm):
+    """
+    A stand-in for Gemini that answers from a script instead of the API.
+
+    The script gets the LlmRequest and returns the parts of the next model turn
+    (text or function calls), so each agent follows the path a real run takes.
+    """
+
+    script: Callable
+    latency: float = 0.0
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        prompt_bytes = len(json.dumps([c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents]))
+        llm_stats["calls"][self.model] += 1
+        llm_stats["prompt_bytes"][self.model] += prompt_bytes
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        # Token counts are estimated at ~4 bytes per token
+        usage = types.GenerateContentResponseUsageMetadata(prompt_token_count=prompt_bytes // 4, candidates_token_count=0)
+        yield LlmResponse(content=types.Content(role="model", parts=self.script(llm_request)), usage_metadata=usage)
+
+
+llm_stats = {"calls": defaultdict(int), "prompt_bytes": defaultdict(int)}
+
+
+def call(name: str, **args) -> types.Part:
+    return types.Part(function_call=types.FunctionCall(name=name, args=args))
+
+
+def requirements(llm_request) -> dict:
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            match = part.text and REQUEST_PATTERN.search(part.text)
+            if match:
+                return match.groupdict()
+    raise ValueError("Scripted model could not find the user's requirements")
+
+
+def responses(llm_request) -> dict:
+    # The agent's own tool results, by tool name (other agents' calls only appear as text)
+    found = {}
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            if part.function_response:
+                found[part.function_response.name] = part.function_response.response
+    return found
+
+
+def manager_script(llm_request):
+    # The JSON handoff, then the transfer (as MANAGER_PROMPT asks)
+    wanted = requirements(llm_request)
+    handoff = {"city": wanted["city"], "state": wanted["state"], "budget": int(wanted["budget"]),
+               "landmark": wanted["destination"]}
+    return [types.Part(text=json.dumps(handoff)), call("transfer_to_agent", agent_name=agent.research_team.name)]
+
+
+def analyst_script(llm_request):
+    wanted, done = requirements(llm_request), responses(llm_request)
+    if "fetch_apartments" not in done:
+        return [call("fetch_apartments", city=wanted["city"], state=wanted["state"], max_budget=float(wanted["budget"]))]
+
+    listings = tools.parse_listings(done["fetch_apartments"].get("result"))
+    if listings and "check_commutes" not in done:
+        origins = [f"{apt['latitude']},{apt['longitude']}" for apt in listings]
+        return [call("check_commutes", origins=origins, destination=wanted["destination"], mode="driving")]
+
+    lines = [f"- {apt['address']}: ${apt['monthly_price']}" for apt in listings]
+    return [types.Part(text="Analyst dossier:\n" + ("\n".join(lines) or "No apartments found."))]
+
+
+def reviewer_script(llm_request):
+    wanted, done = requirements(llm_request), responses(llm_request)
+    if "google_search" not in done:
+        return [call("google_search", query=f"{wanted['city']} {wanted['state']} neighborhood safety reviews")]
+    # Report a finding for every dossier address, in the format REVIEWER_PROMPT asks for
+    addresses = DOSSIER_ADDRESS.findall(str(llm_request.config.system_instruction))
+    findings = [{"address": address, "finding": done["google_search"]["result"]} for address in addresses]
+    return [types.Part(text=f"Safety report for {wanted['city']}.\nSAFETY_FINDINGS: {json.dumps(findings)}")]
+
+
+def summarizer_script(llm_request):
+    wanted = requirements(llm_request)
+    return [types.Part(text=f"Here are the best apartments in {wanted['city']}, {wanted['state']} for your commute.")]
+
+
+def neighborhood_script(llm_request):
+    # Parallel mode: one grounded search per neighborhood, answered with a short finding
+    return [types.Part(text="Residents rate the area as generally safe; no recent incident reports found.")]
+
+
+def google_search(query: str) -> str:
+    """Searches the web (offline stand-in returning a canned result)."""
+    return f"Residents of the area rate it as generally safe; no recent incident reports found for '{query}'."
+
+
+def build_agent(latency: float, mode: str = "sequential") -> LlmAgent:
+    """A copy of 'root_agent' with scripted models and an offline 'google_search'."""
+    def model(name, script):
+        return ScriptedModel(model=name, script=script, latency=latency)
+
+    summarizer = agent.summarizer.clone(update={"model": model("summarizer", summarizer_script)})
+    if mode == "parallel":
+        research_team = parallel_research.build_research_team(
+            model("neighborhood_reviewer", neighborhood_script), summarizer, **agent.research_team_callbacks)
+    else:
+        analyst = agent.analyst.clone(update={"model": model("analyst", analyst_script)})
+        reviewer = agent.reviewer.clone(update={"model": model("reviewer", reviewer_script),
+                                                "tools": [FunctionTool(google_search)]})
+        research_team = SequentialAgent(name=agent.research_team.name, description=agent.research_team.description,
+                                        sub_agents=[analyst, reviewer, summarizer], **agent.research_team_callbacks)
+    return agent.root_agent.clone(update={"model": model("manager", manager_script), "sub_agents": [research_team]})
+
+
+# -----------------------------
+# MEASUREMENT
+# -----------------------------
+def payload_bytes(value) -> int:
+    return len(json.dumps(value, separators=(',', ':'), default=str))
+
+
+async def run_session(runner, scenario, tool_stats, stage_seconds) -> float:
+    """Runs one full conversation turn and records per-stage and per-tool numbers."""
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id="bench")
+    content = types.Content(role="user", parts=[types.Part(text=user_message(scenario))])
+
+    start = stage_start = time.perf_counter()
+    stage, calls_started = None, {}
+    async for event in runner.run_async(user_id="bench", session_id=session.id, new_message=content):
+        now = time.perf_counter()
+        if event.author != stage:
+            if stage is not None:
+                stage_seconds[stage].append(now - stage_start)
+            stage, stage_start = event.author, now
+        for fc in event.get_function_calls():
+            calls_started[fc.id] = now
+            tool_stats[fc.name]["calls"] += 1
+            tool_stats[fc.name]["request_bytes"] += payload_bytes(fc.args)
+        for fr in event.get_function_responses():
+            tool_stats[fr.name]["response_bytes"] += payload_bytes(fr.response)
+            tool_stats[fr.name]["seconds"].append(now - calls_started.pop(fr.id, now))
+    end = time.perf_counter()
+    if stage is not None:
+        stage_seconds[stage].append(end - stage_start)
+    return end - start
+
+
+def percentiles(values: list) -> dict:
+    values = sorted(values)
+    if not values:
+        return {}
+    pick = lambda q: values[min(len(values) - 1, int(len(values) * q))]
+    return {"p50_ms": pick(0.5) * 1000, "p95_ms": pick(0.95) * 1000, "max_ms": values[-1] * 1000}
+
+
+def fresh_caches():
+    """Swaps in empty commute and safety caches (in new temp files), so the next run starts cold."""
+    directory = tempfile.mkdtemp()
+    commute_cache._cache = commute_cache.CommuteCache(path=os.path.join(directory, "commute_cache.sqlite"))
+    safety_cache._cache = safety_cache.SafetyCache(path=os.path.join(directory, "safety_cache.sqlite"))
+
+
+async def run_level(runner, concurrency: int, turns: int) -> dict:
+    """Runs 'turns' sessions with 'concurrency' of them in flight at once."""
+    maps_calls = maps_mcp.get_pool().stats["calls"]
+    for key in llm_stats:
+        llm_stats[key].clear()
+    tool_stats = defaultdict(lambda: {"calls": 0, "request_bytes": 0, "response_bytes": 0, "seconds": []})
+    stage_seconds = defaultdict(list)
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with limit:
+            latencies.append(await run_session(runner, SCENARIOS[i % len(SCENARIOS)], tool_stats, stage_seconds))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(turns)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "sessions": turns,
+        "seconds": elapsed,
+        "sessions_per_second": turns / elapsed,
+        "turn_latency": percentiles(latencies),
+        "stages": {name: percentiles(values) for name, values in stage_seconds.items()},
+        "tools": {name: {**{k: v for k, v in stats.items() if k != "seconds"}, **percentiles(stats["seconds"])}
+                  for name, stats in tool_stats.items()},
+        "llm": {name: {"calls": llm_stats["calls"][name], "prompt_bytes": llm_stats["prompt_bytes"][name]}
+                for name in llm_stats["calls"]},
+        # Requests that reached the Maps server (the rest were answered by the commute cache)
+        "maps_mcp_calls": maps_mcp.get_pool().stats["calls"] - maps_calls,
+        # Safety searches made (the rest were answered by the safety cache): the reviewer's
+        # google_search calls, or one model call per neighborhood in parallel mode
+        "safety_searches": tool_stats["google_search"]["calls"] + llm_stats["calls"]["neighborhood_reviewer"],
+    }
+
+
+async def run_benchmark(levels: list, turns: int, latency: float, output_path: str, mode: str = "sequential",
+                        caches: str = "both"):
+    runner = InMemoryRunner(app=agent.app.model_copy(update={"root_agent": build_agent(latency, mode)}))
+    db = await asyncio.to_thread(inventory.get_inventory)
+    await maps_mcp.get_pool().start()
+
+    print(f"🧪 End-to-end ({mode}): {len(db)} listings, scripted LLM ({latency * 1000:.0f} ms/call), stub Maps MCP")
+    print(f"   {'sessions':>8}{'caches':>8}{'turns/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'tool calls':>12}"
+          f"{'tool KB':>10}{'maps calls':>12}{'searches':>10}")
+    results = []
+    try:
+        await run_level(runner, 1, 1)  # Warm-up (imports, first MCP calls)
+        for concurrency in levels:
+            sessions = max(turns, concurrency)
+            fresh_caches()
+            if CACHE_MODES[caches] == ["warm"]:
+                # Same sessions once, unmeasured: every commute and neighborhood is cached afterwards
+                await run_level(runner, concurrency, sessions)
+            # In "both", the cold pass is what fills the caches for the warm one
+            for state in CACHE_MODES[caches]:
+                level = {**await run_level(runner, concurrency, sessions), "caches": state}
+                results.append(level)
+                tool_calls = sum(t["calls"] for t in level["tools"].values())
+                tool_kb = sum(t["request_bytes"] + t["response_bytes"] for t in level["tools"].values()) / 1024
+                print(f"   {concurrency:>8}{state:>8}{level['sessions_per_second']:>10.1f}"
+                      f"{level['turn_latency']['p50_ms']:>10.1f}{level['turn_latency']['p95_ms']:>10.1f}"
+                      f"{tool_calls:>12}{tool_kb:>10.1f}{level['maps_mcp_calls']:>12}{level['safety_searches']:>10}")
+        results[-1]["maps_mcp"] = dict(maps_mcp.get_pool().stats) if results else {}
+    finally:
+        await maps_mcp.close_pool()
+        await runner.close()
+
+    report = {
+        "benchmark": "end_to_end",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "listings": len(db),
+        "llm_latency_ms": latency * 1000,
+        "research_mode": mode,
+        "levels": results,
+    }
+    if telemetry.enabled():
+        # Whole-run spans and counters from the built-in instrumentation
+        report["telemetry"] = telemetry.snapshot()
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the agent.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16], help="Concurrent sessions to test")
+    parser.add_argument("--turns", type=int, default=16, help="Sessions to run per concurrency level (at least the level)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Simulated model latency per call")
+    parser.add_argument("--output", default=OUTPUT_PATH, help=f"JSON results file (default: {OUTPUT_PATH})")
+    parser.add_argument("--research-cache", action="store_true", help="Let repeat scenarios hit the research cache")
+    parser.add_argument("--mode", choices=["sequential", "parallel"], default="sequential", help="Research team to run")
+    parser.add_argument("--caches", choices=list(CACHE_MODES), default="both",
+                        help="Measure each level with empty commute/safety caches (cold), filled ones (warm) or both")
+    args = parser.parse_args()
+    if not args.research_cache:
+        # Measure the full research path on every session by default
+        os.environ["RESEARCH_CACHE_TTL"] = "0"
+    asyncio.run(run_benchmark(args.sessions, args.turns, args.llm_latency_ms / 1000, args.output, args.mode,
+                              args.caches))
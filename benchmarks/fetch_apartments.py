@@ -0,0 +1,117 @@
+# This is a micro-benchmark comparing the (state, city) index against the old boolean-mask scan
+# over the full DataFrame (as tools.py used to load it)
+import random
+import time
+import numpy as np
+from apartment_finder import inventory
+
+COLUMNS = ['id', 'agent_description', 'monthly_price', 'address', 'city', 'state', 'latitude', 'longitude']
+N_QUERIES = 500
+REPEATS = 3
+
+
+def mask_fetch(df, city, state, max_budget):
+    # The original full-scan implementation of 'fetch_apartments'
+    target_city = city.lower().strip()
+    target_state = state.lower().strip()
+    matches = df[
+        (df['city'].str.lower() == target_city) &
+        (df['state'].str.lower() == target_state) &
+        (df['monthly_price'] <= max_budget)
+    ]
+    return matches[COLUMNS].head(5)
+
+
+def index_fetch(db, city, state, max_budget):
+    # What 'fetch_apartments' runs: the first 5 matches in file order
+    rows, _ = db.query(city, state, max_budget)
+    return db.records(rows)
+
+
+def index_nearest(db, city, state, max_budget, lat, lng, k=5):
+    # What 'fetch_apartments' runs with a landmark
+    return db.query(city, state, max_budget, sort_by="distance", lat=lat, lng=lng, k=k)
+
+
+def mask_nearest(df, city, state, max_budget, lat, lng, k=5):
+    # Brute force: mask the whole table, then sort every match by distance
+    matches = df[
+        (df['city'].str.lower() == city.lower().strip()) &
+        (df['state'].str.lower() == state.lower().strip()) &
+        (df['monthly_price'] <= max_budget)
+    ]
+    distances = inventory.haversine_km(matches['latitude'].to_numpy(), matches['longitude'].to_numpy(), lat, lng)
+    return np.sort(distances)[:k]
+
+
+def make_queries(df, n):
+    # Sample real (city, state) pairs so most queries hit, with budgets across the price range
+    rng = random.Random(42)
+    pairs = df[['city', 'state']].drop_duplicates().values.tolist()
+    budgets = np.nanpercentile(df['monthly_price'], [5, 25, 50, 75, 95]).tolist()
+    queries = [(*rng.choice(pairs), rng.choice(budgets)) for _ in range(n)]
+    # Include a few misses and messy casing/whitespace
+    queries.append(("Nowhere", "ZZ", 2000.0))
+    queries.append(("  AUSTIN ", "tx", 2500.0))
+    return queries
+
+
+def time_path(fn, source, queries):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for city, state, budget in queries:
+            fn(source, city, state, budget).to_json(orient="records")
+        best = min(best, time.perf_counter() - start)
+    return best / len(queries)
+
+
+def run_benchmark():
+    db = inventory.get_inventory()
+    if db.empty:
+        print("❌ Error: No data loaded. Please run the preprocessing script first.")
+        return
+    df = inventory.read_csv()
+
+    print(f"🧪 Benchmarking 'fetch_apartments' over {len(df)} listings, {len(db.location_resolver.locations())} cities...")
+    queries = make_queries(df, N_QUERIES)
+
+    # 1. CORRECTNESS: Both paths must return the same listings in the same order
+    mismatches = [q for q in queries if list(mask_fetch(df, *q)['id']) != list(index_fetch(db, *q)['id'])]
+    if mismatches:
+        print(f"❌ {len(mismatches)} queries differ, e.g. {mismatches[0]}")
+        return
+    print(f"✅ Results match for all {len(queries)} queries.")
+
+    # 2. SPEED
+    mask_time = time_path(mask_fetch, df, queries)
+    index_time = time_path(index_fetch, db, queries)
+    print(f"   Boolean mask : {mask_time * 1e6:10.1f} µs/query")
+    print(f"   Index lookup : {index_time * 1e6:10.1f} µs/query")
+    print(f"   Speedup      : {mask_time / index_time:10.1f}x")
+
+    # 3. NEAREST TO A LANDMARK: same k distances as sorting every match
+    landmarks = [(city, state, budget, *df.loc[(df['city'] == city) & (df['state'] == state), ['latitude', 'longitude']].mean())
+                 for city, state, budget in queries[:50]]
+    for query in landmarks:
+        _, distances = index_nearest(db, *query)
+        # The index keeps float32 coordinates, so allow for sub-meter differences
+        if not np.allclose(distances, mask_nearest(df, *query), atol=1e-3, equal_nan=True):
+            print(f"❌ Nearest listings differ for {query[:2]}")
+            return
+    print(f"✅ Nearest-to-landmark results match for {len(landmarks)} queries.")
+
+    start = time.perf_counter()
+    for query in landmarks:
+        mask_nearest(df, *query)
+    mask_time = (time.perf_counter() - start) / len(landmarks)
+    start = time.perf_counter()
+    for query in landmarks:
+        index_nearest(db, *query)
+    index_time = (time.perf_counter() - start) / len(landmarks)
+    print(f"   Mask + sort  : {mask_time * 1e6:10.1f} µs/query")
+    print(f"   Index nearest: {index_time * 1e6:10.1f} µs/query")
+
+
+if __name__ == "__main__":
+    run_benchmark()
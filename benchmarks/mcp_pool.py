@@ -0,0 +1,70 @@
+# This benchmark compares spawning a Maps MCP server per call (the old 'check_commutes') with the shared pool
+import asyncio
+import os
+import sys
+import time
+from mcp import StdioServerParameters, ClientSession
+from mcp.client.stdio import stdio_client
+from apartment_finder.maps_mcp import MapsMCPPool
+
+STUB_PATH = os.path.join(os.getcwd(), "benchmarks", "stub_maps_server.py")
+N_CALLS = 20
+CONCURRENCY = 4
+ARGUMENTS = {
+    "origins": ["30.2672,-97.7431", "30.2422,-97.7552", "30.4015,-97.7195"],
+    "destinations": ["Austin-Bergstrom International Airport"],
+    "mode": "driving",
+}
+
+
+async def spawn_per_call(params):
+    # One process fork + initialize handshake per tool call
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            return await session.call_tool("maps_distance_matrix", arguments=ARGUMENTS)
+
+
+async def timed_batch(call):
+    limit = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def one():
+        async with limit:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(N_CALLS)))
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def report(name, total, latencies):
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"   {name:<16}{N_CALLS / total:>10.1f}{p50 * 1000:>10.1f}{p95 * 1000:>10.1f}")
+
+
+async def run_benchmark():
+    # MAPS_MCP_SERVER can point at the real server (needs GOOGLE_MAPS_API_KEY); default is the offline stub
+    path = os.getenv("MAPS_MCP_SERVER", STUB_PATH)
+    command = sys.executable if path.endswith(".py") else "node"
+    params = StdioServerParameters(command=command, args=[path],
+                                   env={"GOOGLE_MAPS_API_KEY": os.getenv("GOOGLE_MAPS_API_KEY", "")})
+
+    print(f"🧪 {N_CALLS} 'maps_distance_matrix' calls, {CONCURRENCY} concurrent, against {os.path.basename(path)}")
+    print(f"   {'mode':<16}{'calls/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+
+    report("spawn per call", *await timed_batch(lambda: spawn_per_call(params)))
+
+    pool = MapsMCPPool(size=CONCURRENCY, server_params=params)
+    try:
+        await pool.start()
+        report("pooled (warm)", *await timed_batch(lambda: pool.call_tool("maps_distance_matrix", ARGUMENTS)))
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
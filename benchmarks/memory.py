@@ -0,0 +1,62 @@
+# This benchmark measures the per-worker memory of the listings: full DataFrame vs. the compact store
+import json
+import os
+import subprocess
+import sys
+from apartment_finder import inventory
+
+# Runs in a fresh interpreter so each measurement only holds one copy of the data
+CHILD_SCRIPT = """
+import gc, json, resource, sys
+from apartment_finder import inventory
+
+def rss_mb():
+    # Current RSS on Linux; peak RSS elsewhere
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("VmRSS")) / 1024
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+import pyarrow  # Loaded by both stores; keep the library itself out of the comparison
+before = rss_mb()
+if sys.argv[1] == "full":
+    # What tools.py used to keep: every column of the CSV
+    df = inventory.read_csv()
+else:
+    # What the Inventory keeps (indexes excluded, they are the same for both)
+    df = inventory.compact_listings(inventory.load_listings())
+gc.collect()
+print(json.dumps({
+    "rows": len(df),
+    "frame_mb": df.memory_usage(deep=True).sum() / 1024 / 1024,
+    "rss_delta_mb": rss_mb() - before,
+}))
+"""
+
+
+def measure(mode):
+    out = subprocess.run([sys.executable, "-c", CHILD_SCRIPT, mode], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark():
+    if not os.path.exists(inventory.DATA_PATH):
+        print(f"❌ Error: Could not find {inventory.DATA_PATH}. Please run the preprocessing script first.")
+        return
+    if not inventory.snapshot_is_fresh():
+        print("📦 Writing binary snapshot...")
+        inventory.write_snapshot(inventory.read_csv())
+
+    print("🧪 Measuring listing memory per worker...")
+    print(f"   {'store':<10}{'rows':>10}{'DataFrame (MB)':>16}{'RSS added (MB)':>16}")
+    results = {mode: measure(mode) for mode in ("full", "compact")}
+    for mode, r in results.items():
+        print(f"   {mode:<10}{r['rows']:>10}{r['frame_mb']:>16.1f}{r['rss_delta_mb']:>16.1f}")
+    saved = results["full"]["rss_delta_mb"] - results["compact"]["rss_delta_mb"]
+    print(f"✅ Compact store saves {saved:.1f} MB of RSS per worker.")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,64 @@
+# This benchmark compares in-memory and chunked preprocessing: identical output, throughput and peak memory
+#
+# Usage: python -m benchmarks.preprocessing <raw.csv> [chunksize]
+import filecmp
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Runs in a fresh interpreter so peak RSS belongs to one mode only
+CHILD_SCRIPT = """
+import json, resource, sys, time
+import preprocessing
+
+input_path, output_path, chunksize = sys.argv[1], sys.argv[2], int(sys.argv[3])
+start = time.perf_counter()
+if chunksize:
+    rows_in, rows_out = preprocessing.preprocess_chunked(input_path, output_path, chunksize)
+else:
+    rows_in, rows_out = preprocessing.preprocess(input_path, output_path)
+elapsed = time.perf_counter() - start
+
+# Linux reports ru_maxrss in KiB, macOS in bytes
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "rows": rows_in,
+    "seconds": elapsed,
+    "peak_rss_mb": peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024,
+}))
+"""
+
+
+def run_mode(input_path, output_path, chunksize):
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, input_path, output_path, str(chunksize)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(input_path, chunksize):
+    print(f"🧪 Preprocessing {input_path} ({os.path.getsize(input_path) / 1e6:.0f} MB)...")
+    print(f"   {'mode':<22}{'rows/sec':>12}{'seconds':>10}{'peak RSS (MB)':>15}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        outputs = {}
+        for name, size in (("in-memory", 0), (f"chunked ({chunksize})", chunksize)):
+            outputs[name] = os.path.join(tmp, f"{size}.csv")
+            r = run_mode(input_path, outputs[name], size)
+            print(f"   {name:<22}{r['rows'] / r['seconds']:>12,.0f}{r['seconds']:>10.1f}{r['peak_rss_mb']:>15.1f}")
+
+        first, second = outputs.values()
+        if filecmp.cmp(first, second, shallow=False):
+            print("✅ Both modes wrote byte-identical output.")
+        else:
+            print("❌ Outputs differ!")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m benchmarks.preprocessing <raw.csv> [chunksize]")
+        sys.exit(1)
+    run_benchmark(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 200_000)
@@ -0,0 +1,158 @@
+# This is an offline stand-in for the Google Maps MCP server, used by tests and benchmarks.
+# It speaks the MCP stdio transport (newline-delimited JSON-RPC) with no dependencies, and
+# answers 'maps_distance_matrix' with the same JSON shape as the real server, using
+# straight-line distances instead of the Google API.
+#
+# Point the agent at it with: MAPS_MCP_SERVER=benchmarks/stub_maps_server.py
+#
+# Env knobs:
+#   STUB_MAPS_LATENCY_MS   Simulated upstream latency per request (default 0)
+# A request with the origin FAIL_ORIGIN fails like a rejected upstream request (to test partial failures).
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+
+# Upstream Distance Matrix API limits per request
+MAX_DIMENSION = 25
+MAX_ELEMENTS = 100
+
+FAIL_ORIGIN = "STUB_FAIL"
+
+SPEEDS_MPS = {"driving": 13.0, "transit": 8.0, "bicycling": 4.5, "walking": 1.4}
+
+TOOLS = [
+    {
+        "name": "maps_distance_matrix",
+        "description": "Calculate travel distance and time for multiple origins and destinations",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "origins": {"type": "array", "items": {"type": "string"}},
+                "destinations": {"type": "array", "items": {"type": "string"}},
+                "mode": {"type": "string", "enum": list(SPEEDS_MPS)},
+            },
+            "required": ["origins", "destinations"],
+        },
+    },
+    {
+        "name": "stub_stats",
+        "description": "Returns how many requests this stub process has served.",
+        "inputSchema": {"type": "object", "properties": {}},
+    },
+    {
+        "name": "stub_exit",
+        "description": "Makes the server process exit, to simulate a crash.",
+        "inputSchema": {"type": "object", "properties": {}},
+    },
+]
+
+stats = {"distance_matrix_calls": 0, "elements": 0, "pid": os.getpid()}
+
+
+def locate(place, anchor):
+    # "lat,lng" strings are used as-is; names get a stable pseudo-location near the anchor
+    try:
+        lat, lng = (float(x) for x in place.split(","))
+        return lat, lng
+    except ValueError:
+        digest = hashlib.sha256(place.strip().lower().encode()).digest()
+        return anchor[0] + (digest[0] - 128) / 1000, anchor[1] + (digest[1] - 128) / 1000
+
+
+def haversine_m(a, b):
+    lat1, lng1, lat2, lng2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(h))
+
+
+def distance_matrix(origins, destinations, mode="driving"):
+    if len(origins) > MAX_DIMENSION or len(destinations) > MAX_DIMENSION:
+        return "Distance matrix request failed: MAX_DIMENSIONS_EXCEEDED", True
+    if len(origins) * len(destinations) > MAX_ELEMENTS:
+        return "Distance matrix request failed: MAX_ELEMENTS_EXCEEDED", True
+    if FAIL_ORIGIN in origins:
+        return "Distance matrix request failed: INVALID_REQUEST", True
+
+    stats["distance_matrix_calls"] += 1
+    stats["elements"] += len(origins) * len(destinations)
+
+    anchor = locate(origins[0], (0.0, 0.0)) if origins else (0.0, 0.0)
+    speed = SPEEDS_MPS.get(mode, SPEEDS_MPS["driving"])
+    rows = []
+    for origin in origins:
+        elements = []
+        for destination in destinations:
+            # Road distance is roughly 1.3x the straight line
+            meters = round(haversine_m(locate(origin, anchor), locate(destination, anchor)) * 1.3)
+            seconds = round(meters / speed)
+            elements.append({
+                "status": "OK",
+                "duration": {"text": f"{max(1, seconds // 60)} mins", "value": seconds},
+                "distance": {"text": f"{meters / 1609.34:.1f} mi", "value": meters},
+            })
+        rows.append({"elements": elements})
+
+    return json.dumps({
+        "origin_addresses": [f"{o} (stub)" for o in origins],
+        "destination_addresses": [f"{d} (stub)" for d in destinations],
+        "results": rows,
+    }, indent=2), False
+
+
+def call_tool(name, arguments):
+    if name == "maps_distance_matrix":
+        delay_ms = float(os.getenv("STUB_MAPS_LATENCY_MS", "0"))
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+        text, is_error = distance_matrix(
+            arguments.get("origins", []), arguments.get("destinations", []), arguments.get("mode", "driving")
+        )
+    elif name == "stub_stats":
+        text, is_error = json.dumps(stats), False
+    elif name == "stub_exit":
+        os._exit(1)
+    else:
+        text, is_error = f"Unknown tool: {name}", True
+    return {"content": [{"type": "text", "text": text}], "isError": is_error}
+
+
+def handle(message):
+    method = message.get("method")
+    params = message.get("params") or {}
+    if method == "initialize":
+        return {
+            # Echo the client's version; the stub only uses the basic tool methods
+            "protocolVersion": params.get("protocolVersion", "2025-06-18"),
+            "capabilities": {"tools": {}},
+            "serverInfo": {"name": "stub-google-maps", "version": "0.0.1"},
+        }
+    if method == "ping":
+        return {}
+    if method == "tools/list":
+        return {"tools": TOOLS}
+    if method == "tools/call":
+        return call_tool(params.get("name"), params.get("arguments") or {})
+    raise KeyError(method)
+
+
+def main():
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        message = json.loads(line)
+        if "id" not in message:
+            # Notifications (e.g. 'notifications/initialized') need no reply
+            continue
+        try:
+            reply = {"jsonrpc": "2.0", "id": message["id"], "result": handle(message)}
+        except KeyError as e:
+            reply = {"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32601, "message": f"Method not found: {e}"}}
+        sys.stdout.write(json.dumps(reply) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# This benchmark compares the size of the tool results the model reads in the 'records' and 'compact'
+# output formats (see TOOL_OUTPUT_FORMAT in tools.py), in bytes and in tokens.
+#
+# 'check_commutes' talks to the stub Maps MCP server, so nothing touches the network unless
+# '--tokenizer api' is used (exact Gemini counts, needs GOOGLE_API_KEY).
+#
+# Usage (from the project root, with the cleaned data in data/):
+#   python -m benchmarks.tool_output                        # 50 random cities
+#   python -m benchmarks.tool_output --queries 200 --tokenizer api --output tool_output.json
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import re
+import statistics
+import tempfile
+
+os.environ.setdefault("MAPS_MCP_SERVER", os.path.join(os.getcwd(), "benchmarks", "stub_maps_server.py"))
+os.environ.setdefault("INVENTORY_REFRESH_INTERVAL", "0")
+os.environ.setdefault("COMMUTE_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "commute_cache.sqlite"))
+
+from apartment_finder import inventory, maps_mcp, tools
+
+MODEL = "gemini-2.5-flash"
+BUDGET = 5000
+# In the analyst's turn every later model call re-sends the earlier tool results:
+# the listings are read twice (commute call, final answer), the commutes once
+READS = {"fetch_apartments": 2, "check_commutes": 1}
+
+# Offline stand-in for the Gemini tokenizer: digits are single tokens, words and
+# punctuation one token each. Good for comparing formats, not for billing.
+ESTIMATE_PATTERN = re.compile(r"\d|[A-Za-z]+|[^\sA-Za-z\d]")
+
+
+def token_counter(name: str):
+    """
+    Returns (count(text) -> int, description) for the chosen tokenizer.
+    'auto' uses the Gemini local tokenizer when it is installed, else the estimate.
+    """
+    if name == "api":
+        from google import genai
+        client = genai.Client()
+        return (lambda text: client.models.count_tokens(model=MODEL, contents=text).total_tokens), "Gemini count_tokens API"
+    if name in ("auto", "local"):
+        try:
+            from google.genai.local_tokenizer import LocalTokenizer
+            tokenizer = LocalTokenizer(model_name=MODEL)
+            return (lambda text: tokenizer.count_tokens(text).total_tokens), "Gemini local tokenizer"
+        except Exception as e:
+            if name == "local":
+                raise
+            print(f"⚠️ Local tokenizer unavailable ({type(e).__name__}), using the offline estimate.")
+    return (lambda text: len(ESTIMATE_PATTERN.findall(text))), "offline estimate (digits, words, punctuation)"
+
+
+def make_queries(db, n: int, seed: int = 0) -> list:
+    # Cities with 5 listings within the budget, so every result is full size (works on every backend)
+    locations = sorted(db.location_resolver.locations())
+    random.Random(seed).shuffle(locations)
+    full = ((city, state) for city, state in locations if len(db.query(city, state, BUDGET)[0]) == 5)
+    return list(itertools.islice(full, n))
+
+
+async def results_for(city: str, state: str, output_format: str) -> dict:
+    os.environ["TOOL_OUTPUT_FORMAT"] = output_format
+    # Rank by distance to the city's first listing, as the analyst does with a landmark
+    first = tools.parse_listings(tools.fetch_apartments(city, state, BUDGET))[0]
+    fetched = tools.fetch_apartments(city, state, BUDGET, landmark_lat=first["latitude"], landmark_lng=first["longitude"])
+    origins = [f"{apt['latitude']},{apt['longitude']}" for apt in tools.parse_listings(fetched)]
+    commutes = await tools.check_commutes(origins, f"Downtown {city}, {state}")
+    return {"fetch_apartments": fetched, "check_commutes": commutes}
+
+
+async def run(args):
+    count_tokens, tokenizer = token_counter(args.tokenizer)
+    db = inventory.get_inventory()
+    queries = make_queries(db, args.queries)
+    print(f"🧪 Comparing tool output formats over {len(queries)} cities ({tokenizer})...")
+
+    sizes = {fmt: {tool: {"bytes": [], "tokens": []} for tool in READS} for fmt in tools.OUTPUT_FORMATS}
+    try:
+        for city, state in queries:
+            for fmt in tools.OUTPUT_FORMATS:
+                for tool, text in (await results_for(city, state, fmt)).items():
+                    sizes[fmt][tool]["bytes"].append(len(text.encode()))
+                    sizes[fmt][tool]["tokens"].append(count_tokens(text))
+    finally:
+        os.environ.pop("TOOL_OUTPUT_FORMAT", None)
+        await maps_mcp.get_pool().close()
+
+    report = {"tokenizer": tokenizer, "queries": len(queries), "formats": {}}
+    print(f"\n{'tool':<18}{'format':<10}{'bytes':>8}{'tokens':>8}{'saved':>8}")
+    for tool in READS:
+        baseline = statistics.mean(sizes["records"][tool]["tokens"])
+        for fmt in tools.OUTPUT_FORMATS:
+            bytes_mean = statistics.mean(sizes[fmt][tool]["bytes"])
+            tokens_mean = statistics.mean(sizes[fmt][tool]["tokens"])
+            saved = 1 - tokens_mean / baseline
+            report["formats"].setdefault(fmt, {})[tool] = {"bytes": bytes_mean, "tokens": tokens_mean, "saved": saved}
+            print(f"{tool:<18}{fmt:<10}{bytes_mean:>8.0f}{tokens_mean:>8.0f}{saved:>8.0%}")
+
+    # What the analyst's model calls read in total per research run
+    per_run = {fmt: sum(report["formats"][fmt][tool]["tokens"] * reads for tool, reads in READS.items())
+               for fmt in tools.OUTPUT_FORMATS}
+    report["analyst_tokens_per_run"] = per_run
+    print(f"\n✅ Tool-result tokens read per analyst run: {per_run['records']:.0f} (records) -> "
+          f"{per_run['compact']:.0f} (compact), {1 - per_run['compact'] / per_run['records']:.0%} fewer.")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Results written to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=50, help="Cities to query")
+    parser.add_argument("--tokenizer", choices=["auto", "local", "api", "estimate"], default="auto")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,39 +2,46 @@
 import asyncio
 import os
 from dotenv import load_dotenv
-from google.adk.runners import InMemoryRunner
-from apartment_finder.agent import root_agent
 
+# Load .env before the agent is built (RESEARCH_MODE picks the research team)
 load_dotenv()
 
+from google.adk.runners import InMemoryRunner
+from apartment_finder.agent import app
+from apartment_finder import maps_mcp
+
 async def main():
     print("🏗️ ApartmentFinder System Starting (Debug Mode)...")
     
     # Initialize the Runner (It handles Session memory automatically)
-    runner = InMemoryRunner(agent=root_agent)
+    runner = InMemoryRunner(app=app)
 
     print("\n✅ System Ready! The Manager is listening. (Type 'quit' to exit)")
 
-    while True:
-        try:
-            user_input = input("\nUser >> ")
-            if user_input.lower() in ["quit", "exit"]:
-                break
+    try:
+        while True:
+            try:
+                user_input = input("\nUser >> ")
+                if user_input.lower() in ["quit", "exit"]:
+                    break
             
-            print("\n" + "="*50)
+                print("\n" + "="*50)
             
-            # run_debug() automatically prints:
-            # 1. The Agent's reasoning
-            # 2. Tool execution & results
-            # 3. Agent transfers (Manager -> Analyst)
-            await runner.run_debug(user_input)
+                # run_debug() automatically prints:
+                # 1. The Agent's reasoning
+                # 2. Tool execution & results
+                # 3. Agent transfers (Manager -> Analyst)
+                await runner.run_debug(user_input)
             
-            print("="*50)
+                print("="*50)
 
-        except Exception as e:
-            print(f"\n❌ Error: {e}")
-            import traceback
-            traceback.print_exc()
+            except Exception as e:
+                print(f"\n❌ Error: {e}")
+                import traceback
+                traceback.print_exc()
+    finally:
+        # Shut down the pooled Maps MCP servers with the runner
+        await maps_mcp.close_pool()
 
 if __name__ == "__main__":
     # Ensuring we have set the Maps Key before starting
@@ -1,101 +1,233 @@
 # This file contains preprocessing of mock database (using dataset from Kaggle)
-import pandas as pd
-import kagglehub
+#
+# Usage:
+#   python preprocessing.py                              # Download from Kaggle, clean in memory
+#   python preprocessing.py --input raw.csv --chunksize 200000
+#                                                        # Stream a (large) raw dump in bounded memory
+#   python preprocessing.py --sqlite                     # Also write the indexed SQLite database
+#                                                        # (INVENTORY_BACKEND=sqlite)
+import argparse
 import os
+import time
+import numpy as np
+import pandas as pd
+from apartment_finder.inventory import (promote_dtype, read_csv, version_path_for, write_snapshot,
+                                        write_snapshot_chunked, write_version)
+from apartment_finder.sql_store import write_sqlite
 
-apartments_path = kagglehub.dataset_download("adithyaawati/apartments-for-rent-classified")
-
-# List the contents of the path directory to identify the data file
-apartments_csv_file_path = os.path.join(apartments_path + '/apartments_for_rent_classified_100K', 'apartments_for_rent_classified_100K.csv')
-df_apartments = pd.read_csv(apartments_csv_file_path, sep=";", encoding='cp1252')
+OUTPUT_PATH = os.path.join('data', 'apartments_cleaned.csv')
 
 # Dropping unnecessary columns
-df_apartments = df_apartments.drop(columns=['title', 'amenities', 'fee', 'has_photo', 'pets_allowed', 'price', 'source', 'time'])
-
-# Remove rows in df_apartments where both address and latitude are null
-df_apartments = df_apartments.dropna(subset=['address', 'latitude'], how='all')
+DROP_COLUMNS = ['title', 'amenities', 'fee', 'has_photo', 'pets_allowed', 'price', 'source', 'time']
 
 # Convert datatypes into appropriate types
-df_apartments['category'] = df_apartments['category'].astype(str)
-df_apartments['body'] = df_apartments['body'].astype(str)
-df_apartments['currency'] = df_apartments['currency'].astype(str)
-df_apartments['price_display'] = df_apartments['price_display'].astype(str)
-df_apartments['price_type'] = df_apartments['price_type'].astype(str)
-df_apartments['address'] = df_apartments['address'].astype(str)
-df_apartments['cityname'] = df_apartments['cityname'].astype(str)
-df_apartments['state'] = df_apartments['state'].astype(str)
-
-# Clean category data
-# Split new category after the string 'housing/rent'
-df_apartments['category'] = df_apartments['category'].str.split('/').str[2]
-
-# Fill nan category with the value apartment/home
-df_apartments['category'] = df_apartments['category'].fillna('apartment/home')
-
-# Rename columns
-# Rename 'price_display' to 'price', 'cityname' to 'city'
-df_apartments = df_apartments.rename(columns={'price_display': 'price', 'cityname': 'city'})
-
-# Change category of records where price_type is not Monthly, to 'short_term'
-df_apartments.loc[df_apartments['price_type'] != 'Monthly', 'category'] = 'short_term'
-
-# Strip non-numeric characters in price column
-df_apartments.loc[df_apartments['price_type'] != 'Monthly', 'price'] = df_apartments.loc[df_apartments['price_type'] != 'Monthly', 'price'].str.replace(r'\D', '', regex=True)
-
-# Remove the $ and , signs for all records of price column (replace all occurences)
-df_apartments['price'] = df_apartments['price'].astype(str).str.replace(r'\$', '', regex=True).str.replace(',', '', regex=True)
-
-# Function to handle price ranges and convert to float
-def parse_price_range_and_convert(price_str):
-    if isinstance(price_str, str):
-        if '-' in price_str:
-            try:
-                parts = price_str.split('-')
-                lower = float(parts[0].strip())
-                upper = float(parts[1].strip())
-                return (lower + upper) / 2
-            except ValueError:
-                return None # Return None for unparseable parts
-        else:
-            try:
-                return float(price_str.strip())
-            except ValueError:
-                return None # Return None for single unparseable string
-    return price_str # Return as is if not a string (e.g., already float or NaN)
+STRING_COLUMNS = ['category', 'body', 'currency', 'price_display', 'price_type', 'address', 'cityname', 'state']
+
+# The raw file is ';'-separated and Windows-1252 encoded
+RAW_CSV_OPTIONS = dict(sep=";", encoding='cp1252')
+
+
+def download_raw_csv():
+    import kagglehub
+    apartments_path = kagglehub.dataset_download("adithyaawati/apartments-for-rent-classified")
+
+    # List the contents of the path directory to identify the data file
+    return os.path.join(apartments_path + '/apartments_for_rent_classified_100K', 'apartments_for_rent_classified_100K.csv')
+
+
+def parse_price_range_and_convert(price: pd.Series) -> pd.Series:
+    """
+    Handles price ranges ("1200-1400" becomes their midpoint) and converts to float.
+    Unparseable strings become NaN.
+    """
+    # Split on the first '-'; the upper bound ends at the next '-', if any
+    parts = price.str.partition('-')
+    lower = pd.to_numeric(parts[0].str.strip(), errors='coerce')
+    upper = pd.to_numeric(parts[2].str.partition('-')[0].str.strip(), errors='coerce')
+    is_range = parts[1] == '-'
+    return lower.where(~is_range, (lower + upper) / 2).astype(float)
 
-# Apply the function to the price column to handle ranges and convert to float
-df_apartments['price'] = df_apartments['price'].apply(parse_price_range_and_convert)
 
+def clean_prices(df: pd.DataFrame) -> pd.Series:
+    """
+    Turns the raw 'price_display'/'price_type' columns into a monthly price (NaN where unknown).
+    """
+    price = df['price_display'].astype(str)
+    price_type = df['price_type'].astype(str)
+    not_monthly = price_type != 'Monthly'
 
-# Change price_type to Weekly for records where price_type = Monthly|Weekly
-df_apartments.loc[df_apartments['price_type'] == 'Monthly|Weekly', 'price_type'] = 'Weekly'
+    # Strip non-numeric characters in price column
+    price = price.where(~not_monthly, price.str.replace(r'\D', '', regex=True))
 
-# Convert Weekly prices to Monthly prices by multiplying by 4.3 (average weeks in a month)
-df_apartments.loc[df_apartments['price_type'] == 'Weekly', 'price'] = df_apartments.loc[df_apartments['price_type'] == 'Weekly', 'price'] * 4.3
+    # Remove the $ and , signs for all records of price column (replace all occurences)
+    price = price.str.replace(r'\$', '', regex=True).str.replace(',', '', regex=True)
 
-# Drop the price_type column and rename the 'price' column to 'monthly_price'
-df_apartments = df_apartments.drop(columns=['price_type'])
-df_apartments = df_apartments.rename(columns={'price': 'monthly_price'})
+    # Handle ranges and convert to float
+    price = parse_price_range_and_convert(price)
 
-# Fill missing monthly_price with the average monthly_price for records where city = 'Orlando' AND state = 'FL'
-df_apartments.loc[df_apartments['monthly_price'].isnull(), 'monthly_price'] = df_apartments.loc[(df_apartments['city'] == 'Orlando') & (df_apartments['state'] == 'FL'), 'monthly_price'].mean()
+    # Convert Weekly (and Monthly|Weekly) prices to Monthly prices by multiplying by 4.3 (average weeks in a month)
+    weekly = price_type.isin(['Weekly', 'Monthly|Weekly'])
+    return price.where(~weekly, price * 4.3)
 
-# Handle NaN and 0.0 for bathrooms and bedrooms
-# For bathrooms, fill NaN or 0.0 with 1.0 as any apartment has at least 1 bathroom
-df_apartments['bathrooms'] = df_apartments['bathrooms'].fillna(1.0)
-df_apartments.loc[df_apartments['bathrooms'] == 0.0, 'bathrooms'] = 1.0
 
+def drop_unlocated(df: pd.DataFrame) -> pd.DataFrame:
+    # Remove rows in df_apartments where both address and latitude are null
+    return df.dropna(subset=['address', 'latitude'], how='all')
+
+
+def orlando_prices(df: pd.DataFrame) -> pd.Series:
+    """
+    Prices of the Orlando, FL listings, used to fill in missing prices.
+    """
+    df = drop_unlocated(df)
+    in_orlando = (df['cityname'].astype(str) == 'Orlando') & (df['state'].astype(str) == 'FL')
+    return clean_prices(df[in_orlando])
+
+
+def make_desc(df: pd.DataFrame) -> pd.Series:
+    """
+    Creates agent_description. This also helps the LLM understand "0.0" means "Studio".
+    """
+    bed_str = (df['bedrooms'].astype(int).astype(str) + " Bed").where(df['bedrooms'] != 0.0, "Studio")
+    bath_str = df['bathrooms'].astype(int).astype(str) + " Bath"
+    return bed_str + ", " + bath_str + " apartment in " + _as_text(df['city']) + ", " + _as_text(df['state'])
+
+
+def _as_text(values: pd.Series) -> pd.Series:
+    # Formats values like an f-string does: a missing city/state reads "nan" instead of
+    # making the whole description missing
+    return values.astype(object).where(values.notna(), "nan").astype(str)
+
+
+def clean_apartments(df_apartments: pd.DataFrame, fill_price: float) -> pd.DataFrame:
+    """
+    Cleans a block of raw listings. Every step is row-local and vectorized, so the raw
+    file can be processed whole or in chunks with the same result.
+
+    Args:
+        df_apartments (pd.DataFrame): Raw listings (all of them, or one chunk).
+        fill_price (float): Monthly price used where the price is missing.
+
+    Returns:
+        pd.DataFrame: The cleaned listings.
+    """
+    df_apartments = df_apartments.drop(columns=DROP_COLUMNS)
+    df_apartments = drop_unlocated(df_apartments)
+
+    for column in STRING_COLUMNS:
+        df_apartments[column] = df_apartments[column].astype(str)
+
+    # Clean category data
+    # Split new category after the string 'housing/rent'
+    df_apartments['category'] = df_apartments['category'].str.split('/').str[2]
+
+    # Fill nan category with the value apartment/home
+    df_apartments['category'] = df_apartments['category'].fillna('apartment/home')
+
+    # Change category of records where price_type is not Monthly, to 'short_term'
+    df_apartments.loc[df_apartments['price_type'] != 'Monthly', 'category'] = 'short_term'
+
+    # Convert every price to a monthly price
+    df_apartments['price_display'] = clean_prices(df_apartments)
+
+    # Rename columns
+    # Rename 'price_display' to 'monthly_price', 'cityname' to 'city'
+    df_apartments = df_apartments.drop(columns=['price_type'])
+    df_apartments = df_apartments.rename(columns={'price_display': 'monthly_price', 'cityname': 'city'})
+
+    # Fill missing monthly_price (the average Orlando, FL price)
+    df_apartments['monthly_price'] = df_apartments['monthly_price'].fillna(fill_price)
+
+    # Handle NaN and 0.0 for bathrooms and bedrooms
+    # For bathrooms, fill NaN or 0.0 with 1.0 as any apartment has at least 1 bathroom
+    df_apartments['bathrooms'] = df_apartments['bathrooms'].fillna(1.0)
+    df_apartments.loc[df_apartments['bathrooms'] == 0.0, 'bathrooms'] = 1.0
+
+    # For bedrooms, assuming NaN is 1.0 (safe bet). If bedrooms = 0.0 then that means a Studio apartment
+    df_apartments['bedrooms'] = df_apartments['bedrooms'].fillna(1.0)
+
+    df_apartments['agent_description'] = make_desc(df_apartments)
+    return df_apartments
+
+
+def preprocess(input_path: str, output_path: str = OUTPUT_PATH):
+    """
+    Cleans the whole raw file in memory.
+    """
+    df_apartments = pd.read_csv(input_path, **RAW_CSV_OPTIONS)
+    fill_price = orlando_prices(df_apartments).mean()
+    cleaned = clean_apartments(df_apartments, fill_price)
+
+    # Save this to a CSV file in a specified path
+    cleaned.to_csv(output_path, index=False)
+    return len(df_apartments), len(cleaned)
+
+
+def preprocess_chunked(input_path: str, output_path: str = OUTPUT_PATH, chunksize: int = 200_000):
+    """
+    Cleans the raw file in chunks, so memory stays bounded by the chunk size.
+
+    Two streaming passes produce the same output as preprocess():
+      1. Infer every column's dtype across all chunks (as one full read would) and
+         collect the Orlando, FL prices for the missing-price fill.
+      2. Clean each chunk with those dtypes and append it to the output CSV.
+    """
+    dtypes, fill_values = {}, []
+    for chunk in pd.read_csv(input_path, chunksize=chunksize, **RAW_CSV_OPTIONS):
+        for column, dtype in chunk.dtypes.items():
+            dtypes[column] = promote_dtype(dtypes.get(column), dtype)
+        fill_values.append(orlando_prices(chunk))
+    fill_price = pd.concat(fill_values).mean() if fill_values else np.nan
+
+    rows_in = rows_out = 0
+    reader = pd.read_csv(input_path, chunksize=chunksize, dtype=dtypes, **RAW_CSV_OPTIONS)
+    for i, chunk in enumerate(reader):
+        cleaned = clean_apartments(chunk, fill_price)
+        cleaned.to_csv(output_path, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+        rows_in += len(chunk)
+        rows_out += len(cleaned)
+    return rows_in, rows_out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean the raw apartments dataset for the agent.")
+    parser.add_argument("--input", help="Raw ';'-separated CSV (default: download from Kaggle)")
+    parser.add_argument("--output", default=OUTPUT_PATH, help=f"Cleaned CSV (default: {OUTPUT_PATH})")
+    parser.add_argument("--chunksize", type=int, help="Stream the raw file in chunks of this many rows")
+    parser.add_argument("--no-snapshot", action="store_true", help="Skip writing the binary snapshot")
+    parser.add_argument("--sqlite", action="store_true", help="Also write the indexed SQLite database")
+    args = parser.parse_args()
+
+    input_path = args.input or download_raw_csv()
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+
+    start = time.perf_counter()
+    if args.chunksize:
+        rows_in, rows_out = preprocess_chunked(input_path, args.output, args.chunksize)
+    else:
+        rows_in, rows_out = preprocess(input_path, args.output)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Cleaned {rows_in} rows into {rows_out} listings in {elapsed:.1f}s ({rows_in / elapsed:,.0f} rows/sec).")
+
+    # Also write the typed binary snapshot, so the agent can skip parsing the CSV at startup
+    if not args.no_snapshot:
+        snapshot_path = os.path.splitext(args.output)[0] + '.feather'
+        if args.chunksize:
+            # Streamed from the cleaned CSV, so memory stays bounded like the cleaning itself
+            write_snapshot_chunked(args.output, snapshot_path, args.chunksize)
+        else:
+            write_snapshot(read_csv(args.output), snapshot_path)
 
-# For bedrooms, assuming NaN is 1.0 (safe bet). If bedrooms = 0.0 then that means a Studio apartment
-df_apartments['bedrooms'] = df_apartments['bedrooms'].fillna(1.0)
+    if args.sqlite:
+        sqlite_path = os.path.splitext(args.output)[0] + '.sqlite'
+        # Streamed from the cleaned CSV, so it also works for dumps larger than memory
+        count = write_sqlite(pd.read_csv(args.output, chunksize=args.chunksize or 200_000), sqlite_path)
+        print(f"✅ Wrote {count} listings to {sqlite_path} (INVENTORY_BACKEND=sqlite).")
 
-# Create agent_description. This also helps the LLM understand "0.0" means "Studio"
-def make_desc(row):
-    bed_str = "Studio" if row['bedrooms'] == 0.0 else f"{int(row['bedrooms'])} Bed"
-    bath_str = f"{int(row['bathrooms'])} Bath"
-    return f"{bed_str}, {bath_str} apartment in {row['city']}, {row['state']}"
+    # Bump the version last, so running agents only refresh once every file is complete.
+    # It sits next to the output, where workers loading these files look for it
+    write_version(version_path_for(args.output))
 
-df_apartments['agent_description'] = df_apartments.apply(make_desc, axis=1)
 
-# Save this to a CSV file in a specified path
-df_apartments.to_csv('data/apartments_cleaned.csv', index=False)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+# This script serves the AI agent over HTTP, running many independent user sessions in one process
+#
+# Usage:
+#   python server.py --port 8080
+#
+#   curl -X POST localhost:8080/sessions
+#   curl -X POST localhost:8080/sessions/<session_id>/messages -d '{"message": "Austin TX under $2500 near UT campus"}'
+#
+# All sessions share one Runner, the loaded apartment inventory, its indexes and the pooled
+# Maps MCP servers. Settings (from .env):
+#   SERVER_MAX_CONCURRENT_RUNS   Agent turns executing at once (default 8)
+#   SERVER_MAX_QUEUED            Turns allowed to wait for a slot before new ones get a 503 (default 32)
+#   SERVER_RUN_TIMEOUT           Seconds before a single turn is abandoned (default 300)
+#   SERVER_SESSION_TTL           Seconds a session may sit idle before it is dropped (default 3600)
+#   SERVER_MAX_SESSIONS          Sessions kept at most; the least recently used go first (default 10000)
+#
+# GET /metrics serves the telemetry counters when TELEMETRY_TRACE_PATH or TELEMETRY_METRICS_PORT is set.
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+from apartment_finder.agent import app as agent_app
+from apartment_finder import inventory, maps_mcp, telemetry
+
+
+class Overloaded(Exception):
+    """Raised when the wait queue is full."""
+
+
+class RunLimiter:
+    """
+    Caps how many agent turns run at once and how many may wait for a slot.
+
+    Turns beyond the queue limit are rejected right away (backpressure) instead of
+    piling up and making every session slow.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.active = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_concurrent)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._slots.locked() and self.waiting >= self.max_queued:
+            raise Overloaded()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+
+class Session:
+    """One conversation: its user, the lock that keeps its turns in order, and when it was last used."""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+
+class SessionRequest(BaseModel):
+    user_id: str = None
+
+
+class MessageRequest(BaseModel):
+    message: str
+
+
+runner = InMemoryRunner(app=agent_app)
+limiter = RunLimiter(
+    max_concurrent=int(os.getenv("SERVER_MAX_CONCURRENT_RUNS", "8")),
+    max_queued=int(os.getenv("SERVER_MAX_QUEUED", "32")),
+)
+RUN_TIMEOUT = float(os.getenv("SERVER_RUN_TIMEOUT", "300"))
+SESSION_TTL = float(os.getenv("SERVER_SESSION_TTL", "3600"))
+MAX_SESSIONS = int(os.getenv("SERVER_MAX_SESSIONS", "10000"))
+# Seconds between sweeps for idle sessions
+SESSION_SWEEP_INTERVAL = 60
+
+# session_id -> Session, least recently used first. One turn at a time per session keeps its history ordered.
+sessions = OrderedDict()
+
+
+def touch(session_id: str) -> Session:
+    session = sessions[session_id]
+    session.last_used = time.monotonic()
+    sessions.move_to_end(session_id)
+    return session
+
+
+async def drop_session(session_id: str) -> bool:
+    session = sessions.pop(session_id, None)
+    if session is None:
+        return False
+    # The runner keeps the conversation history; that is most of a session's memory
+    await runner.session_service.delete_session(app_name=runner.app_name, user_id=session.user_id,
+                                                session_id=session_id)
+    return True
+
+
+async def evict_sessions(room: int = 0) -> int:
+    """
+    Drops the sessions idle for longer than SESSION_TTL, then the least recently used ones
+    beyond MAX_SESSIONS. Sessions with a turn in progress are never dropped.
+
+    Args:
+        room (int): Sessions about to be added, on top of the ones kept.
+
+    Returns:
+        int: Number of sessions dropped.
+    """
+    now = time.monotonic()
+    evicted = []
+    for session_id, session in sessions.items():
+        if len(sessions) - len(evicted) + room <= MAX_SESSIONS and now - session.last_used <= SESSION_TTL:
+            # Every later session was used more recently
+            break
+        if not session.lock.locked():
+            evicted.append((session_id, session, session.last_used))
+    dropped = 0
+    for session_id, session, last_used in evicted:
+        # Each drop awaits the runner, so a request may have started on a later session
+        # meanwhile: only drop it if it is still unused since it was picked
+        if sessions.get(session_id) is not session or session.lock.locked() or session.last_used != last_used:
+            continue
+        if await drop_session(session_id):
+            dropped += 1
+    return dropped
+
+
+async def sweep_sessions():
+    while True:
+        await asyncio.sleep(min(SESSION_SWEEP_INTERVAL, SESSION_TTL))
+        evicted = await evict_sessions()
+        if evicted:
+            print(f"🧹 Dropped {evicted} idle sessions.")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print("🏗️ ApartmentFinder Server Starting...")
+    # Load the inventory and warm the Maps servers before taking traffic,
+    # so the first users do not pay for it
+    await asyncio.to_thread(inventory.get_inventory)
+    try:
+        await maps_mcp.get_pool().start()
+    except Exception as e:
+        print(f"⚠️ WARNING: Could not pre-warm the Maps MCP servers ({e}); they will start on first use.")
+    print(f"✅ Server Ready! Up to {limiter.max_concurrent} concurrent turns, {limiter.max_queued} queued.")
+    sweeper = asyncio.create_task(sweep_sessions())
+    yield
+    sweeper.cancel()
+    await maps_mcp.close_pool()
+    await runner.close()
+
+
+app = FastAPI(title="ApartmentFinder AI", lifespan=lifespan)
+
+
+@app.post("/sessions")
+async def create_session(request: SessionRequest = None):
+    user_id = (request and request.user_id) or f"user-{uuid.uuid4().hex[:8]}"
+    await evict_sessions(room=1)
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id=user_id)
+    sessions[session.id] = Session(user_id)
+    return {"session_id": session.id, "user_id": user_id}
+
+
+async def run_turn(user_id: str, session_id: str, message: str) -> list:
+    # Collect each agent's final answer (manager, analyst, reviewer, summarizer, ...)
+    replies = []
+    content = types.Content(role="user", parts=[types.Part(text=message)])
+    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
+        if event.is_final_response() and event.content and event.content.parts:
+            text = "".join(part.text or "" for part in event.content.parts)
+            if text:
+                replies.append({"author": event.author, "text": text})
+    return replies
+
+
+@app.post("/sessions/{session_id}/messages")
+async def post_message(session_id: str, request: MessageRequest):
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Unknown or expired session. Create one with POST /sessions.")
+    session = touch(session_id)
+    if session.lock.locked():
+        raise HTTPException(status_code=409, detail="The previous message in this session is still being processed.")
+
+    async with session.lock:
+        try:
+            async with limiter.slot():
+                replies = await asyncio.wait_for(run_turn(session.user_id, session_id, request.message), RUN_TIMEOUT)
+        except Overloaded:
+            return JSONResponse(status_code=503, headers={"Retry-After": "5"},
+                                content={"detail": "Server is busy, please retry shortly."})
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="The agent took too long to answer.")
+        finally:
+            # Idle time counts from the end of the turn (unless the session was deleted meanwhile)
+            if session_id in sessions:
+                touch(session_id)
+
+    return {"reply": replies[-1]["text"] if replies else "", "events": replies}
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not await drop_session(session_id):
+        raise HTTPException(status_code=404, detail="Unknown session.")
+    return {"deleted": session_id}
+
+
+@app.get("/healthz")
+async def health():
+    return {
+        "sessions": len(sessions),
+        "active_turns": limiter.active,
+        "queued_turns": limiter.waiting,
+        "listings": len(inventory.get_inventory()),
+        "maps_mcp": maps_mcp.get_pool().stats,
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus text format; empty unless telemetry is enabled (see apartment_finder/telemetry.py)
+    return telemetry.render_prometheus()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve ApartmentFinder AI over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    # Ensuring we have set the Maps Key before starting
+    if not os.getenv("GOOGLE_MAPS_API_KEY"):
+        print("⚠️ WARNING: GOOGLE_MAPS_API_KEY is missing from .env")
+
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,54 @@
+# This is a test script to verify that 'check_commutes' only sends cache misses to Maps (offline, uses the stub server)
+import asyncio
+import json
+import os
+import tempfile
+
+# Point the tool at the stub server and a throwaway cache before importing it
+os.environ["MAPS_MCP_SERVER"] = os.path.join(os.getcwd(), "benchmarks", "stub_maps_server.py")
+os.environ["MAPS_MCP_POOL_SIZE"] = "1"
+os.environ["COMMUTE_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "commute_cache.sqlite")
+
+from apartment_finder import commute_cache, maps_mcp
+from apartment_finder.tools import check_commutes
+
+
+async def maps_calls():
+    result = await maps_mcp.get_pool().call_tool("stub_stats", {})
+    return json.loads(result.content[0].text)["elements"]
+
+
+async def run_test():
+    print("🧪 Testing the commute cache...")
+    destination = "Austin-Bergstrom International Airport"
+    first = ["30.2672,-97.7431", "30.2422,-97.7552"]
+
+    try:
+        # 1. Cold cache: every origin goes to Maps
+        cold = json.loads(await check_commutes(first, destination))
+        assert await maps_calls() == 2
+        print("✅ Cold cache sent all origins to Maps.")
+
+        # 2. Same landmark with different casing, a nearby origin and a new one: only the new one is fetched
+        batch = ["30.40150,-97.71950", "30.26721,-97.74312", "30.2422,-97.7552"]
+        warm = json.loads(await check_commutes(batch, "  austin-bergstrom international AIRPORT "))
+        assert await maps_calls() == 3
+        print("✅ Warm cache sent only the 1 missing origin to Maps.")
+
+        # 3. Results are merged back in input order
+        assert warm["results"][1] == cold["results"][0]
+        assert warm["results"][2] == cold["results"][1]
+        assert warm["origin_addresses"][0].startswith("30.40150,-97.71950")
+        print("✅ Cached and fresh results merged in the original order.")
+
+        # 4. The disk level survives a new process (simulated by dropping the in-memory LRU)
+        commute_cache.get_cache()._lru.clear()
+        await check_commutes(first, destination)
+        assert await maps_calls() == 3
+        print("✅ SQLite level served the results after the LRU was cleared.")
+    finally:
+        await maps_mcp.close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_test())
@@ -0,0 +1,58 @@
+# This is a test script to verify that 'check_commutes' splits large batches into API-sized chunks (offline, uses the stub server)
+import asyncio
+import json
+import os
+import tempfile
+
+# Point the tool at the stub server and a throwaway cache before importing it
+os.environ["MAPS_MCP_SERVER"] = os.path.join(os.getcwd(), "benchmarks", "stub_maps_server.py")
+os.environ["MAPS_MCP_POOL_SIZE"] = "2"
+os.environ["COMMUTE_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "commute_cache.sqlite")
+
+from apartment_finder import maps_mcp
+from apartment_finder.tools import check_commutes
+
+DESTINATION = "Downtown Austin, Austin, TX"
+
+
+def origins(n, start=0):
+    return [f"{30 + (start + i) / 1000:.4f},-97.7431" for i in range(n)]
+
+
+async def run_test():
+    print("🧪 Testing distance matrix chunking...")
+    try:
+        # 1. 60 origins (over the 25-origin API cap) come back complete and in input order
+        batch = origins(60)
+        result = json.loads(await check_commutes(batch, DESTINATION))
+        assert [address.split(" ")[0] for address in result["origin_addresses"]] == batch
+        assert len(result["results"]) == 60 and "errors" not in result
+        assert all(row["elements"][0]["status"] == "OK" for row in result["results"])
+        assert result["destination_addresses"] == [f"{DESTINATION} (stub)"]
+        print("✅ 60 origins split into chunks of 25 and merged back in order.")
+
+        # 2. A failing chunk does not lose the others
+        batch = origins(30, start=100)
+        batch[27] = "STUB_FAIL"
+        result = json.loads(await check_commutes(batch, DESTINATION))
+        statuses = [row["elements"][0]["status"] for row in result["results"]]
+        assert statuses == ["OK"] * 25 + ["UNKNOWN_ERROR"] * 5, statuses
+        assert result["errors"] == [{"origins": [25, 26, 27, 28, 29],
+                                     "error": "Distance matrix request failed: INVALID_REQUEST"}], result["errors"]
+        print("✅ Partial results returned with the failed chunk's origins and error.")
+
+        # 3. The chunk's good origins are retried next time; the cached ones are not
+        batch[27] = origins(1, start=500)[0]
+        result = json.loads(await check_commutes(batch, DESTINATION))
+        assert "errors" not in result and len(result["results"]) == 30
+        print("✅ Failed origins fetched again on the next call.")
+
+        # 4. When nothing could be fetched, the error is reported as before
+        assert await check_commutes(["STUB_FAIL"], DESTINATION) == "Distance matrix request failed: INVALID_REQUEST"
+        print("✅ A single failed request still returns the Maps error.")
+    finally:
+        await maps_mcp.close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_test())
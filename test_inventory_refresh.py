@@ -0,0 +1,94 @@
+# This is a test script to verify refreshing the inventory in place (offline, uses a small generated dataset)
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Refresh on demand only, no background thread
+os.environ["INVENTORY_REFRESH_INTERVAL"] = "0"
+
+from apartment_finder import inventory
+
+CITIES = [("Austin", "TX"), ("Dallas", "TX"), ("Orlando", "FL"), ("Denver", "CO")]
+
+
+def make_listings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    city = rng.integers(0, len(CITIES), n)
+    return pd.DataFrame({
+        "id": np.arange(n) + 1000,
+        "agent_description": "1 Bed, 1 Bath apartment",
+        "monthly_price": rng.integers(500, 4000, n).astype(float),
+        "address": [f"{i} Main St" for i in range(n)],
+        "city": [CITIES[c][0] for c in city],
+        "state": [CITIES[c][1] for c in city],
+        "latitude": 30 + rng.random(n),
+        "longitude": -97 - rng.random(n),
+    })
+
+
+def same_results(a, b):
+    # Every city/budget combination returns the same listings from both inventories
+    for city, state in CITIES:
+        for budget in (600, 1500, 2500, 5000):
+            rows_a, _ = a.query(city, state, budget, k=len(a))
+            rows_b, _ = b.query(city, state, budget, k=len(b))
+            if sorted(a.records(rows_a)['id']) != sorted(b.records(rows_b)['id']):
+                return False
+            near_a, _ = a.query(city, state, budget, sort_by="distance", lat=30.5, lng=-97.5)
+            near_b, _ = b.query(city, state, budget, sort_by="distance", lat=30.5, lng=-97.5)
+            if list(a.records(near_a)['id']) != list(b.records(near_b)['id']):
+                return False
+    return True
+
+
+def run_test():
+    print("🧪 Testing in-place inventory refresh...")
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("data")
+
+    listings = make_listings(2000)
+    listings.to_csv(inventory.DATA_PATH, index=False)
+    inventory.write_version()
+    before = inventory.get_inventory()
+    old_ids = set(before.df['id'])
+
+    # 1. Nothing changed on disk: no refresh
+    assert not inventory.refresh_inventory()
+    print("✅ Unchanged version is not reloaded.")
+
+    # 2. New version: delete some listings, change a price and a city, add new ones (only in Denver)
+    updated = listings[listings['id'] % 10 != 0].copy()
+    updated.loc[updated.index[5], 'monthly_price'] = 999.0
+    updated.loc[updated.index[7], ['city', 'state']] = ["Dallas", "TX"]
+    new = make_listings(50, seed=1).assign(id=lambda d: d['id'] + 100000, city="Denver", state="CO")
+    updated = pd.concat([updated, new]).sample(frac=1, random_state=0)
+    updated.to_csv(inventory.DATA_PATH, index=False)
+    inventory.write_version()
+
+    assert inventory.refresh_inventory()
+    after = inventory.get_inventory()
+    assert after is not before
+    print("✅ New version swapped in.")
+
+    # 3. The incrementally updated index matches one built from scratch
+    assert same_results(after, inventory.Inventory(inventory.load_listings()))
+    print("✅ Incremental index matches a full rebuild.")
+
+    # 4. Requests holding the old inventory still see the old, consistent data
+    assert set(before.df['id']) == old_ids
+    assert same_results(before, inventory.Inventory(listings))
+    print("✅ Old inventory untouched for in-flight requests.")
+
+    # 5. Workers and the watcher may rewrite the same files at once: each uses its own temp file
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: inventory.write_snapshot(updated), range(8)))
+        list(pool.map(lambda _: inventory.write_version(), range(8)))
+    assert not [name for name in os.listdir("data") if name.endswith(".tmp")]
+    assert len(inventory.load_listings()) == len(updated)
+    print("✅ Concurrent snapshot and version writes never collide.")
+
+
+if __name__ == "__main__":
+    run_test()
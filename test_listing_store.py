@@ -0,0 +1,90 @@
+# This is a test script to verify the compact listing store: the side-file text and float32 prices (offline, generated data)
+import json
+import os
+import tempfile
+
+os.environ["INVENTORY_REFRESH_INTERVAL"] = "0"
+
+import numpy as np
+import pandas as pd
+from apartment_finder import inventory, tools
+from apartment_finder.inventory import Inventory
+
+CITIES = [("Austin", "TX"), ("Dallas", "TX"), ("Orlando", "FL")]
+
+
+def make_listings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    city = rng.integers(0, len(CITIES), n)
+    return pd.DataFrame({
+        "id": np.arange(n) + 1000,
+        "agent_description": "1 Bed, 1 Bath apartment",
+        "body": [f"Listing {i}: pool, covered parking, cats allowed. " * (i % 3 + 1) for i in range(n)],
+        "monthly_price": rng.integers(500, 4000, n).astype(float),
+        "address": [f"{i} Main St" for i in range(n)],
+        "city": [CITIES[c][0] for c in city],
+        "state": [CITIES[c][1] for c in city],
+        "latitude": 30 + rng.random(n),
+        "longitude": -97 - rng.random(n),
+    })
+
+
+def run_test():
+    print("🧪 Testing the compact listing store...")
+    os.chdir(tempfile.mkdtemp())
+    df = make_listings(300)
+    df.loc[5, "body"] = np.nan
+    df.to_csv("listings.csv", index=False)
+    inventory.write_snapshot(df, "listings.feather")
+    ids = [1000, 1005, 1299, 99]
+
+    # 1. The text is not kept in memory; the side file is read on the first lookup only
+    db = Inventory(df, "v1", csv_path="listings.csv", snapshot_path="listings.feather")
+    assert "body" not in db.df.columns
+    db.query("Austin", "TX", 4000)
+    assert db._text is None
+    text = db.listing_text(ids)
+    assert text[1000] == df.loc[0, "body"] and text[1299] == df.loc[299, "body"]
+    assert pd.isna(text[1005]) and pd.isna(text[99])
+    os.rename(inventory.side_text_path("listings.feather"), "moved.feather")
+    assert db.listing_text([1001]).tolist() == [df.loc[1, "body"]]
+    print("✅ Side file read lazily, once.")
+
+    # 2. Without a side file the text comes from the CSV; a CSV without it gives no text
+    from_csv = Inventory(df, "v1", csv_path="listings.csv", snapshot_path="listings.feather")
+    assert from_csv.listing_text(ids).equals(text)
+    df.drop(columns=["body"]).to_csv("no_body.csv", index=False)
+    no_body = Inventory(df, "v1", csv_path="no_body.csv", snapshot_path=None)
+    assert no_body.listing_text(ids).isna().all()
+    print("✅ CSV fallback works, with or without the text column.")
+
+    # 3. The tool returns the text by id, cut to the limit, and explains bad input
+    inventory._inventory = db
+    details = json.loads(tools.get_listing_details([1002, 1005, 99]))
+    assert [d["id"] for d in details] == [1002, 1005, 99]
+    assert details[0]["details"] == df.loc[2, "body"][:tools.LISTING_DETAILS_MAX_CHARS]
+    assert details[1]["details"] is None and details[2]["details"] is None
+    assert "error" in json.loads(tools.get_listing_details(["not an id"]))
+    inventory._inventory = Inventory(pd.DataFrame(), "empty", snapshot_path=None)
+    assert "error" in json.loads(tools.get_listing_details([1000]))
+    print("✅ get_listing_details returns the listing text to the agent.")
+
+    # 4. Prices are float32: a listing priced exactly at the budget is still in it
+    edge = make_listings(3)
+    edge["city"], edge["state"] = "Austin", "TX"
+    edge["monthly_price"] = [1500.01, 1999.99, 1234.57]
+    assert float(np.float32(1500.01)) > 1500.01
+    db = Inventory(edge, "edge", snapshot_path=None)
+    for price in edge["monthly_price"]:
+        rows, _ = db.query("Austin", "TX", price, min_budget=price)
+        assert len(rows) == 1, price
+    rows, _ = db.query("Austin", "TX", 1500.0)
+    assert len(rows) == 1
+    inventory._inventory = db
+    assert len(json.loads(tools.fetch_apartments("Austin", "TX", 1500.01))) == 2
+    print("✅ Budgets compare at the stored float32 precision.")
+    inventory._inventory = None
+
+
+if __name__ == "__main__":
+    run_test()
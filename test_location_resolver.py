@@ -0,0 +1,87 @@
+# This is a test script to verify the fuzzy city/state resolution used by 'fetch_apartments' (offline)
+import json
+import os
+import tempfile
+import time
+
+os.environ["INVENTORY_REFRESH_INTERVAL"] = "0"
+
+import pandas as pd
+from apartment_finder import inventory, tools
+from apartment_finder.inventory import LocationResolver
+
+PLACES = [("Austin", "TX"), ("Houston", "TX"), ("Fort Worth", "TX"), ("Saint Louis", "MO"),
+          ("San Francisco", "CA"), ("Los Angeles", "CA"), ("Springfield", "IL"), ("Springfield", "MO"),
+          ("Portland", "OR"), ("Portland", "ME"), ("City102", "NY"), ("City1002", "NY"), ("Billings", "MT"),
+          ("Mount Vernon", "WA")]
+
+
+def run_test():
+    print("🧪 Testing the location resolver...")
+    resolver = LocationResolver(PLACES)
+
+    def resolved(city, state):
+        key = resolver.resolve(city, state)
+        return resolver.display(key) if key else None
+
+    # 1. Exact, abbreviated and full-name inputs
+    assert resolved("Austin", "TX") == "Austin, TX"
+    assert resolved("  austin ", "tx") == "Austin, TX"
+    assert resolved("Austin", "Texas") == "Austin, TX"
+    assert resolved("St. Louis", "MO") == "Saint Louis, MO"
+    assert resolved("Ft Worth", "texas") == "Fort Worth, TX"
+    # "Mt" is spelled out in city names only: "MT" is Montana
+    assert resolver.resolve_state("MT") == "mt" and resolver.resolve_state("mt.") == "mt"
+    assert resolved("Billings", "MT") == "Billings, MT"
+    assert resolved("Billings", "Montana") == "Billings, MT"
+    assert resolved("Mt. Vernon", "WA") == "Mount Vernon, WA"
+    print("✅ Case, abbreviations and state names resolved.")
+
+    # 2. Typos in the city or the state
+    assert resolved("Austn", "TX") == "Austin, TX"
+    assert resolved("Huston", "Texs") == "Houston, TX"
+    assert resolved("San Fransisco", "CA") == "San Francisco, CA"
+    assert resolved("Los Angelas", "Californa") == "Los Angeles, CA"
+    assert resolved("Houston", "TZ") == "Houston, TX"  # unreadable state, unique city
+    print("✅ Misspelled cities and states corrected.")
+
+    # 3. Ambiguous or unknown inputs are not guessed
+    assert resolved("Springfield", "??") is None
+    assert resolved("Portland", "") is None
+    assert resolved("Austin", "NV") is None  # a real state without listings
+    assert resolved("City103", "NY") is None  # numbers are not typos
+    assert resolved("Xyzzy", "TX") is None
+    assert resolver.suggest("Austin", "NV") == ["Austin, TX"]
+    print("✅ Ambiguous and unknown locations left unresolved.")
+
+    # 4. Fast enough to run on every tool call
+    start = time.perf_counter()
+    for _ in range(1000):
+        resolver.resolve("San Fransisco", "California")
+    per_call = (time.perf_counter() - start) / 1000
+    assert per_call < 0.001, per_call
+    print(f"✅ Fuzzy resolution takes {per_call * 1e6:.0f} µs per call.")
+
+    # 5. The tool reports the correction and still returns the listings
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("data")
+    pd.DataFrame({
+        "id": [1, 2, 3], "agent_description": "1 Bed, 1 Bath apartment", "monthly_price": [900.0, 1200.0, 1500.0],
+        "address": ["1 Main St", "2 Main St", "3 Main St"], "city": ["Austin", "Austin", "Saint Louis"],
+        "state": ["TX", "TX", "MO"], "latitude": [30.2, 30.3, 38.6], "longitude": [-97.7, -97.8, -90.2],
+    }).to_csv(os.path.join("data", "apartments_cleaned.csv"), index=False)
+    inventory._inventory = None
+
+    exact = tools.fetch_apartments("Austin", "TX", 2000)
+    assert isinstance(json.loads(exact), list) and len(tools.parse_listings(exact)) == 2
+    corrected = json.loads(tools.fetch_apartments("Austn", "Texas", 2000))
+    assert corrected["resolved"] == "Austin, TX" and corrected["requested"] == "Austn, Texas", corrected
+    assert [apt["id"] for apt in corrected["results"]] == [1, 2]
+    missing = json.loads(tools.fetch_apartments("Austin", "NV", 2000))
+    assert missing["count"] == 0 and "Did you mean: Austin, TX?" in missing["message"], missing
+    assert tools.parse_listings(json.dumps(missing)) == []
+    print("✅ 'fetch_apartments' reports the corrected location.")
+
+
+if __name__ == "__main__":
+    run_test()
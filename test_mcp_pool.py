@@ -0,0 +1,104 @@
+# This is a test script to verify the pooled Maps MCP sessions against the offline stub server (no API key needed)
+import asyncio
+import json
+import os
+import sys
+from mcp import StdioServerParameters
+from apartment_finder import maps_mcp
+from apartment_finder.maps_mcp import MapsMCPPool
+
+STUB_PATH = os.path.join(os.getcwd(), "benchmarks", "stub_maps_server.py")
+
+
+async def stub_pid(pool):
+    result = await pool.call_tool("stub_stats", {})
+    return json.loads(result.content[0].text)["pid"]
+
+
+async def run_test():
+    print("🧪 Testing the Maps MCP pool with the stub server...")
+    params = StdioServerParameters(command=sys.executable, args=[STUB_PATH])
+    pool = MapsMCPPool(size=2, server_params=params, health_check_interval=0.5)
+
+    try:
+        # 1. A call works and returns the distance matrix JSON
+        result = await pool.call_tool("maps_distance_matrix", {
+            "origins": ["30.2672,-97.7431", "30.2422,-97.7552"],
+            "destinations": ["Austin-Bergstrom International Airport"],
+            "mode": "driving",
+        })
+        data = json.loads(result.content[0].text)
+        assert len(data["results"]) == 2, data
+        print("✅ Distance matrix call returned one row per origin.")
+
+        # 2. Servers are reused: many calls, at most one spawn per slot
+        await asyncio.gather(*(stub_pid(pool) for _ in range(20)))
+        assert pool.stats["spawns"] <= 2, pool.stats
+        print(f"✅ 21 calls served by {pool.stats['spawns']} server process(es).")
+
+        # 3. A crashed server is restarted transparently
+        await pool.start()
+        before = pool.stats["restarts"]
+        for _ in range(pool.size):
+            try:
+                await pool.call_tool("stub_exit", {})
+            except Exception:
+                pass
+        await stub_pid(pool)
+        assert pool.stats["restarts"] > before, pool.stats
+        print(f"✅ Crashed servers restarted ({pool.stats['restarts'] - before} restart(s)).")
+
+        # 4. Idle servers are health-checked (pinged) before reuse
+        await asyncio.sleep(0.6)
+        await stub_pid(pool)
+        assert pool.stats["failed_health_checks"] == 0, pool.stats
+        print("✅ Idle server passed its health check.")
+    finally:
+        await pool.close()
+
+    # 5. Clean shutdown: the pool refuses new work
+    try:
+        await pool.call_tool("stub_stats", {})
+        raise AssertionError("closed pool accepted a call")
+    except RuntimeError:
+        print("✅ Pool closed cleanly.")
+
+    print(f"\n📊 Pool stats: {pool.stats}")
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+
+
+async def shared_pool_pid():
+    result = await maps_mcp.get_pool().call_tool("stub_stats", {})
+    return json.loads(result.content[0].text)["pid"]
+
+
+def run_shared_pool_test():
+    # 6. The shared pool is never replaced while its servers still run on another loop
+    os.environ["MAPS_MCP_SERVER"] = STUB_PATH
+    first = asyncio.run(shared_pool_pid())
+    assert not pid_alive(first)  # asyncio.run shut its servers down with the loop
+    other = asyncio.new_event_loop()
+    second = other.run_until_complete(shared_pool_pid())
+    try:
+        asyncio.run(shared_pool_pid())
+        raise AssertionError("replaced a pool whose loop is still open")
+    except RuntimeError as e:
+        assert "close_pool()" in str(e), e
+    assert pid_alive(second)
+    other.run_until_complete(maps_mcp.close_pool())
+    other.close()
+    assert not pid_alive(second)
+    assert not pid_alive(asyncio.run(shared_pool_pid()))  # a new pool starts once the old one is closed
+    print("✅ Shared pool only replaced once its old servers are shut down.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_test())
+    run_shared_pool_test()
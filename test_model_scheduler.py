@@ -0,0 +1,112 @@
+# This is a test script to verify the process-wide Gemini scheduler (offline: fake model calls)
+import asyncio
+import os
+import time
+
+os.environ["GEMINI_BACKOFF_CAP"] = "0.05"
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import errors, types
+from apartment_finder import model_scheduler, telemetry
+from apartment_finder.model_scheduler import BACKGROUND, INTERACTIVE, RESEARCH, ModelScheduler
+
+
+def request(text):
+    return LlmRequest(model="gemini-2.5-flash", contents=[types.Content(role="user", parts=[types.Part(text=text)])])
+
+
+def fake_model(calls, failures=0, latency=0.0):
+    # A model call that answers 429 'failures' times before it succeeds
+    def generate():
+        async def responses():
+            calls.append(time.monotonic())
+            if len(calls) <= failures:
+                raise errors.ClientError(429, {"error": {"code": 429, "message": "Quota exceeded", "status": "RESOURCE_EXHAUSTED"}})
+            await asyncio.sleep(latency)
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="ok")]))
+        return responses()
+    return generate
+
+
+async def collect(generator):
+    return [response async for response in generator]
+
+
+async def run_test():
+    print("🧪 Testing the Gemini scheduler...")
+    telemetry.configure(trace_path=os.devnull)
+    telemetry.reset()
+
+    # 1. When calls queue up, the manager goes first and the summarizer last
+    scheduler = ModelScheduler(max_rate=20, burst=1)
+    await scheduler.acquire(RESEARCH)  # empties the bucket
+    order = []
+
+    async def call(priority, name):
+        await scheduler.acquire(priority)
+        order.append(name)
+
+    await asyncio.gather(call(BACKGROUND, "summarizer"), call(RESEARCH, "analyst"), call(INTERACTIVE, "manager"),
+                         call(RESEARCH, "reviewer"))
+    assert order == ["manager", "analyst", "reviewer", "summarizer"], order
+    assert scheduler.queue_depth() == 0
+    print("✅ Waiting calls served by priority, then in arrival order.")
+
+    # 2. 429s halve the rate down to the floor; successes win it back gradually
+    scheduler = ModelScheduler(max_rate=8, min_rate=1, burst=4)
+    scheduler.throttled()
+    assert scheduler.rate == 4
+    for _ in range(5):
+        scheduler.throttled()
+    assert scheduler.rate == 1
+    scheduler.succeeded()
+    assert scheduler.rate == 1.4
+    for _ in range(100):
+        scheduler.succeeded()
+    assert scheduler.rate == 8
+    delays = [scheduler.backoff(attempt) for attempt in range(1, 10) for _ in range(20)]
+    assert all(0.025 <= delay <= 0.05 for delay in delays), delays
+    assert len(set(delays)) > 1
+    print("✅ Rate adapts to 429s; backoff is jittered and capped.")
+
+    # 3. A rate-limited call is retried after a backoff instead of failing the turn
+    model_scheduler._scheduler = ModelScheduler(max_rate=100, burst=10)
+    calls = []
+    responses = await collect(model_scheduler.scheduled(fake_model(calls, failures=2), request("hello")))
+    assert [r.content.parts[0].text for r in responses] == ["ok"] and len(calls) == 3
+    assert model_scheduler.get_scheduler().rate < 100
+    os.environ["GEMINI_MAX_ATTEMPTS"] = "2"
+    try:
+        await collect(model_scheduler.scheduled(fake_model([], failures=5), request("again")))
+        raise AssertionError("expected the 429 to surface after the last attempt")
+    except errors.ClientError as e:
+        assert e.code == 429
+    del os.environ["GEMINI_MAX_ATTEMPTS"]
+    print("✅ 429s retried with backoff, then surfaced after the last attempt.")
+
+    # 4. Identical requests in flight together share one call; different ones do not
+    model_scheduler._scheduler = ModelScheduler(max_rate=100, burst=10)
+    calls = []
+    results = await asyncio.gather(*(collect(model_scheduler.scheduled(fake_model(calls, latency=0.1), request("same")))
+                                     for _ in range(3)))
+    assert len(calls) == 1 and all(r[0].content.parts[0].text == "ok" for r in results)
+    assert results[0][0] is not results[1][0]  # every caller gets its own copy
+    calls = []
+    await asyncio.gather(*(collect(model_scheduler.scheduled(fake_model(calls, latency=0.1), request(f"q{i}")))
+                           for i in range(3)))
+    assert len(calls) == 3
+    print("✅ Identical concurrent requests coalesced into one call.")
+
+    # 5. Queue depth, wait time and throttling are exported
+    metrics = telemetry.render_prometheus()
+    for name in ("gemini_queue_depth", "gemini_queue_wait_seconds", "gemini_throttled_total",
+                 "gemini_rate_limit", "gemini_coalesced_total"):
+        assert f"apartment_finder_{name}" in metrics, name
+    print("✅ Scheduler metrics exported.")
+    model_scheduler._scheduler = None
+    telemetry.configure(trace_path="", metrics_port=0)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_test())
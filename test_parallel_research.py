@@ -0,0 +1,83 @@
+# This is a test script to verify the parallel research mode end to end (offline: scripted model,
+# stub Maps MCP server and a small generated dataset)
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ["INVENTORY_REFRESH_INTERVAL"] = "0"
+os.environ["SAFETY_CACHE_TTL"] = "0"
+os.environ["RESEARCH_CACHE_TTL"] = "0"
+
+import numpy as np
+import pandas as pd
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+from apartment_finder import agent, maps_mcp, parallel_research
+from benchmarks.end_to_end import ScriptedModel, neighborhood_script, summarizer_script, manager_script
+
+CITIES = [("Austin", "TX"), ("Dallas", "TX"), ("Orlando", "FL"), ("Denver", "CO")]
+
+
+def make_listings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    city = rng.integers(0, len(CITIES), n)
+    return pd.DataFrame({
+        "id": np.arange(n) + 1000,
+        "agent_description": "1 Bed, 1 Bath apartment",
+        "monthly_price": rng.integers(500, 4000, n).astype(float),
+        "address": [f"{i} Main St" for i in range(n)],
+        "city": [CITIES[c][0] for c in city],
+        "state": [CITIES[c][1] for c in city],
+        "latitude": 30 + rng.random(n),
+        "longitude": -97 - rng.random(n),
+    })
+
+
+REVIEW_LATENCY = 0.3
+
+
+async def run_test():
+    print("🧪 Testing the parallel research mode...")
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("data")
+    make_listings(500).to_csv(os.path.join("data", "apartments_cleaned.csv"), index=False)
+
+    reviewer_model = ScriptedModel(model="neighborhood_reviewer", script=neighborhood_script, latency=REVIEW_LATENCY)
+    summarizer = agent.summarizer.clone(update={"model": ScriptedModel(model="summarizer", script=summarizer_script)})
+    team = parallel_research.build_research_team(reviewer_model, summarizer, concurrency=4)
+    root = agent.root_agent.clone(update={"model": ScriptedModel(model="manager", script=manager_script),
+                                          "sub_agents": [team]})
+    runner = InMemoryRunner(agent=root)
+
+    try:
+        session = await runner.session_service.create_session(app_name=runner.app_name, user_id="test")
+        message = "I'm moving and need a place in Austin, TX under $3000, commuting to Downtown Austin."
+        seen = {}  # author -> time of its last event
+        async for event in runner.run_async(user_id="test", session_id=session.id,
+                                            new_message=types.Content(role="user", parts=[types.Part(text=message)])):
+            seen[event.author] = time.perf_counter()
+        session = await runner.session_service.get_session(app_name=runner.app_name, user_id="test", session_id=session.id)
+        state = session.state
+    finally:
+        await maps_mcp.close_pool()
+        await runner.close()
+
+    # 1. Every stage ran and the summarizer got the merged report
+    for name in ("scout", "commuter", "neighborhood_reviewer", "FieldWork", "summarizer"):
+        assert name in seen, seen
+    assert len(state["listings"]) == 5, state["listings"]
+    assert state["analyst_dossier"].count("commute to Downtown Austin") == 5, state["analyst_dossier"]
+    assert "mins" in state["analyst_dossier"], state["analyst_dossier"]
+    assert state["safety_report"].count("generally safe") == 3, state["safety_report"]
+    assert state["summary"].startswith("Here are the best apartments in Austin, TX")
+    print("✅ Listings, commutes and safety reviews merged for the summarizer.")
+
+    # 2. The three safety reviews ran concurrently (not 3 x the model latency)
+    elapsed = seen["neighborhood_reviewer"] - seen["scout"]
+    assert elapsed < 2 * REVIEW_LATENCY, elapsed
+    print(f"✅ 3 safety reviews at {REVIEW_LATENCY * 1000:.0f} ms each finished in {elapsed * 1000:.0f} ms total.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_test())
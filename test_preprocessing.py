@@ -0,0 +1,86 @@
+# This is a test script to verify the vectorized and chunked preprocessing (offline, generated raw data)
+import filecmp
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from pyarrow import feather
+
+import preprocessing
+from apartment_finder import inventory
+
+CITIES = [("Austin", "TX"), ("Orlando", "FL"), ("St. Louis", "MO"), (None, "CO"), ("Denver", None), (None, None)]
+
+
+def make_raw_listings(n, seed=0):
+    # The columns of the Kaggle dump, with the gaps the cleaning has to handle
+    rng = np.random.default_rng(seed)
+    city = rng.integers(0, len(CITIES), n)
+    price = rng.integers(500, 4000, n)
+    price_type = rng.choice(["Monthly", "Monthly", "Monthly", "Weekly", "Monthly|Weekly"], n)
+    return pd.DataFrame({
+        "id": np.arange(n) + 5000,
+        "category": rng.choice(["housing/rent/apartment", "housing/rent/condo", "housing/rent/home", None], n),
+        "title": "Title",
+        "body": [f"Listing {i}, close to everything" for i in range(n)],
+        "amenities": None,
+        "bathrooms": rng.choice([0.0, 1.0, 1.5, 2.0, np.nan], n),
+        "bedrooms": rng.choice([0.0, 1.0, 2.0, 3.0, np.nan], n),
+        "currency": "USD",
+        "fee": "No",
+        "has_photo": "Thumbnail",
+        "pets_allowed": None,
+        "price": price,
+        "price_display": [f"${p:,}" if i % 11 else f"${p:,}-{p + 200:,}" for i, p in enumerate(price)],
+        "price_type": price_type,
+        "square_feet": rng.integers(300, 2000, n),
+        "address": [f"{i} Main St" if i % 7 else None for i in range(n)],
+        "cityname": [CITIES[c][0] for c in city],
+        "state": [CITIES[c][1] for c in city],
+        "latitude": np.where(np.arange(n) % 13 == 0, np.nan, 30 + rng.random(n)),
+        "longitude": -97 - rng.random(n),
+        "source": "RentLingo",
+        "time": 1577359415,
+    })
+
+
+def make_desc_rowwise(row):
+    # The original row-wise implementation, kept as the reference
+    bed_str = "Studio" if row['bedrooms'] == 0.0 else f"{int(row['bedrooms'])} Bed"
+    bath_str = f"{int(row['bathrooms'])} Bath"
+    return f"{bed_str}, {bath_str} apartment in {row['city']}, {row['state']}"
+
+
+def run_test():
+    print("🧪 Testing the vectorized and chunked preprocessing...")
+    os.chdir(tempfile.mkdtemp())
+    raw_path = "raw.csv"
+    make_raw_listings(3000).to_csv(raw_path, sep=";", encoding="cp1252", index=False)
+
+    # 1. agent_description matches the row-wise apply, also for listings without a city or state
+    raw = pd.read_csv(raw_path, **preprocessing.RAW_CSV_OPTIONS)
+    cleaned = preprocessing.clean_apartments(raw, preprocessing.orlando_prices(raw).mean())
+    expected = cleaned.apply(make_desc_rowwise, axis=1)
+    assert list(cleaned['agent_description']) == list(expected)
+    missing = cleaned['city'].isna() | cleaned['state'].isna()
+    assert missing.any() and cleaned.loc[missing, 'agent_description'].str.contains("nan").all()
+    print(f"✅ Descriptions match the row-wise version ({int(missing.sum())} without a city or state).")
+
+    # 2. Chunked and in-memory cleaning write the same file
+    preprocessing.preprocess(raw_path, "memory.csv")
+    preprocessing.preprocess_chunked(raw_path, "chunked.csv", chunksize=700)
+    assert filecmp.cmp("memory.csv", "chunked.csv", shallow=False)
+    print("✅ Chunked output is byte-identical to the in-memory output.")
+
+    # 3. The streamed snapshot is the one write_snapshot builds from the whole CSV
+    inventory.write_snapshot(inventory.read_csv("chunked.csv"), "memory.feather")
+    inventory.write_snapshot_chunked("chunked.csv", "chunked.feather", chunksize=700)
+    for path in ("memory.feather", inventory.side_text_path("memory.feather")):
+        streamed = path.replace("memory", "chunked")
+        pd.testing.assert_frame_equal(feather.read_table(path).to_pandas(), feather.read_table(streamed).to_pandas())
+    assert not [name for name in os.listdir(".") if name.endswith(".tmp")]
+    print("✅ Streamed snapshot matches the one built in memory.")
+
+
+if __name__ == "__main__":
+    run_test()
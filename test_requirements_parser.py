@@ -0,0 +1,90 @@
+# This is a test script to verify the deterministic requirement parser that skips the manager's model call (offline)
+import json
+import os
+import tempfile
+
+os.environ["INVENTORY_REFRESH_INTERVAL"] = "0"
+
+import numpy as np
+import pandas as pd
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+from apartment_finder import inventory, requirements_parser
+from apartment_finder.requirements_parser import parse_budget, parse_requirements
+
+CITIES = [("Austin", "TX"), ("Dallas", "TX"), ("Orlando", "FL"), ("Denver", "CO")]
+
+
+def make_listings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    city = rng.integers(0, len(CITIES), n)
+    return pd.DataFrame({
+        "id": np.arange(n) + 1000,
+        "agent_description": "1 Bed, 1 Bath apartment",
+        "monthly_price": rng.integers(500, 4000, n).astype(float),
+        "address": [f"{i} Main St" for i in range(n)],
+        "city": [CITIES[c][0] for c in city],
+        "state": [CITIES[c][1] for c in city],
+        "latitude": 30 + rng.random(n),
+        "longitude": -97 - rng.random(n),
+    })
+
+
+LOCATIONS = {"austin": {"TX": "Austin"}, "portland": {"OR": "Portland", "ME": "Portland"},
+             "seattle": {"WA": "Seattle"}, "salt lake city": {"UT": "Salt Lake City"}}
+
+
+def request(*parts):
+    return LlmRequest(contents=[types.Content(role="user", parts=list(parts))])
+
+
+def run_test():
+    print("🧪 Testing the requirement parser fast path...")
+
+    # 1. Budgets: one plausible value, written any common way
+    assert parse_budget("under $2,500") == 2500
+    assert parse_budget("for 2.5k a month") == 2500
+    assert parse_budget("budget of 1800") == 1800
+    assert parse_budget("$2000 or $2500") is None
+    assert parse_budget("at 1200 Main St") is None
+    print("✅ Budgets parsed, ambiguous ones rejected.")
+
+    # 2. Complete requests become the manager's handoff
+    assert parse_requirements("Austin TX under $2500 near UT campus", LOCATIONS) == \
+        {"city": "Austin", "state": "TX", "budget": 2500, "landmark": "UT campus"}
+    assert parse_requirements("Salt Lake City, Utah, max 1900, commuting to the University of Utah.", LOCATIONS) == \
+        {"city": "Salt Lake City", "state": "UT", "budget": 1900, "landmark": "University of Utah"}
+    assert parse_requirements("Portland, Maine close to the Old Port for $1500/month", LOCATIONS)["state"] == "ME"
+    print("✅ City, state, budget and landmark extracted.")
+
+    # 3. Anything missing or ambiguous is left to the model
+    assert parse_requirements("Looking in Portland or Seattle, budget 2k, near downtown", LOCATIONS) is None
+    assert parse_requirements("Portland under $1500 near the Old Port", LOCATIONS) is None  # which Portland?
+    assert parse_requirements("Austin TX near UT campus", LOCATIONS) is None
+    assert parse_requirements("Austin TX under $2500", LOCATIONS) is None
+    assert parse_requirements("Hi there!", LOCATIONS) is None
+    print("✅ Incomplete or ambiguous requests go to the manager model.")
+
+    # 4. The callback answers with the handoff + transfer, only for a new user message
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("data")
+    make_listings(200).to_csv(os.path.join("data", "apartments_cleaned.csv"), index=False)
+    inventory._inventory = None
+    callback = requirements_parser.fast_path("ResearchTeam")
+
+    response = callback(None, request(types.Part(text="Dallas, Texas under $1,800, near Love Field")))
+    text, call = response.content.parts
+    assert json.loads(text.text) == {"city": "Dallas", "state": "TX", "budget": 1800, "landmark": "Love Field"}
+    assert call.function_call.name == "transfer_to_agent"
+    assert call.function_call.args == {"agent_name": "ResearchTeam"}
+    assert callback(None, request(types.Part(text="Somewhere warm please"))) is None
+    tool_reply = types.Part(function_response=types.FunctionResponse(name="transfer_to_agent", response={}))
+    assert callback(None, request(tool_reply)) is None
+    os.environ["REQUIREMENTS_FAST_PATH"] = "0"
+    assert callback(None, request(types.Part(text="Dallas, Texas under $1,800, near Love Field"))) is None
+    del os.environ["REQUIREMENTS_FAST_PATH"]
+    print("✅ Manager model call skipped for complete requests only.")
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,51 @@
+# This is a test script to verify the research result cache (offline, no API keys needed)
+import time
+from apartment_finder.research_cache import ResearchCache, parse_requirements
+
+RESULT = {"analyst_dossier": "3 listings", "safety_report": "All safe", "summary": "Top pick: 12 Main St"}
+
+
+def run_test():
+    print("🧪 Testing the research cache...")
+
+    # 1. The manager's handoff JSON is recognized, with or without surrounding text
+    request = parse_requirements('Here you go: {"city": "Austin", "state": "TX", "budget": "$2,450", "landmark": "UT Campus"}')
+    assert request == {"city": "Austin", "state": "TX", "budget": 2450.0, "landmark": "UT Campus"}, request
+    assert parse_requirements("What is your budget?") is None
+    print("✅ Requirements parsed from the manager's handoff.")
+
+    # 2. Near-identical requests share an entry; other cities, landmarks and buckets do not
+    cache = ResearchCache(ttl=60, max_entries=2, budget_bucket=100)
+    cache.put(request, "v1", RESULT, max_price=2400)
+    similar = {"city": " austin ", "state": "tx", "budget": 2499, "landmark": "ut  campus"}
+    assert cache.get(similar, "v1") == RESULT
+    assert cache.get({**request, "budget": 2550}, "v1") is None
+    assert cache.get({**request, "city": "Dallas"}, "v1") is None
+    assert cache.get({**request, "landmark": "Airport"}, "v1") is None
+    print("✅ Same city, landmark and budget bucket hit the cache.")
+
+    # 3. Never serve a listing above the requested budget
+    assert cache.get({**request, "budget": 2410}, "v1") == RESULT
+    assert cache.get({**request, "budget": 2395}, "v1") is None
+    print("✅ Results with listings over the budget are not reused.")
+
+    # 4. A new inventory version invalidates the entry
+    assert cache.get(request, "v2") is None
+    assert cache.get(request, "v1") is None
+    print("✅ Inventory changes invalidate cached results.")
+
+    # 5. LRU cap and TTL
+    for city in ("Austin", "Dallas", "Denver"):
+        cache.put({**request, "city": city}, "v1", RESULT)
+    assert cache.get({**request, "city": "Austin"}, "v1") is None
+    assert cache.get({**request, "city": "Denver"}, "v1") == RESULT
+    short = ResearchCache(ttl=0.05, max_entries=10)
+    short.put(request, "v1", RESULT)
+    time.sleep(0.1)
+    assert short.get(request, "v1") is None
+    assert not ResearchCache(ttl=0).enabled
+    print("✅ Oldest entries evicted; expired entries not served.")
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,80 @@
+# This is a test script to verify the neighborhood safety cache used by the reviewer (offline)
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from apartment_finder import safety_cache
+from apartment_finder.safety_cache import SafetyCache, geohash
+
+LISTINGS = [
+    {"id": 1, "address": "100 Congress Ave", "latitude": 30.2650, "longitude": -97.7430, "monthly_price": 2100.0},
+    {"id": 2, "address": "4629 Main St", "latitude": 30.2717, "longitude": -97.8962, "monthly_price": 1824.0},
+]
+
+
+def fake_context(state):
+    # The parts of ADK's CallbackContext the reviewer callbacks use
+    response = SimpleNamespace(name="fetch_apartments", response={"result": json.dumps(LISTINGS)})
+    event = SimpleNamespace(invocation_id="inv-1", get_function_responses=lambda: [response])
+    return SimpleNamespace(invocation_id="inv-1", session=SimpleNamespace(events=[event]), state=state)
+
+
+def run_test():
+    print("🧪 Testing the neighborhood safety cache...")
+
+    # 1. Geohash: standard encoding, nearby points share a neighborhood
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geohash(30.2650, -97.7430) == geohash(30.2652, -97.7433)
+    assert geohash(30.2650, -97.7430) != geohash(30.2717, -97.8962)
+    print("✅ Geohash neighborhoods computed.")
+
+    # 2. Findings persist across cache instances (processes) and expire
+    path = os.path.join(tempfile.mkdtemp(), "safety.sqlite")
+    cache = SafetyCache(path=path, ttl=60)
+    cell = cache.neighborhood(30.2650, -97.7430)
+    cache.put_many({cell: {"address": "100 Congress Ave", "finding": "Busy but safe downtown block."}})
+    assert SafetyCache(path=path, ttl=60).get_many([cell])[cell]["finding"] == "Busy but safe downtown block."
+    short = SafetyCache(path=os.path.join(tempfile.mkdtemp(), "s.sqlite"), ttl=0.05)
+    short.put_many({cell: {"address": "x", "finding": "y"}})
+    time.sleep(0.1)
+    assert short.get_many([cell]) == {}
+    # A listing without an address must not cost the other findings of the batch
+    other = cache.neighborhood(30.2717, -97.8962)
+    cache.put_many({cell: {"address": None, "finding": "Safe."}, other: {"address": "4629 Main St", "finding": "Quiet."}})
+    assert sorted(cache.get_many([cell, other])) == sorted([cell, other])
+    print("✅ Findings shared through SQLite and expire after the TTL.")
+
+    # 3. Reviewer callbacks: known findings go into the prompt, searched ones are stored
+    safety_cache._cache = SafetyCache(path=os.path.join(tempfile.mkdtemp(), "r.sqlite"), ttl=60)
+    dossier = "- 100 Congress Ave: $2100\n- 4629 Main St: $1824"
+    state = {"analyst_dossier": dossier}
+    safety_cache.before_review(fake_context(state))
+    assert state["known_safety_findings"] == "None", state
+    assert safety_cache.skip_known_search(fake_context(state), None) is None
+
+    state["safety_report"] = 'Report...\nSAFETY_FINDINGS: [{"address": "100 Congress Ave, Austin, TX", "finding": "Safe."}]'
+    safety_cache.after_review(fake_context(state))
+    assert state["safety_report"] == "Report...", state  # the summarizer never sees the findings line
+    safety_cache.before_review(fake_context(state))
+    assert state["known_safety_findings"] == "- 100 Congress Ave: Safe.", state
+    assert safety_cache.skip_known_search(fake_context(state), None) is None  # 4629 Main St still unknown
+    print("✅ Searched findings stored; known ones passed to the reviewer.")
+
+    state["safety_report"] = 'SAFETY_FINDINGS: [{"address": "4629 Main St", "finding": "Quiet suburb."}]'
+    safety_cache.after_review(fake_context(state))
+    response = safety_cache.skip_known_search(fake_context(state), None)
+    assert response is not None and "Quiet suburb." in response.content.parts[0].text
+    print("✅ Search skipped when every neighborhood is known.")
+
+    # 4. The findings line is removed even when the cache is off
+    safety_cache._cache = SafetyCache(ttl=0)
+    state["safety_report"] = 'Safe area.\nSAFETY_FINDINGS: [{"address": "4629 Main St", "finding": "Quiet."}]\n'
+    safety_cache.after_review(fake_context(state))
+    assert state["safety_report"] == "Safe area.", state
+    print("✅ SAFETY_FINDINGS line stripped from the report the summarizer reads.")
+    safety_cache._cache = None
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,159 @@
+# This is a test script to verify the search filters and top-k ranking of 'fetch_apartments' (offline, generated data)
+import json
+import os
+import tempfile
+
+os.environ["INVENTORY_REFRESH_INTERVAL"] = "0"
+
+import numpy as np
+import pandas as pd
+from apartment_finder import inventory, requirements_parser, research_cache, tools
+from apartment_finder.inventory import Inventory, top_k
+from apartment_finder.sql_store import SQLiteInventory, write_sqlite
+
+CITIES = [("Austin", "TX"), ("Dallas", "TX"), ("Orlando", "FL"), ("Denver", "CO")]
+
+
+def make_listings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    city = rng.integers(0, len(CITIES), n)
+    return pd.DataFrame({
+        "id": np.arange(n) + 1000,
+        "agent_description": "1 Bed, 1 Bath apartment",
+        "monthly_price": rng.integers(500, 4000, n).astype(float),
+        "address": [f"{i} Main St" for i in range(n)],
+        "city": [CITIES[c][0] for c in city],
+        "state": [CITIES[c][1] for c in city],
+        "latitude": 30 + rng.random(n),
+        "longitude": -97 - rng.random(n),
+    })
+
+
+FILTERS = [
+    {},
+    {"min_budget": 1500},
+    {"min_bedrooms": 2},
+    {"min_bedrooms": 1, "max_bedrooms": 1, "min_bathrooms": 1.5},
+    {"category": "home"},
+    {"category": "Condo", "min_budget": 1000, "max_bedrooms": 2},
+    {"category": "castle"},
+]
+
+
+def make_filterable_listings(n):
+    df = make_listings(n)
+    rng = np.random.default_rng(1)
+    df["bedrooms"] = rng.integers(0, 4, n).astype(float)
+    df.loc[rng.random(n) < 0.05, "bedrooms"] = np.nan
+    df["bathrooms"] = rng.choice([1.0, 1.5, 2.0, 3.0], n)
+    df["category"] = rng.choice(["apartment", "home", "apartment/home", "condo"], n)
+    return df
+
+
+def fetch_with(db, *args, **kwargs):
+    inventory._inventory = db
+    return tools.fetch_apartments(*args, **kwargs)
+
+
+LANDMARK = (30.5, -97.5)
+
+
+def expected_ids(db, city, state, budget, sort_by, filters, k=5):
+    # The slow way: filter the whole table, then sort all of it
+    df = db.df.assign(position=np.arange(len(db.df)))
+    df = df[(df["city"] == city) & (df["state"] == state) & (df["monthly_price"] <= budget)]
+    if "min_budget" in filters:
+        df = df[df["monthly_price"] >= filters["min_budget"]]
+    if "min_bedrooms" in filters:
+        df = df[df["bedrooms"] >= filters["min_bedrooms"]]
+    if "max_bedrooms" in filters:
+        df = df[df["bedrooms"] <= filters["max_bedrooms"]]
+    if "min_bathrooms" in filters:
+        df = df[df["bathrooms"] >= filters["min_bathrooms"]]
+    if "category" in filters:
+        wanted = filters["category"].lower()
+        df = df[np.array([wanted in str(c).split("/") for c in df["category"]], dtype=bool)]
+    prices = df["monthly_price"].astype(np.float64)
+    keys = {
+        "listing": df["position"],
+        "price": prices,
+        "price_per_bedroom": prices / np.maximum(df["bedrooms"].astype(np.float64), 1),
+        "distance": inventory.haversine_km(df["latitude"].astype(np.float64), df["longitude"].astype(np.float64), *LANDMARK),
+    }
+    df = df.assign(key=keys[sort_by], price=prices)
+    # Ties go to the cheaper listing, then to file order
+    return list(df.sort_values(["key", "price", "position"], kind="stable", na_position="last")["id"][:k])
+
+
+def run_test():
+    print("🧪 Testing the search filters and top-k ranking...")
+
+    # 1. top_k is exactly the head of a stable sort, ties and NaN included
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        keys = rng.integers(0, 5, rng.integers(0, 40)).astype(float)
+        keys[rng.random(len(keys)) < 0.2] = np.nan
+        k = int(rng.integers(1, 8))
+        assert list(top_k(keys, k)) == list(np.argsort(keys, kind="stable")[:k]), (keys, k)
+    print("✅ Partial sort matches a full stable sort.")
+
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("data")
+    df = make_filterable_listings(3000)
+    df.to_csv(inventory.DATA_PATH, index=False)
+    sqlite_path = os.path.join("data", "apartments_cleaned.sqlite")
+    write_sqlite(df, sqlite_path)
+    memory = Inventory(inventory.read_csv(inventory.DATA_PATH))
+    store = SQLiteInventory(sqlite_path)
+
+    # 2. Every filter and sort key returns what filtering and sorting the whole table would
+    for city, state in CITIES:
+        for budget in (900, 2500):
+            for filters in FILTERS:
+                for sort_by in inventory.SORT_KEYS:
+                    rows, distances = memory.query(city.lower(), state.lower(), budget, **filters, sort_by=sort_by,
+                                                   lat=LANDMARK[0], lng=LANDMARK[1])
+                    got = list(memory.df["id"].iloc[rows])
+                    assert got == expected_ids(memory, city, state, budget, sort_by, filters), (city, budget, filters, sort_by)
+                    assert len(distances) == len(rows)
+    print("✅ Filters and rankings match a full scan and sort.")
+
+    # 3. Both backends return the same JSON from 'fetch_apartments'
+    for city, state in CITIES:
+        for filters in FILTERS:
+            for sort_by in ("price", "price_per_bedroom", "listing"):
+                args = (city, state, 2500)
+                assert fetch_with(store, *args, **filters, sort_by=sort_by) == fetch_with(memory, *args, **filters, sort_by=sort_by)
+            near = dict(landmark_lat=LANDMARK[0], landmark_lng=LANDMARK[1])
+            assert fetch_with(store, city, state, 2500, **filters, **near) == fetch_with(memory, city, state, 2500, **filters, **near)
+    print("✅ SQLite and in-memory backends agree on every filter and ranking.")
+
+    # 4. Results honour the filters; bad arguments are explained to the agent
+    cheapest = json.loads(fetch_with(memory, "Austin", "TX", 2500, min_bedrooms=2, sort_by="price"))
+    prices = [apt["monthly_price"] for apt in cheapest]
+    assert prices == sorted(prices) and len(prices) == 5
+    by_distance = json.loads(fetch_with(memory, "Austin", "TX", 2500, landmark_lat=LANDMARK[0], landmark_lng=LANDMARK[1],
+                                        sort_by="price"))
+    assert "distance_km" in by_distance[0]
+    assert "error" in json.loads(fetch_with(memory, "Austin", "TX", 2500, sort_by="distance"))
+    assert "Use one of" in json.loads(fetch_with(memory, "Austin", "TX", 2500, sort_by="rating"))["error"]
+    none = json.loads(fetch_with(memory, "Austin", "TX", 2500, category="castle"))
+    assert none["count"] == 0 and "category=castle" in none["message"], none
+    print("✅ Filtered results and error messages returned to the agent.")
+
+    # 5. Preferences travel with the handoff and keep cached research apart
+    plain = research_cache.parse_requirements('{"city": "Austin", "state": "TX", "budget": 2500, "landmark": "UT"}')
+    two_bed = research_cache.parse_requirements(
+        '{"city": "Austin", "state": "TX", "budget": 2500, "landmark": "UT", "min_bedrooms": 2, "max_bedrooms": 2}')
+    assert two_bed["min_bedrooms"] == 2 and "min_bedrooms" not in plain
+    cache = research_cache.ResearchCache(ttl=60)
+    assert cache.key(plain) != cache.key(two_bed)
+    locations = {"austin": {"TX": "Austin"}}
+    assert requirements_parser.parse_requirements("Austin, TX under $2500 near UT campus", locations)
+    assert requirements_parser.parse_requirements("2 bedroom in Austin, TX under $2500 near UT campus", locations) is None
+    print("✅ Preferences kept in the handoff and the research cache key.")
+    inventory._inventory = None
+
+
+if __name__ == "__main__":
+    run_test()
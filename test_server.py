@@ -0,0 +1,120 @@
+# This is a test script to verify the server's admission control and session eviction (offline, scripted turns)
+import asyncio
+import time
+import httpx
+
+import server
+from server import RunLimiter
+
+ACTIVE = {"now": 0, "max": 0}
+
+
+async def scripted_turn(user_id: str, session_id: str, message: str) -> list:
+    # Stands in for the agent: "sleep <seconds>" keeps the turn busy that long
+    ACTIVE["now"] += 1
+    ACTIVE["max"] = max(ACTIVE["max"], ACTIVE["now"])
+    try:
+        await asyncio.sleep(float(message.split()[1]))
+    finally:
+        ACTIVE["now"] -= 1
+    return [{"author": "manager", "text": f"done: {message}"}]
+
+
+async def new_session(client) -> str:
+    response = await client.post("/sessions", json={})
+    assert response.status_code == 200, response.text
+    return response.json()["session_id"]
+
+
+async def send(client, session_id: str, seconds: float):
+    return await client.post(f"/sessions/{session_id}/messages", json={"message": f"sleep {seconds}"})
+
+
+async def run_test():
+    print("🧪 Testing the server's limiter and sessions...")
+    server.run_turn = scripted_turn
+    server.limiter = RunLimiter(max_concurrent=2, max_queued=1)
+    # The app is called in-process, without its lifespan (no inventory or Maps servers needed)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        # 1. Two turns run, one waits, the rest are turned away with a 503 right away
+        ids = [await new_session(client) for _ in range(5)]
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(send(client, session_id, 0.3) for session_id in ids))
+        codes = sorted(response.status_code for response in responses)
+        assert codes == [200, 200, 200, 503, 503], codes
+        busy = [response for response in responses if response.status_code == 503]
+        assert all(response.headers["Retry-After"] == "5" for response in busy)
+        assert ACTIVE["max"] == 2 and server.limiter.active == 0 and server.limiter.waiting == 0
+        # The queued turn ran after one of the first two
+        assert time.perf_counter() - start >= 0.6
+        print("✅ At most 2 turns at once, 1 queued, overflow rejected with 503 + Retry-After.")
+
+        # 2. A second message in a busy session gets a 409; the first one still completes
+        first, second = await asyncio.gather(send(client, ids[0], 0.2), send(client, ids[0], 0))
+        assert (first.status_code, second.status_code) == (200, 409), (first.status_code, second.status_code)
+        assert first.json()["reply"] == "done: sleep 0.2"
+        print("✅ One turn at a time per session (409).")
+
+        # 3. A turn over the timeout gets a 504 and gives its slot back
+        server.RUN_TIMEOUT = 0.1
+        response = await send(client, ids[1], 1)
+        assert response.status_code == 504 and server.limiter.active == 0
+        server.RUN_TIMEOUT = 300
+        assert (await send(client, ids[1], 0)).status_code == 200
+        print("✅ Slow turns time out with 504 and free their slot.")
+
+        # 4. Beyond MAX_SESSIONS the least recently used idle sessions are dropped, history included
+        for session_id in list(server.sessions):
+            await server.drop_session(session_id)
+        server.MAX_SESSIONS = 3
+        ids = [await new_session(client) for _ in range(3)]
+        await send(client, ids[0], 0)  # now the most recently used
+        busy = asyncio.create_task(send(client, ids[1], 0.3))
+        await asyncio.sleep(0.05)
+        oldest_user = server.sessions[ids[2]].user_id
+        newest = await new_session(client)
+        assert list(server.sessions) == [ids[0], ids[1], newest], list(server.sessions)
+        assert (await send(client, ids[2], 0)).status_code == 404
+        assert await server.runner.session_service.get_session(
+            app_name=server.runner.app_name, user_id=oldest_user, session_id=ids[2]) is None
+        # Over the limit but busy: kept until its turn is done
+        server.MAX_SESSIONS = 1
+        latest = await new_session(client)
+        assert list(server.sessions) == [ids[1], latest], list(server.sessions)
+        assert (await busy).status_code == 200
+        print("✅ Least recently used idle sessions evicted past the cap; busy ones kept.")
+
+        # 5. Idle sessions expire after SESSION_TTL
+        server.MAX_SESSIONS = 10000
+        server.SESSION_TTL = 0.2
+        await asyncio.sleep(0.3)
+        kept = await new_session(client)
+        assert list(server.sessions) == [kept], list(server.sessions)
+        assert (await client.delete(f"/sessions/{kept}")).status_code == 200 and not server.sessions
+        print("✅ Idle sessions expire after the TTL.")
+
+        # 6. A session that gets a message while the sweep is dropping others is kept
+        stale = [await new_session(client) for _ in range(2)]
+        await asyncio.sleep(0.3)
+        delete = server.runner.session_service.delete_session
+
+        async def slow_delete(**kwargs):
+            await asyncio.sleep(0.1)
+            return await delete(**kwargs)
+
+        server.runner.session_service.delete_session = slow_delete
+        try:
+            sweep = asyncio.create_task(server.evict_sessions())
+            await asyncio.sleep(0.05)  # the sweep picked both and is dropping the first
+            turn = asyncio.create_task(send(client, stale[1], 0.2))
+            assert await sweep == 1
+            assert list(server.sessions) == [stale[1]], list(server.sessions)
+            assert (await turn).status_code == 200
+        finally:
+            server.runner.session_service.delete_session = delete
+        print("✅ Sessions that become busy during a sweep are not dropped mid-turn.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_test())
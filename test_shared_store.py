@@ -0,0 +1,166 @@
+# This is a test script to verify the shared-memory inventory used by multiple worker processes (offline, generated data)
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+os.environ["INVENTORY_REFRESH_INTERVAL"] = "0"
+
+import numpy as np
+import pandas as pd
+from apartment_finder import inventory, shared_store, tools
+from apartment_finder.inventory import Inventory
+from apartment_finder.shared_store import SharedInventory
+
+CITIES = [("Austin", "TX"), ("Dallas", "TX"), ("Orlando", "FL"), ("Denver", "CO")]
+
+
+def make_listings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    city = rng.integers(0, len(CITIES), n)
+    return pd.DataFrame({
+        "id": np.arange(n) + 1000,
+        "agent_description": "1 Bed, 1 Bath apartment",
+        "monthly_price": rng.integers(500, 4000, n).astype(float),
+        "address": [f"{i} Main St" for i in range(n)],
+        "city": [CITIES[c][0] for c in city],
+        "state": [CITIES[c][1] for c in city],
+        "latitude": 30 + rng.random(n),
+        "longitude": -97 - rng.random(n),
+    })
+
+
+FILTERS = [
+    {},
+    {"min_budget": 1500},
+    {"min_bedrooms": 2},
+    {"min_bedrooms": 1, "max_bedrooms": 1, "min_bathrooms": 1.5},
+    {"category": "home"},
+    {"category": "Condo", "min_budget": 1000, "max_bedrooms": 2},
+    {"category": "castle"},
+]
+
+
+def make_filterable_listings(n):
+    df = make_listings(n)
+    rng = np.random.default_rng(1)
+    df["bedrooms"] = rng.integers(0, 4, n).astype(float)
+    df.loc[rng.random(n) < 0.05, "bedrooms"] = np.nan
+    df["bathrooms"] = rng.choice([1.0, 1.5, 2.0, 3.0], n)
+    df["category"] = rng.choice(["apartment", "home", "apartment/home", "condo"], n)
+    df["body"] = [f"Listing {i}: pool and parking" for i in range(n)]
+    return df
+
+
+def fetch_with(db, *args, **kwargs):
+    inventory._inventory = db
+    return tools.fetch_apartments(*args, **kwargs)
+
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# A separate worker process: attach, answer one query, exit
+WORKER_SCRIPT = """
+import json, os
+os.environ["INVENTORY_BACKEND"] = "shared"
+os.environ["INVENTORY_REFRESH_INTERVAL"] = "0"
+from apartment_finder import inventory, tools
+db = inventory.get_inventory()
+print(json.dumps({"type": type(db).__name__, "result": tools.fetch_apartments("Austin", "TX", 2500)}))
+"""
+
+
+def run_test():
+    print("🧪 Testing the shared-memory inventory...")
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("data")
+    df = make_filterable_listings(3000)
+    df.to_csv(inventory.DATA_PATH, index=False)
+    memory = Inventory(inventory.read_csv(inventory.DATA_PATH), version="v1")
+    segment = shared_store.publish(memory)
+    try:
+        # 1. Attached inventories answer exactly like the in-memory one
+        shared = SharedInventory.attach()
+        assert len(shared) == 3000 and shared.version == "v1"
+        for city, state in CITIES:
+            for filters in FILTERS:
+                for sort_by in ("listing", "price", "price_per_bedroom"):
+                    assert fetch_with(shared, city, state, 2500, **filters, sort_by=sort_by) == \
+                        fetch_with(memory, city, state, 2500, **filters, sort_by=sort_by)
+                near = dict(landmark_lat=30.5, landmark_lng=-97.5)
+                assert fetch_with(shared, city, state, 2500, **filters, **near) == fetch_with(memory, city, state, 2500, **filters, **near)
+        assert json.loads(fetch_with(shared, "Austn", "Texas", 2500))["resolved"] == "Austin, TX"
+        # The listing text is read from the loader's data files, on the first lookup only
+        assert shared._text is None and not hasattr(shared, "df")
+        assert shared.listing_text([1000, 2999, 99]).equals(memory.listing_text([1000, 2999, 99]))
+        inventory._inventory = shared
+        assert json.loads(tools.get_listing_details([1007]))[0]["details"] == "Listing 7: pool and parking"
+        print("✅ Same results as the in-memory inventory.")
+
+        # 2. The arrays are views of the segment, and read-only
+        prices = shared._arrays['monthly_price']
+        assert prices.base is not None and not prices.flags.writeable
+        try:
+            prices[0] = 1.0
+            raise AssertionError("expected read-only arrays")
+        except ValueError:
+            pass
+        print("✅ Workers map the published arrays read-only (no copies).")
+
+        # 3. Other processes attach, and their exit does not remove the segment
+        env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+        for _ in range(2):
+            out = subprocess.run([sys.executable, "-c", WORKER_SCRIPT], capture_output=True, text=True, check=True, env=env)
+            worker = json.loads(out.stdout.strip().splitlines()[-1])
+            assert worker["type"] == "SharedInventory", out.stdout
+            assert worker["result"] == fetch_with(memory, "Austin", "TX", 2500)
+        assert SharedInventory.attach().segment_name == segment.name
+        print("✅ Worker processes attach and exit without taking the segment away.")
+
+        # 4. A republish is picked up by refresh; the old segment stays readable until dropped
+        inventory._inventory = shared
+        os.environ["INVENTORY_BACKEND"] = "shared"
+        changed = df.copy()
+        changed.loc[changed['city'] == "Austin", 'monthly_price'] -= 100
+        old_segment, segment = segment, shared_store.publish(Inventory(changed, version="v2"))
+        old_segment.close()
+        old_segment.unlink()
+        old_result = tools.fetch_apartments("Austin", "TX", 2500)  # still the v1 mapping
+        assert inventory.refresh_inventory()
+        assert inventory.get_inventory().version == "v2" and inventory.get_inventory().segment_name == segment.name
+        assert tools.fetch_apartments("Austin", "TX", 2500) != old_result
+        assert fetch_with(shared, "Austin", "TX", 2500) == old_result
+        print("✅ Republished data picked up; in-flight readers keep the old version.")
+    finally:
+        os.environ.pop("INVENTORY_BACKEND", None)
+        inventory._inventory = None
+        shared = None
+        segment.close()
+        segment.unlink()
+        os.remove(shared_store.MANIFEST_PATH)
+
+    # 5. Nothing published: workers fall back to their own copy, and attach once a loader publishes
+    fallback = SharedInventory.load()
+    assert type(fallback) is Inventory and len(fallback) == 3000
+    inventory._inventory = fallback
+    os.environ["INVENTORY_BACKEND"] = "shared"
+    segment = shared_store.publish(Inventory(changed, version="v3"))
+    try:
+        assert inventory.refresh_inventory()
+        attached = inventory.get_inventory()
+        assert type(attached) is SharedInventory and attached.version == "v3" and len(attached) == 3000
+        assert not attached.empty
+        # The loader stops: the attached mapping keeps serving
+        os.remove(shared_store.MANIFEST_PATH)
+        assert not inventory.refresh_inventory() and inventory.get_inventory() is attached
+    finally:
+        os.environ.pop("INVENTORY_BACKEND", None)
+        inventory._inventory = attached = None
+        segment.close()
+        segment.unlink()
+    print("✅ Without a loader, workers load a private copy and attach once one publishes.")
+
+
+if __name__ == "__main__":
+    run_test()
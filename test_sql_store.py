@@ -0,0 +1,126 @@
+# This is a test script to verify the SQLite inventory backend against the in-memory one (offline, generated data)
+import json
+import os
+import sqlite3
+import tempfile
+
+os.environ["INVENTORY_REFRESH_INTERVAL"] = "0"
+
+import numpy as np
+import pandas as pd
+from apartment_finder import inventory, tools
+from apartment_finder.inventory import Inventory
+from apartment_finder.sql_store import SQLiteInventory, write_sqlite
+
+CITIES = [("Austin", "TX"), ("Dallas", "TX"), ("Orlando", "FL"), ("Denver", "CO")]
+
+
+def make_listings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    city = rng.integers(0, len(CITIES), n)
+    return pd.DataFrame({
+        "id": np.arange(n) + 1000,
+        "agent_description": "1 Bed, 1 Bath apartment",
+        "body": [f"Listing {i} with a pool" for i in range(n)],
+        "monthly_price": rng.integers(500, 4000, n).astype(float),
+        "address": [f"{i} Main St" for i in range(n)],
+        "city": [CITIES[c][0] for c in city],
+        "state": [CITIES[c][1] for c in city],
+        "latitude": 30 + rng.random(n),
+        "longitude": -97 - rng.random(n),
+    })
+
+
+def fetch_with(db, *args, **kwargs):
+    inventory._inventory = db
+    return tools.fetch_apartments(*args, **kwargs)
+
+
+def run_test():
+    print("🧪 Testing the SQLite inventory backend...")
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("data")
+    df = make_listings(3000)
+    df.to_csv(inventory.DATA_PATH, index=False)
+    sqlite_path = os.path.join("data", "apartments_cleaned.sqlite")
+
+    # 1. Written in chunks (as preprocessing.py --sqlite does), with the location/price and bedroom indexes
+    assert write_sqlite((df.iloc[i:i + 1000] for i in range(0, len(df), 1000)), sqlite_path) == 3000
+    conn = sqlite3.connect(sqlite_path)
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    plan = " ".join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT rowid FROM listings WHERE state_key = 'tx' AND city_key = 'austin' "
+        "AND monthly_price <= 2000"))
+    conn.close()
+    assert indexes == {"listings_location_price", "listings_bedrooms"}, indexes
+    assert "listings_location_price" in plan, plan
+    print("✅ Database written in chunks; queries use the (state, city, price) index.")
+
+    # 2. fetch_apartments returns exactly the same JSON from both backends
+    memory = Inventory(inventory.read_csv(inventory.DATA_PATH))
+    store = SQLiteInventory(sqlite_path)
+    assert len(store) == len(memory) == 3000
+    try:
+        for city, state in CITIES:
+            for budget in (600, 1500, 2500, 5000):
+                assert fetch_with(store, city, state, budget) == fetch_with(memory, city, state, budget)
+                near = dict(landmark_lat=30.5, landmark_lng=-97.5)
+                assert fetch_with(store, city, state, budget, **near) == fetch_with(memory, city, state, budget, **near)
+        # Location correction works on the database too
+        assert json.loads(fetch_with(store, "Austn", "Texas", 1500))["resolved"] == "Austin, TX"
+        print("✅ Same results as the in-memory inventory for every city, budget and landmark query.")
+
+        # 3. Workers open the file read-only
+        try:
+            store.connection().execute("DELETE FROM listings")
+            raise AssertionError("expected a read-only database")
+        except sqlite3.OperationalError:
+            pass
+        print("✅ Database opened read-only.")
+
+        # 4. INVENTORY_BACKEND=sqlite loads it, and a new version is picked up by reopening the file
+        os.environ["INVENTORY_BACKEND"] = "sqlite"
+        inventory._inventory = None
+        assert isinstance(inventory.get_inventory(), SQLiteInventory)
+        write_sqlite(make_listings(500, seed=1), sqlite_path)
+        inventory.write_version()
+        assert inventory.refresh_inventory()
+        assert len(inventory.get_inventory()) == 500
+        print("✅ Backend selected from .env and refreshed when a new database is written.")
+
+        # 5. A database outside data/ is versioned by the marker next to it, not data/'s
+        other_path = os.path.join(tempfile.mkdtemp(), "listings.sqlite")
+        os.environ["INVENTORY_SQLITE_PATH"] = other_path
+        write_sqlite(make_listings(200, seed=2), other_path)
+        inventory.write_version(inventory.version_path_for(other_path))
+        inventory._inventory = None
+        assert len(inventory.get_inventory()) == 200
+        write_sqlite(make_listings(300, seed=3), other_path)
+        inventory.write_version()
+        assert not inventory.refresh_inventory()
+        inventory.write_version(inventory.version_path_for(other_path))
+        assert inventory.refresh_inventory() and len(inventory.get_inventory()) == 300
+        print("✅ Databases written elsewhere are refreshed from their own version file.")
+
+        # 6. Listing text is read from the CSV next to the database, and budgets at the
+        #    stored float32 precision keep a listing priced exactly at the budget
+        ids = [1000, 1999, 99]
+        assert store._text is None
+        assert store.listing_text(ids).equals(memory.listing_text(ids))
+        edge = make_listings(3)
+        edge["city"], edge["state"] = "Austin", "TX"
+        edge["monthly_price"] = [1500.01, 1999.99, 1234.57]
+        edge_path = os.path.join(tempfile.mkdtemp(), "edge.sqlite")
+        write_sqlite(edge, edge_path)
+        for price in edge["monthly_price"]:
+            rows, _ = SQLiteInventory(edge_path).query("Austin", "TX", price, min_budget=price)
+            assert len(rows) == 1, price
+        print("✅ Listing text and budget boundaries match the in-memory inventory.")
+    finally:
+        os.environ.pop("INVENTORY_BACKEND", None)
+        os.environ.pop("INVENTORY_SQLITE_PATH", None)
+        inventory._inventory = None
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,119 @@
+# This is a test script to verify the tracing/metrics hooks offline (uses the stub Maps MCP server)
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+from mcp import StdioServerParameters
+from apartment_finder import agent, maps_mcp, telemetry
+from apartment_finder.maps_mcp import MapsMCPPool
+from benchmarks.end_to_end import SCENARIOS, build_agent, user_message
+
+CITIES = [("Austin", "TX"), ("Dallas", "TX"), ("Orlando", "FL"), ("Denver", "CO")]
+
+
+def make_listings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    city = rng.integers(0, len(CITIES), n)
+    return pd.DataFrame({
+        "id": np.arange(n) + 1000,
+        "agent_description": "1 Bed, 1 Bath apartment",
+        "monthly_price": rng.integers(500, 4000, n).astype(float),
+        "address": [f"{i} Main St" for i in range(n)],
+        "city": [CITIES[c][0] for c in city],
+        "state": [CITIES[c][1] for c in city],
+        "latitude": 30 + rng.random(n),
+        "longitude": -97 - rng.random(n),
+    })
+
+
+STUB_PATH = os.path.join(os.getcwd(), "benchmarks", "stub_maps_server.py")
+
+
+async def run_test():
+    print("🧪 Testing telemetry...")
+    os.environ.pop("TELEMETRY_TRACE_PATH", None)
+    os.environ.pop("TELEMETRY_METRICS_PORT", None)
+
+    # 1. Disabled: hooks record nothing
+    telemetry.configure()
+    assert not telemetry.enabled()
+    telemetry.count("tool_payload_bytes_total", 100, tool="fetch_apartments")
+    with telemetry.span("tool:fetch_apartments"):
+        pass
+    assert telemetry.render_prometheus().strip() == "", telemetry.render_prometheus()
+    print("✅ Disabled telemetry records nothing.")
+
+    # 2. Enabled: the ADK callbacks produce spans, counters and trace lines
+    trace_path = os.path.join(tempfile.mkdtemp(), "trace.jsonl")
+    telemetry.configure(trace_path=trace_path)
+    ctx = SimpleNamespace(invocation_id="inv-1", agent_name="analyst")
+    tool = SimpleNamespace(name="fetch_apartments")
+    tool_ctx = SimpleNamespace(invocation_id="inv-1", function_call_id="call-1")
+    usage = SimpleNamespace(prompt_token_count=120, candidates_token_count=30)
+
+    telemetry.before_agent(ctx)
+    telemetry.before_model(ctx, None)
+    telemetry.after_model(ctx, SimpleNamespace(usage_metadata=usage, grounding_metadata=None))
+    telemetry.before_tool(tool, {"city": "Austin"}, tool_ctx)
+    telemetry.after_tool(tool, {"city": "Austin"}, tool_ctx, {"result": "[]"})
+    telemetry.after_agent(ctx)
+
+    metrics = telemetry.render_prometheus()
+    assert 'apartment_finder_llm_tokens_total{agent="analyst",type="prompt"} 120' in metrics, metrics
+    assert 'apartment_finder_tool_payload_bytes_total{direction="request",tool="fetch_apartments"} 17' in metrics, metrics
+    assert 'apartment_finder_tool_seconds_count{tool="fetch_apartments"} 1' in metrics, metrics
+    assert 'apartment_finder_agent_seconds_count{agent="analyst"} 1' in metrics, metrics
+    with open(trace_path) as f:
+        spans = [json.loads(line)["span"] for line in f]
+    assert spans == ["llm:analyst", "tool:fetch_apartments", "agent:analyst"], spans
+    print("✅ Agent, model and tool spans exported as metrics and trace lines.")
+
+    # 3. Maps MCP calls are split into cold (spawned a server) and warm
+    params = StdioServerParameters(command=sys.executable, args=[STUB_PATH])
+    pool = MapsMCPPool(size=1, server_params=params)
+    try:
+        for _ in range(3):
+            await pool.call_tool("stub_stats", {})
+    finally:
+        await pool.close()
+    metrics = telemetry.render_prometheus()
+    assert 'apartment_finder_mcp_seconds_count{start="cold",tool="stub_stats"} 1' in metrics, metrics
+    assert 'apartment_finder_mcp_seconds_count{start="warm",tool="stub_stats"} 2' in metrics, metrics
+    assert "apartment_finder_mcp_spawn_seconds_count 1" in metrics, metrics
+    print("✅ MCP cold and warm calls timed separately.")
+
+    # 4. A full turn leaves no span open, also when the research cache answers for the team
+    #    (ADK skips the after_agent callbacks then; the runner plugin closes what is left)
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("data")
+    make_listings(500).to_csv(os.path.join("data", "apartments_cleaned.csv"), index=False)
+    open(trace_path, "w").close()
+    runner = InMemoryRunner(app=agent.app.model_copy(update={"root_agent": build_agent(0)}))
+    message = types.Content(role="user", parts=[types.Part(text=user_message(SCENARIOS[0]))])
+    try:
+        for turn in ("uncached", "cached"):
+            session = await runner.session_service.create_session(app_name=runner.app_name, user_id="test")
+            async for _ in runner.run_async(user_id="test", session_id=session.id, new_message=message):
+                pass
+            assert telemetry._open_spans == {}, (turn, list(telemetry._open_spans))
+    finally:
+        await maps_mcp.close_pool()
+        await runner.close()
+    with open(trace_path) as f:
+        spans = [json.loads(line)["span"] for line in f]
+    assert spans.count("agent:manager") == 2 and spans.count("agent:ResearchTeam") == 2, spans
+    assert "research_cache_total{result=\"hit\"}" in str(telemetry.snapshot()["counters"])
+    print("✅ No spans left open after an uncached and a cached turn.")
+
+    telemetry.configure(trace_path=None)
+    telemetry.reset()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_test())
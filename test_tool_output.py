@@ -0,0 +1,101 @@
+# This is a test script to verify the compact tool output format (offline, uses the stub server)
+import asyncio
+import json
+import os
+import tempfile
+
+# Point the tool at the stub server and a throwaway cache before importing it
+os.environ["MAPS_MCP_SERVER"] = os.path.join(os.getcwd(), "benchmarks", "stub_maps_server.py")
+os.environ["COMMUTE_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "commute_cache.sqlite")
+os.environ["INVENTORY_REFRESH_INTERVAL"] = "0"
+
+import numpy as np
+import pandas as pd
+from apartment_finder import inventory, maps_mcp, parallel_research, tools
+from apartment_finder.inventory import Inventory
+
+CITIES = [("Austin", "TX"), ("Dallas", "TX"), ("Orlando", "FL"), ("Denver", "CO")]
+
+
+def make_listings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    city = rng.integers(0, len(CITIES), n)
+    return pd.DataFrame({
+        "id": np.arange(n) + 1000,
+        "agent_description": "1 Bed, 1 Bath apartment",
+        "monthly_price": rng.integers(500, 4000, n).astype(float),
+        "address": [f"{i} Main St" for i in range(n)],
+        "city": [CITIES[c][0] for c in city],
+        "state": [CITIES[c][1] for c in city],
+        "latitude": 30 + rng.random(n),
+        "longitude": -97 - rng.random(n),
+    })
+
+
+DESTINATION = "Downtown Austin, Austin, TX"
+
+
+def with_format(output_format, function, *args, **kwargs):
+    os.environ["TOOL_OUTPUT_FORMAT"] = output_format
+    try:
+        return function(*args, **kwargs)
+    finally:
+        del os.environ["TOOL_OUTPUT_FORMAT"]
+
+
+async def run_test():
+    print("🧪 Testing the compact tool output format...")
+    df = make_listings(500)
+    df["latitude"] += 0.1234567
+    inventory._inventory = Inventory(df)
+    try:
+        # 1. Listings: one header row, city/state once, rounded coordinates, same listings
+        records = with_format("records", tools.fetch_apartments, "Austin", "TX", 2500)
+        compact = with_format("compact", tools.fetch_apartments, "Austin", "TX", 2500)
+        table = json.loads(compact)
+        assert table["city"] == "Austin" and table["state"] == "TX"
+        assert table["columns"] == ["id", "agent_description", "monthly_price", "address", "latitude", "longitude"]
+        assert len(table["rows"]) == 5 and table["rows"][0][1] == "1 Bed, 1 Bath apartment"
+        assert all(len(str(row[4]).split(".")[1]) <= tools.COMPACT_COORDINATE_DECIMALS for row in table["rows"])
+        full, short = tools.parse_listings(records), tools.parse_listings(compact)
+        assert [(a["id"], a["monthly_price"], a["city"]) for a in full] == [(a["id"], a["monthly_price"], a["city"]) for a in short]
+        assert len(compact) < len(records) / 1.5, (len(compact), len(records))
+        print(f"✅ Listings encoded as a table ({len(records)} -> {len(compact)} bytes).")
+
+        # 2. Corrections and per-tool overrides
+        corrected = json.loads(with_format("compact", tools.fetch_apartments, "Austn", "Texas", 2500))
+        assert corrected["resolved"] == "Austin, TX" and corrected["requested"] == "Austn, Texas"
+        os.environ["CHECK_COMMUTES_FORMAT"] = "compact"
+        assert tools.output_format("check_commutes") == "compact" and tools.output_format("fetch_apartments") == "records"
+        del os.environ["CHECK_COMMUTES_FORMAT"]
+        assert with_format("bogus", tools.output_format, "fetch_apartments") == "records"
+        print("✅ Location corrections kept; format selectable per tool.")
+
+        # 3. Commutes: origin position, seconds and meters; failures as nulls with the error
+        origins = [f"{apt['latitude']},{apt['longitude']}" for apt in full]
+        os.environ["TOOL_OUTPUT_FORMAT"] = "records"
+        records = await tools.check_commutes(origins, DESTINATION)
+        os.environ["TOOL_OUTPUT_FORMAT"] = "compact"
+        compact = await tools.check_commutes(origins, DESTINATION)
+        failed = json.loads(await tools.check_commutes(["STUB_FAIL"] + origins, DESTINATION))
+        del os.environ["TOOL_OUTPUT_FORMAT"]
+        table = json.loads(compact)
+        assert table["columns"] == ["origin", "seconds", "meters"] and [row[0] for row in table["rows"]] == list(range(5))
+        assert table["destination"] == f"{DESTINATION} (stub)"
+        assert [c["seconds"] for c in tools.parse_commutes(records)] == [row[1] for row in table["rows"]]
+        assert failed["rows"][0] == [0, None, None] and failed["errors"][0]["origins"] == [0]
+        assert len(compact) < len(records) / 3, (len(compact), len(records))
+        print(f"✅ Commutes reduced to origin, seconds and meters ({len(records)} -> {len(compact)} bytes).")
+
+        # 4. The parallel team reads both formats
+        lines = parallel_research._commute_lines(compact, 6)
+        assert lines[0].endswith(" km)") and "min" in lines[0] and lines[5] == "commute unavailable"
+        assert tools.parse_commutes("Error connecting to Maps MCP") == []
+        print("✅ Compact results parsed back for the dossier.")
+    finally:
+        inventory._inventory = None
+        await maps_mcp.get_pool().close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_test())